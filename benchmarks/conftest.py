@@ -0,0 +1,162 @@
+import json
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+import pytest
+from dataset import build_dataset
+from rest_framework.test import APIRequestFactory
+
+# The timings and query counts of every scenario run, reported at the end.
+RESULTS = []
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--tiers",
+        default="1000,10000",
+        help="Comma separated numbers of memberships to run the scenarios at.",
+    )
+    parser.addoption(
+        "--results-json", help="Path to write the scenario results to as JSON."
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "tier" in metafunc.fixturenames:
+        tiers = [int(tier) for tier in metafunc.config.getoption("tiers").split(",")]
+        metafunc.parametrize("tier", tiers, scope="module")
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not RESULTS:
+        return
+
+    tiers = sorted({result["tier"] for result in RESULTS})
+    rows = {}
+    for result in RESULTS:
+        row = f"{result['scenario']} [{result['cache']}]"
+        rows.setdefault(row, {})[result["tier"]] = result
+    width = max(len(scenario) for scenario in rows)
+
+    terminalreporter.section("scenario latency (median ms / queries) by tier")
+    terminalreporter.write_line(
+        "scenario".ljust(width) + "".join(f"{tier:>20,}" for tier in tiers)
+    )
+    for scenario, results in rows.items():
+        cells = [
+            (
+                f"{results[tier]['median_ms']:.1f} / {results[tier]['queries']}"
+                if tier in results
+                else "-"
+            )
+            for tier in tiers
+        ]
+        terminalreporter.write_line(
+            scenario.ljust(width) + "".join(f"{cell:>20}" for cell in cells)
+        )
+
+    path = config.getoption("results_json")
+    if path:
+        with open(path, "w") as results_file:
+            json.dump(RESULTS, results_file, indent=2)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def api_rf():
+    return APIRequestFactory()
+
+
+@pytest.fixture
+def measure():
+    """Returns the best of several wall clock timings of a callable, in seconds."""
+
+    def measure(func, repeat=3):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    return measure
+
+
+@pytest.fixture(scope="module")
+def dataset(tier, django_db_setup, django_db_blocker):
+    """
+    A dataset with tier memberships, shared by the tests of a module.
+
+    It is committed outside of the tests' transactions, which roll back whatever
+    the scenarios write, and flushed once the module is done with the tier.
+    """
+    with django_db_blocker.unblock():
+        start = time.perf_counter()
+        dataset = build_dataset(tier)
+        print(f"\nBuilt a dataset of {tier:,} in {time.perf_counter() - start:.1f}s")
+        yield dataset
+        call_command("flush", interactive=False, verbosity=0)
+
+
+@pytest.fixture
+def run_scenario(request):
+    """
+    Times a scenario and counts its queries, adding both to the report.
+
+    Scenarios are measured twice: cold, with the cache cleared before every run,
+    and warm, after a run has filled it, and both results are returned. Scenarios
+    that write run in a savepoint that is rolled back, so each run sees the same
+    data. They are reported under the tier of the test unless another is given.
+    """
+
+    def run(scenario, func, repeat=5, rollback=False, tier=None):
+        if tier is None:
+            tier = request.getfixturevalue("tier")
+
+        def run_once():
+            if not rollback:
+                return func()
+            with transaction.atomic():
+                func()
+                transaction.set_rollback(True)
+
+        def measure(cold):
+            timings = []
+            for _ in range(repeat):
+                if cold:
+                    cache.clear()
+                start = time.perf_counter()
+                run_once()
+                timings.append(time.perf_counter() - start)
+            if cold:
+                cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                run_once()
+            result = {
+                "scenario": scenario,
+                "tier": tier,
+                "cache": "cold" if cold else "warm",
+                "median_ms": statistics.median(timings) * 1000,
+                "queries": len(queries),
+            }
+            RESULTS.append(result)
+            return result
+
+        # The first run also warms up connections and imports.
+        run_once()
+        cold = measure(cold=True)
+        run_once()
+        return cold, measure(cold=False)
+
+    return run
@@ -0,0 +1,186 @@
+"""
+Builds synthetic partnership data of a given size for the benchmarks.
+
+Objects are built with the factories, with every field that would otherwise be
+faked given explicitly, and written with bulk_create in batches, so a dataset of a
+million memberships fits in memory a batch at a time and takes minutes rather than
+hours to create.
+"""
+
+from dataclasses import dataclass
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.base_user import AbstractBaseUser
+
+from mogc_partnerships import factories, models
+
+PARTNERS = 10
+COHORTS_PER_PARTNER = 10
+OFFERINGS_PER_PARTNER = 20
+OFFERINGS_PER_COHORT = 5
+# One in every INVITE_RATIO memberships is an invite that hasn't been accepted.
+INVITE_RATIO = 10
+BATCH_SIZE = 5000
+
+
+@dataclass
+class Dataset:
+    """A generated dataset and the objects the scenarios act on."""
+
+    size: int
+    partner: models.Partner
+    cohort: models.PartnerCohort
+    cohort_offering: models.CohortOffering
+    manager: AbstractBaseUser
+    learner: AbstractBaseUser
+    learner_membership: models.CohortMembership
+    invite: models.CohortMembership
+
+
+def batched(iterable, size=BATCH_SIZE):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def create_partners(count):
+    models.Partner.objects.bulk_create(
+        factories.PartnerFactory.build(
+            name=f"Partner {i}", slug=f"bench-partner-{i}", org=f"BenchOrg{i}"
+        )
+        for i in range(count)
+    )
+    return list(
+        models.Partner.objects.filter(slug__startswith="bench-partner-").order_by("id")
+    )
+
+
+def create_offerings(partners, per_partner):
+    models.PartnerOffering.objects.bulk_create(
+        factories.PartnerOfferingFactory.build(
+            partner=partner,
+            course_key=f"course-v1:{partner.org}+C{i}+R",
+            title=f"Course {i}",
+            short_description="A course.",
+        )
+        for partner in partners
+        for i in range(per_partner)
+    )
+    offerings = {}
+    for offering in models.PartnerOffering.objects.order_by("id"):
+        offerings.setdefault(offering.partner_id, []).append(offering)
+    return offerings
+
+
+def create_cohorts(partners, offerings, offerings_per_partner, offerings_per_cohort):
+    models.PartnerCohort.objects.bulk_create(
+        factories.PartnerCohortFactory.build(partner=partner, name=f"Cohort {i}")
+        for partner in partners
+        for i in range(COHORTS_PER_PARTNER)
+    )
+    cohorts = list(models.PartnerCohort.objects.order_by("partner_id", "id"))
+    models.CohortOffering.objects.bulk_create(
+        factories.CohortOfferingFactory.build(
+            cohort=cohort,
+            offering=offerings[cohort.partner_id][(i + j) % offerings_per_partner],
+        )
+        for i, cohort in enumerate(cohorts)
+        for j in range(offerings_per_cohort)
+    )
+    return cohorts
+
+
+def create_memberships(size, cohorts):
+    """Creates size memberships, their users, and an enrollment record for each."""
+    User = get_user_model()
+    offering_ids = {}
+    for cohort_id, offering_id in models.CohortOffering.objects.values_list(
+        "cohort_id", "offering_id"
+    ):
+        offering_ids.setdefault(cohort_id, []).append(offering_id)
+
+    for indexes in batched(range(size)):
+        members = [i for i in indexes if i % INVITE_RATIO]
+        usernames = [f"bench-{i}" for i in members]
+        User.objects.bulk_create(
+            factories.UserFactory.build(
+                username=username, email=f"{username}@example.com"
+            )
+            for username in usernames
+        )
+        # Not every database returns the ids of bulk created rows.
+        user_ids = dict(
+            User.objects.filter(username__in=usernames).values_list("username", "id")
+        )
+
+        memberships = []
+        records = []
+        for i in indexes:
+            cohort = cohorts[i % len(cohorts)]
+            user_id = user_ids.get(f"bench-{i}")
+            email = f"bench-{i}@example.com" if user_id else f"invite-{i}@example.com"
+            membership = factories.CohortMembershipFactory.build(
+                cohort=cohort,
+                user=None,
+                email=email,
+                # bulk_create doesn't call save(), which normally sets this.
+                normalized_email=email,
+            )
+            membership.user_id = user_id
+            memberships.append(membership)
+            if user_id:
+                cohort_offering_ids = offering_ids[cohort.id]
+                record = factories.EnrollmentRecordFactory.build(
+                    user=None, offering=None, mode="audit"
+                )
+                record.user_id = user_id
+                record.offering_id = cohort_offering_ids[i % len(cohort_offering_ids)]
+                records.append(record)
+        models.CohortMembership.objects.bulk_create(memberships)
+        models.EnrollmentRecord.objects.bulk_create(records)
+
+
+def build_dataset(
+    size,
+    partner_count=PARTNERS,
+    offerings_per_partner=OFFERINGS_PER_PARTNER,
+    offerings_per_cohort=OFFERINGS_PER_COHORT,
+):
+    """
+    Creates a dataset with size memberships spread over all of the cohorts.
+
+    The other counts can be changed to scale the offerings independently of the
+    memberships. A cohort can't have more offerings than its partner.
+    """
+    partners = create_partners(partner_count)
+    offerings = create_offerings(partners, offerings_per_partner)
+    cohorts = create_cohorts(
+        partners, offerings, offerings_per_partner, offerings_per_cohort
+    )
+    create_memberships(size, cohorts)
+
+    partner = partners[0]
+    manager = factories.UserFactory(username="bench-manager")
+    factories.PartnerManagementMembershipFactory(partner=partner, user=manager)
+    learner_membership = (
+        models.CohortMembership.objects.filter(cohort__partner=partner)
+        .exclude(user=None)
+        .select_related("cohort__partner", "user")
+        .earliest("id")
+    )
+    cohort = learner_membership.cohort
+    return Dataset(
+        size=size,
+        partner=partner,
+        cohort=cohort,
+        cohort_offering=models.CohortOffering.objects.filter(cohort=cohort)
+        .select_related("offering")
+        .earliest("id"),
+        manager=manager,
+        learner=learner_membership.user,
+        learner_membership=learner_membership,
+        invite=models.CohortMembership.objects.pending()
+        .filter(cohort__partner=partner)
+        .earliest("id"),
+    )
@@ -0,0 +1,42 @@
+"""
+Compares batched and one-at-a-time enrollment changes against a slow backend.
+
+The stand-in backend sleeps on every call to simulate edx-platform, so the batch
+call, which builds each course URL once and spreads calls over ENROLLMENT_WORKERS
+threads, is expected to be several times faster than the loop.
+"""
+
+import pytest
+from opaque_keys.edx.keys import CourseKey
+
+from mogc_partnerships import compat
+
+LATENCY = 0.01
+COURSES = 8
+EMAILS = 5
+
+
+@pytest.mark.django_db(transaction=True)
+def test_batch_speedup(mocker, measure, settings):
+    settings.MOGC_PARTNERSHIPS_ENROLLMENT_WORKERS = 4
+    mocker.patch.object(compat, "_backend", compat.StandInBackend(latency=LATENCY))
+    pairs = [
+        (CourseKey.from_string(f"course-v1:Bench+C{course}+R"), f"{email}@example.com")
+        for course in range(COURSES)
+        for email in range(EMAILS)
+    ]
+
+    def loop():
+        for course_key, email in pairs:
+            compat.update_student_enrollment(course_key, email, compat.ENROLL_ACTION)
+
+    def batch():
+        compat.update_student_enrollments(pairs, compat.ENROLL_ACTION)
+
+    loop_time = measure(loop)
+    batch_time = measure(batch)
+    print(
+        f"{len(pairs)} enrollments: loop {loop_time * 1000:.0f}ms, "
+        f"batch {batch_time * 1000:.0f}ms ({loop_time / batch_time:.1f}x)"
+    )
+    assert batch_time < loop_time / 2
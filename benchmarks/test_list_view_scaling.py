@@ -0,0 +1,74 @@
+"""
+Checks that the list endpoints scale linearly with the number of offerings.
+
+Each endpoint is timed with a dataset of a base number of offerings and with one of
+four times as many. Linear work should take about four times as long, so the check
+allows up to eight times to absorb noise while still failing for quadratic
+serialization.
+"""
+
+from django.db import transaction
+
+import pytest
+from dataset import build_dataset
+from rest_framework.test import force_authenticate
+
+from mogc_partnerships import views
+
+BASE_SIZE = 1000
+SCALE = 4
+MAX_RATIO = SCALE * 2
+# Memberships are kept few, since only the offerings are scaled.
+MEMBERSHIPS = 100
+
+
+def partner_list(api_rf, dataset, offerings):
+    view = views.PartnerListView.as_view()
+
+    def request():
+        request = api_rf.get("/partners/")
+        force_authenticate(request, dataset.manager)
+        (partner,) = view(request).data
+        assert len(partner["offerings"]) == offerings
+
+    return request
+
+
+def cohort_offering_list(api_rf, dataset, offerings):
+    view = views.CohortOfferingListView.as_view()
+
+    def request():
+        request = api_rf.get("/offerings/")
+        force_authenticate(request, dataset.learner)
+        assert len(view(request).data) == offerings
+
+    return request
+
+
+@pytest.mark.django_db
+class TestListViewScaling:
+    def _time(self, api_rf, run_scenario, make_request, size):
+        """Returns the warm median of make_request against size offerings, in ms."""
+        with transaction.atomic():
+            dataset = build_dataset(
+                MEMBERSHIPS,
+                partner_count=1,
+                offerings_per_partner=size,
+                offerings_per_cohort=size,
+            )
+            _, warm = run_scenario(
+                f"{make_request.__name__} (scaling)",
+                make_request(api_rf, dataset, size),
+                # Reported by the number of offerings rather than of memberships.
+                tier=size,
+            )
+            transaction.set_rollback(True)
+        return warm["median_ms"]
+
+    @pytest.mark.parametrize("make_request", [partner_list, cohort_offering_list])
+    def test_linear(self, api_rf, run_scenario, make_request):
+        base = self._time(api_rf, run_scenario, make_request, BASE_SIZE)
+        scaled = self._time(api_rf, run_scenario, make_request, BASE_SIZE * SCALE)
+
+        print(f"{make_request.__name__}: {base:.1f}ms -> {scaled:.1f}ms")
+        assert scaled / base < MAX_RATIO
@@ -0,0 +1,304 @@
+"""
+Times every endpoint, pipeline step, receiver and invite task at each scale tier.
+
+Each test runs one scenario against the shared dataset for the tier and adds its
+median latency and query count, with a cold and a warm cache, to the report printed
+at the end of the run. Use
+--tiers to choose the sizes, for example --tiers=1000,100000,1000000, and
+--results-json to keep the numbers for comparing against a later run.
+"""
+
+from dataclasses import dataclass
+
+from django.utils import timezone
+
+import pytest
+from crum import impersonate
+from openedx_events.learning.data import (
+    CourseData,
+    CourseEnrollmentData,
+    UserData,
+    UserPersonalData,
+)
+from openedx_filters.learning.filters import (
+    CourseAboutRenderStarted,
+    CourseEnrollmentStarted,
+)
+from rest_framework.test import force_authenticate
+
+from mogc_partnerships import compat, models, receivers, tasks, views
+
+pytestmark = pytest.mark.django_db
+
+
+@dataclass
+class CourseDetails:
+    """Stand-in for CourseDetails from edx-platform."""
+
+    org: str
+    course_id: str
+    run: str
+
+
+@pytest.fixture(autouse=True)
+def stand_in_backend(mocker):
+    mocker.patch.object(compat, "_backend", compat.StandInBackend(latency=0))
+
+
+@pytest.fixture(autouse=True)
+def no_celery(mocker):
+    """Keeps tasks that scenarios queue from trying to reach a broker."""
+    for task in (
+        tasks.trigger_send_cohort_membership_invite,
+        tasks.trigger_send_cohort_membership_invites,
+        tasks.trigger_send_cohort_membership_reminders,
+        tasks.flush_enrollment_events,
+    ):
+        mocker.patch.object(task, "delay")
+    mocker.patch("edx_ace.ace.send")
+
+
+@pytest.fixture
+def call_view(api_rf):
+    def call_view(view, user, method="get", data=None, status=200, **kwargs):
+        def call():
+            if method == "get":
+                request = api_rf.get("/")
+            else:
+                request = getattr(api_rf, method)("/", data, format="json")
+            force_authenticate(request, user)
+            response = view(request, **kwargs)
+            assert response.status_code == status, response.data
+            return response
+
+        return call
+
+    return call_view
+
+
+def make_user_data(user_id, email):
+    return UserData(
+        id=user_id,
+        is_active=True,
+        pii=UserPersonalData(username=email, email=email, name=email),
+    )
+
+
+class TestEndpoints:
+    def test_partner_list(self, dataset, call_view, run_scenario):
+        view = views.PartnerListView.as_view()
+        run_scenario("partner_list (manager)", call_view(view, dataset.manager))
+        run_scenario("partner_list (learner)", call_view(view, dataset.learner))
+
+    def test_learner_home(self, dataset, call_view, run_scenario):
+        view = views.LearnerHomeView.as_view()
+        run_scenario("learner_home", call_view(view, dataset.learner))
+
+    def test_cohorts(self, dataset, call_view, run_scenario):
+        run_scenario(
+            "cohort_list",
+            call_view(views.CohortListView.as_view(), dataset.manager),
+        )
+        run_scenario(
+            "cohort_detail",
+            call_view(
+                views.CohortDetailView.as_view(),
+                dataset.manager,
+                uuid=dataset.cohort.uuid,
+            ),
+        )
+
+    def test_offerings(self, dataset, call_view, run_scenario):
+        run_scenario(
+            "offering_list",
+            call_view(views.CohortOfferingListView.as_view(), dataset.learner),
+        )
+        offering = (
+            models.PartnerOffering.objects.filter(partner=dataset.partner)
+            .exclude(cohortoffering__cohort=dataset.cohort)
+            .first()
+        )
+        run_scenario(
+            "offering_create",
+            call_view(
+                views.CohortOfferingCreateView.as_view(),
+                dataset.manager,
+                method="post",
+                data={"offering": offering.id},
+                status=201,
+                cohort_uuid=dataset.cohort.uuid,
+            ),
+            rollback=True,
+        )
+
+    def test_enroll_member(self, dataset, call_view, run_scenario):
+        run_scenario(
+            "enroll_member",
+            call_view(
+                views.enroll_member,
+                dataset.learner,
+                method="post",
+                offering_id=dataset.cohort_offering.id,
+            ),
+        )
+
+    def test_continue_learning(self, dataset, rf, run_scenario, settings):
+        settings.ROOT_URLCONF = "mogc_partnerships.urls"
+
+        def continue_learning():
+            request = rf.get("/")
+            request.user = dataset.learner
+            response = views.continue_learning(request, dataset.cohort_offering.id)
+            assert response.status_code == 302
+
+        run_scenario("continue_learning", continue_learning)
+
+    def test_membership_list(self, dataset, call_view, run_scenario):
+        view = views.CohortMembershipListView.as_view()
+        run_scenario("membership_list", call_view(view, dataset.manager))
+
+    def test_membership_create(self, dataset, call_view, run_scenario):
+        view = views.CohortMembershipCreateView.as_view()
+        run_scenario(
+            "membership_create (single)",
+            call_view(
+                view,
+                dataset.manager,
+                method="post",
+                data={"email": "new-member@example.com"},
+                status=201,
+                cohort_uuid=dataset.cohort.uuid,
+            ),
+            rollback=True,
+        )
+        run_scenario(
+            "membership_create (bulk of 100)",
+            call_view(
+                view,
+                dataset.manager,
+                method="post",
+                data=[{"email": f"new-member-{i}@example.com"} for i in range(100)],
+                status=201,
+                cohort_uuid=dataset.cohort.uuid,
+            ),
+            rollback=True,
+        )
+
+    def test_membership_update(self, dataset, call_view, run_scenario):
+        """Deactivating a membership also unenrolls the learner."""
+        run_scenario(
+            "membership_update (deactivate)",
+            call_view(
+                views.CohortMembershipUpdateView.as_view(),
+                dataset.manager,
+                method="patch",
+                data={"active": False},
+                cohort_uuid=dataset.cohort.uuid,
+                pk=dataset.learner_membership.pk,
+            ),
+            rollback=True,
+        )
+
+    def test_record_list(self, dataset, call_view, run_scenario):
+        view = views.EnrollmentRecordListView.as_view()
+        run_scenario("record_list", call_view(view, dataset.manager))
+
+
+class TestPipeline:
+    def test_membership_required_enrollment(self, dataset, run_scenario, settings):
+        settings.OPEN_EDX_FILTERS_CONFIG = {
+            "org.openedx.learning.course.enrollment.started.v1": {
+                "fail_silently": False,
+                "pipeline": ["mogc_partnerships.pipeline.MembershipRequiredEnrollment"],
+            }
+        }
+        course_key = dataset.cohort_offering.offering.course_key
+
+        run_scenario(
+            "MembershipRequiredEnrollment",
+            lambda: CourseEnrollmentStarted.run_filter(
+                dataset.learner, course_key, "audit"
+            ),
+        )
+
+    def test_hide_partner_course_about_pages(self, dataset, run_scenario, settings):
+        settings.OPEN_EDX_FILTERS_CONFIG = {
+            "org.openedx.learning.course_about.render.started.v1": {
+                "fail_silently": False,
+                "pipeline": ["mogc_partnerships.pipeline.HidePartnerCourseAboutPages"],
+            }
+        }
+        course_key = dataset.cohort_offering.offering.course_key
+        context = {
+            "course_details": CourseDetails(
+                course_key.org, course_key.course, course_key.run
+            )
+        }
+
+        def render():
+            with impersonate(dataset.learner):
+                CourseAboutRenderStarted.run_filter(context, "about.html")
+
+        run_scenario("HidePartnerCourseAboutPages", render)
+
+
+class TestReceivers:
+    def test_link_user_to_invite(self, dataset, run_scenario):
+        invite = dataset.invite
+        user_data = make_user_data(dataset.learner.id, invite.email)
+        run_scenario(
+            "link_user_to_invite (invited)",
+            lambda: receivers.link_user_to_invite(user_data),
+            rollback=True,
+        )
+        user_data = make_user_data(dataset.learner.id, "uninvited@example.com")
+        run_scenario(
+            "link_user_to_invite (not invited)",
+            lambda: receivers.link_user_to_invite(user_data),
+        )
+
+    def test_update_enrollment_records(self, dataset, run_scenario):
+        learner = dataset.learner
+        enrollment = CourseEnrollmentData(
+            user=make_user_data(learner.id, learner.email),
+            course=CourseData(course_key=dataset.cohort_offering.offering.course_key),
+            mode="verified",
+            is_active=True,
+            creation_date=timezone.now(),
+        )
+        run_scenario(
+            "update_enrollment_records",
+            lambda: receivers.update_enrollment_records(enrollment),
+            rollback=True,
+        )
+
+
+class TestInviteTasks:
+    def test_send_invites(self, dataset, run_scenario):
+        invite_ids = list(
+            models.CohortMembership.objects.filter(cohort=dataset.cohort).values_list(
+                "id", flat=True
+            )[:100]
+        )
+        run_scenario(
+            "trigger_send_cohort_membership_invites (100)",
+            lambda: tasks.trigger_send_cohort_membership_invites(invite_ids),
+        )
+
+    def test_send_pending_invite_reminders(self, dataset, run_scenario, settings):
+        settings.MOGC_PARTNERSHIPS_INVITE_REMINDER_DAYS = 0
+        run_scenario(
+            "send_pending_invite_reminders",
+            tasks.send_pending_invite_reminders,
+            repeat=3,
+            rollback=True,
+        )
+
+    def test_expire_pending_invites(self, dataset, run_scenario, settings):
+        settings.MOGC_PARTNERSHIPS_INVITE_EXPIRY_DAYS = 0
+        run_scenario(
+            "expire_pending_invites",
+            tasks.expire_pending_invites,
+            repeat=3,
+            rollback=True,
+        )
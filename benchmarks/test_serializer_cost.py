@@ -0,0 +1,79 @@
+"""
+Compares the per-row cost of the model and values() serializers.
+
+Both serializers are timed over the same rows, including the queries that fetch
+them, and the values() serializer is expected to be clearly cheaper per row.
+"""
+
+import pytest
+
+from mogc_partnerships import factories, models, serializers
+
+ROWS = 5000
+
+
+def per_row_cost(measure, serialize):
+    return measure(serialize) / ROWS * 1e6
+
+
+@pytest.mark.django_db
+class TestValuesSerializerCost:
+    def _compare(self, measure, queryset, model_serializer, values_serializer):
+        def serialize_models():
+            assert len(model_serializer(queryset.all(), many=True).data) == ROWS
+
+        def serialize_values():
+            rows = values_serializer.project(queryset)
+            assert len(values_serializer(rows, many=True).data) == ROWS
+
+        model_cost = per_row_cost(measure, serialize_models)
+        values_cost = per_row_cost(measure, serialize_values)
+        print(
+            f"{model_serializer.__name__}: {model_cost:.1f}us/row, "
+            f"{values_serializer.__name__}: {values_cost:.1f}us/row"
+        )
+        assert values_cost < model_cost / 2
+
+    def test_cohort_memberships(self, measure):
+        cohort = factories.PartnerCohortFactory()
+        users = factories.UserFactory.build_batch(ROWS)
+        for i, user in enumerate(users):
+            user.username = f"bench-{i}"
+        users = models.CohortMembership.user.field.related_model.objects.bulk_create(
+            users
+        )
+        models.CohortMembership.objects.bulk_create(
+            models.CohortMembership(
+                cohort=cohort,
+                email=user.email,
+                normalized_email=f"{i}.{user.email}".lower(),
+                user=user if i % 2 else None,
+            )
+            for i, user in enumerate(users)
+        )
+
+        self._compare(
+            measure,
+            models.CohortMembership.objects.select_related("cohort__partner", "user"),
+            serializers.CohortMembershipSerializer,
+            serializers.CohortMembershipValuesSerializer,
+        )
+
+    def test_enrollment_records(self, measure):
+        offering = factories.PartnerOfferingFactory()
+        users = factories.UserFactory.build_batch(ROWS)
+        for i, user in enumerate(users):
+            user.username = f"bench-{i}"
+        users = models.EnrollmentRecord.user.field.related_model.objects.bulk_create(
+            users
+        )
+        models.EnrollmentRecord.objects.bulk_create(
+            models.EnrollmentRecord(user=user, offering=offering) for user in users
+        )
+
+        self._compare(
+            measure,
+            models.EnrollmentRecord.objects.select_related("user", "offering__partner"),
+            serializers.EnrollmentRecordSerializer,
+            serializers.EnrollmentRecordValuesSerializer,
+        )
@@ -11,7 +11,15 @@ class MangerInline(admin.TabularInline):
 
 class OfferingInline(admin.StackedInline):
     model = models.PartnerOffering
-    fields = ("course_key", "title", "short_description", "description")
+    fields = (
+        "course_key",
+        "title",
+        "short_description",
+        "description",
+        "start",
+        "end",
+        "self_paced",
+    )
 
 
 @admin.register(models.Partner)
@@ -2,12 +2,20 @@ from django.apps import AppConfig
 from django.utils.translation import gettext_lazy as _
 
 from edx_django_utils.plugins.constants import PluginSettings, PluginSignals, PluginURLs
+from openedx_events.learning import signals as learning_signals
 
 from .patches import patch_skip_activation_email
 
 PROJECT_TYPE_LMS = "lms.djangoapp"
 PROJECT_TYPE_CMS = "cms.djangoapp"
 
+# Older openedx-events releases don't send the grade signals, so their receivers
+# are only registered where the signals exist.
+GRADE_RECEIVERS = [
+    ("update_grade_records", "PERSISTENT_GRADE_SUMMARY_CHANGED"),
+    ("update_passing_status", "COURSE_PASSING_STATUS_UPDATED"),
+]
+
 
 class PartnershipsAppConfig(AppConfig):
     name = "mogc_partnerships"
@@ -61,10 +69,24 @@ class PartnershipsAppConfig(AppConfig):
                             "COURSE_UNENROLLMENT_COMPLETED"
                         ),
                     },
+                    *(
+                        {
+                            PluginSignals.RECEIVER_FUNC_NAME: receiver_func_name,
+                            PluginSignals.SIGNAL_PATH: (
+                                f"openedx_events.learning.signals.{signal_name}"
+                            ),
+                        }
+                        for receiver_func_name, signal_name in GRADE_RECEIVERS
+                        if hasattr(learning_signals, signal_name)
+                    ),
                 ],
             },
         },
     }
 
     def ready(self):
+        from . import caching, compat, generations  # noqa: F401
+
+        compat.load_backend()
+
         patch_skip_activation_email()
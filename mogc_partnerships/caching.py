@@ -0,0 +1,279 @@
+import time
+from functools import partial
+from hashlib import sha256
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import monitoring
+from .conf import get_setting
+from .models import CohortMembership, Partner, PartnerOffering, normalize_email
+
+CACHE_KEY_PREFIX = "mogc_partnerships"
+PARTNER_ORGS_CACHE_KEY = f"{CACHE_KEY_PREFIX}.partner_orgs"
+PARTNER_OFFERINGS_VERSION_CACHE_KEY = f"{CACHE_KEY_PREFIX}.partner_offerings.version"
+PENDING_INVITES_LOADED_CACHE_KEY = f"{CACHE_KEY_PREFIX}.pending_invites.loaded"
+# Seconds that a load of the pending invites may take.
+PENDING_INVITES_LOAD_TIMEOUT = 60 * 5
+
+# Process-local copy of the offering ids for each partner course, with the version
+# of the shared cache entry it was loaded at.
+_partner_offering_ids = (None, {})
+
+
+def make_cache_key(*parts):
+    return ".".join([CACHE_KEY_PREFIX, *(str(part) for part in parts)])
+
+
+def get_partner_orgs():
+    """Returns the set of Open edX orgs that belong to a partner."""
+    orgs = cache.get(PARTNER_ORGS_CACHE_KEY)
+    if orgs is None:
+        orgs = frozenset(Partner.objects.values_list("org", flat=True))
+        cache.set(
+            PARTNER_ORGS_CACHE_KEY, orgs, get_setting("PARTNER_ORGS_CACHE_TIMEOUT")
+        )
+    return orgs
+
+
+@receiver(post_save, sender=Partner)
+@receiver(post_delete, sender=Partner)
+def invalidate_partner_orgs(**kwargs):
+    # Deleting before the write commits would let a concurrent read cache the old
+    # orgs again.
+    transaction.on_commit(partial(cache.delete, PARTNER_ORGS_CACHE_KEY))
+
+
+def get_partner_offering_ids():
+    """
+    Returns a mapping of course ids to the ids of their partner offerings.
+
+    The mapping is kept in process memory and is only reloaded when the version
+    stored in the shared cache changes, so checking whether a course belongs to a
+    partner costs a single cache GET and no queries.
+    """
+    global _partner_offering_ids
+
+    version = cache.get(PARTNER_OFFERINGS_VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(PARTNER_OFFERINGS_VERSION_CACHE_KEY, uuid4().hex, None)
+        version = cache.get(PARTNER_OFFERINGS_VERSION_CACHE_KEY)
+
+    loaded_version, offering_ids = _partner_offering_ids
+    if loaded_version != version:
+        offering_ids = {}
+        for offering_id, course_key in PartnerOffering.objects.values_list(
+            "id", "course_key"
+        ):
+            offering_ids.setdefault(str(course_key), []).append(offering_id)
+        _partner_offering_ids = (version, offering_ids)
+    return offering_ids
+
+
+@receiver(post_save, sender=PartnerOffering)
+@receiver(post_delete, sender=PartnerOffering)
+def invalidate_partner_offering_ids(**kwargs):
+    # A new version set before the write commits could be loaded with the old rows.
+    transaction.on_commit(
+        partial(cache.set, PARTNER_OFFERINGS_VERSION_CACHE_KEY, uuid4().hex, None)
+    )
+
+
+def hash_key_part(value):
+    # Values of unbounded length are hashed to keep keys within length limits.
+    return sha256(value.encode()).hexdigest()
+
+
+def hash_email(email):
+    # Emails are hashed to keep them out of cache keys and within key length limits.
+    return hash_key_part(normalize_email(email))
+
+
+def pending_invite_key(email):
+    return make_cache_key("pending_invites", hash_email(email))
+
+
+def removed_invite_key(email):
+    return make_cache_key("pending_invites", "removed", hash_email(email))
+
+
+def has_pending_invite(email):
+    """
+    Returns whether email has a pending cohort invite.
+
+    Every email with a pending invite has a cache entry, and a marker shows that the
+    entries have been loaded, so the check is a single cache round trip. An entry
+    lost to eviction only means the invitee is sent an activation email. Without
+    the marker, the check falls back to an indexed query and the entries are loaded
+    by a task, so the signup doesn't wait for them.
+    """
+    key = pending_invite_key(email)
+    entries = cache.get_many([PENDING_INVITES_LOADED_CACHE_KEY, key])
+    loaded = PENDING_INVITES_LOADED_CACHE_KEY in entries
+    monitoring.record_cache("caching.pending_invites", hit=loaded)
+    if loaded:
+        return key in entries
+
+    if acquire_lock("refresh_pending_invites", timeout=PENDING_INVITES_LOAD_TIMEOUT):
+        # Imported here, since tasks depends on this module.
+        from .tasks import refresh_pending_invites
+
+        refresh_pending_invites.delay()
+    return CohortMembership.objects.pending().for_emails([email]).exists()
+
+
+def load_pending_invites():
+    """Adds cache entries for every pending invite and marks them as loaded."""
+    if not acquire_lock("load_pending_invites", timeout=PENDING_INVITES_LOAD_TIMEOUT):
+        return
+    try:
+        emails = (
+            CohortMembership.objects.pending()
+            .values_list("normalized_email", flat=True)
+            .distinct()
+        )
+        batch_size = get_setting("MAINTENANCE_BATCH_SIZE")
+        batch = []
+        for email in emails.iterator(chunk_size=batch_size):
+            batch.append(email)
+            if len(batch) == batch_size:
+                set_pending_invites(batch)
+                batch = []
+        set_pending_invites(batch)
+        cache.set(
+            PENDING_INVITES_LOADED_CACHE_KEY,
+            True,
+            get_setting("PENDING_INVITES_CACHE_TIMEOUT"),
+        )
+    finally:
+        release_lock("load_pending_invites")
+
+
+def set_pending_invites(emails):
+    """
+    Adds entries for emails, except those removed during the last load timeout.
+
+    Removals leave a marker before deleting their entry, and the markers are checked
+    after the entries are written, so an invite read as pending just before it was
+    accepted can't leave an entry behind.
+    """
+    keys = {pending_invite_key(email): removed_invite_key(email) for email in emails}
+    if not keys:
+        return
+    cache.set_many(
+        dict.fromkeys(keys, True), get_setting("PENDING_INVITES_CACHE_TIMEOUT")
+    )
+    removed = cache.get_many(list(keys.values()))
+    cache.delete_many(
+        [key for key, removed_key in keys.items() if removed_key in removed]
+    )
+
+
+def add_pending_invites(emails):
+    """Adds entries for emails once the invites have been committed."""
+    transaction.on_commit(partial(set_pending_invites, list(emails)))
+
+
+def remove_pending_invites(emails):
+    """
+    Removes the entries for emails.
+
+    Another pending invite may share an email, but dropping its entry only costs an
+    activation email while a stale entry would leave an account inactive.
+    """
+    emails = list(emails)
+    cache.set_many(
+        {removed_invite_key(email): True for email in emails},
+        PENDING_INVITES_LOAD_TIMEOUT,
+    )
+    cache.delete_many([pending_invite_key(email) for email in emails])
+
+
+@receiver(pre_save, sender=CohortMembership)
+def remove_changed_pending_invite(instance, update_fields=None, **kwargs):
+    """Removes the entry for the stored email when a membership's email changes."""
+    if instance.pk is None or (
+        update_fields is not None and "email" not in update_fields
+    ):
+        return
+    stored = (
+        CohortMembership.objects.filter(pk=instance.pk)
+        .values_list("normalized_email", flat=True)
+        .first()
+    )
+    if stored is not None and stored != instance.normalized_email:
+        remove_pending_invites([stored])
+
+
+@receiver(post_save, sender=CohortMembership)
+def update_pending_invite(instance, **kwargs):
+    if instance.user_id is None:
+        add_pending_invites([instance.email])
+    else:
+        remove_pending_invites([instance.email])
+
+
+@receiver(post_delete, sender=CohortMembership)
+def delete_pending_invite(instance, **kwargs):
+    remove_pending_invites([instance.email])
+
+
+def debounce(key, window):
+    """
+    Claims key for window seconds, returning False if it is already claimed.
+
+    Callers schedule their work window seconds in the future when the claim succeeds
+    and call release_debounce when that work starts, so all events arriving in the
+    meantime are handled by the single trailing run. The claim outlives the window to
+    cover queueing delays, but expires on its own if the trailing run is lost.
+    """
+    return cache.add(make_cache_key("debounce", key), True, window * 2)
+
+
+def release_debounce(key):
+    cache.delete(make_cache_key("debounce", key))
+
+
+def acquire_lock(name, timeout):
+    """Takes a lock shared by all processes, returning False if it is held."""
+    return cache.add(make_cache_key("lock", name), True, timeout)
+
+
+def release_lock(name):
+    cache.delete(make_cache_key("lock", name))
+
+
+def add_to_window(name, member, window):
+    """
+    Adds the string member to the current window-second bucket for name.
+
+    Members are only added once per bucket. Returns the bucket id if this call opened
+    it, in which case the caller must schedule drain_window for that bucket once the
+    window has passed, and None otherwise.
+    """
+    bucket = int(time.time() // window)
+    timeout = window * 10
+    member_key = make_cache_key(name, bucket, "member", hash_key_part(member))
+    if not cache.add(member_key, True, timeout):
+        return None
+
+    size_key = make_cache_key(name, bucket, "size")
+    cache.add(size_key, 0, timeout)
+    slot = cache.incr(size_key)
+    cache.set(make_cache_key(name, bucket, slot), member, timeout)
+    return bucket if slot == 1 else None
+
+
+def drain_window(name, bucket):
+    """Returns and removes the members added to a bucket by add_to_window."""
+    size_key = make_cache_key(name, bucket, "size")
+    slot_keys = [
+        make_cache_key(name, bucket, slot)
+        for slot in range(1, (cache.get(size_key) or 0) + 1)
+    ]
+    members = cache.get_many(slot_keys)
+    cache.delete_many([size_key, *slot_keys])
+    return list(members.values())
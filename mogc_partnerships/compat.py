@@ -1,58 +1,433 @@
 import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from functools import cached_property
+from importlib import import_module
+from itertools import count
+from typing import Optional
+
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from opaque_keys.edx.keys import CourseKey
+
+from .conf import get_setting
+from .monitoring import monitor, record
 
 logger = logging.getLogger(__name__)
 
 ENROLL_ACTION = "enroll"
 UNENROLL_ACTION = "unenroll"
 
+# The backend loaded by PartnershipsAppConfig.ready().
+_backend = None
+
 
 class InvalidEnrollmentAction(Exception):
     pass
 
 
-def make_course_url(course_key):
+def optional_import(path):
+    """Imports a module, returning None if it isn't usable in this service."""
     try:
-        from openedx.features.course_experience.url_helpers import (  # type: ignore
-            get_learning_mfe_home_url,
-        )
+        return import_module(path)
+    except (ImportError, RuntimeError):
+        # Django raises RuntimeError for models of apps that aren't installed, like
+        # the LMS apps in the CMS.
+        logger.info(f"{path} is not available, compat calls using it are disabled")
+        return None
+
+
+class CompatBackend:
+    """
+    Access to the edx-platform features used by this plugin.
+
+    The base class behaves as if edx-platform had no courses, enrollments or grades,
+    which is what the plugin sees where edx-platform isn't installed.
+    """
+
+    # Whether enrollment calls may be made from several threads at once. The
+    # edx-platform calls rely on thread-local request state, like crum's current
+    # request and eventtracking's context, so backends have to opt in.
+    thread_safe = False
 
-        return get_learning_mfe_home_url(course_key)
-    except ImportError:
+    def make_course_url(self, course_key):
         return "/"
 
+    def enroll_email(self, course_key, email):
+        """Enrolls email in a course, returning whether it is now enrolled."""
+        return False
+
+    def unenroll_email(self, course_key, email):
+        """Unenrolls email from a course, returning whether it is still enrolled."""
+        return False
+
+    def get_course_overview_or_none(self, course_id):
+        return None
+
+    def get_course_overviews_for_org(self, org, after_id, page_size):
+        """Returns up to page_size of org's course overviews in id order."""
+        return []
+
+    def get_persistent_course_grades(self, course_key, user_ids):
+        """Returns (percent_grade, passed) for each of user_ids with a grade."""
+        return {}
+
+    def get_course_enrollments(self, course_key, after_id, page_size):
+        """Returns up to page_size (id, user_id, mode, is_active, created) tuples."""
+        return []
+
+
+class EdxPlatformBackend(CompatBackend):
+    """
+    Calls into edx-platform.
+
+    Each module is imported the first time it is needed, since importing
+    edx-platform modules while apps are still loading can fail. Calls that need a
+    module that isn't available in this service, like the LMS apps in the CMS, fall
+    back to the base class.
+    """
+
+    @cached_property
+    def url_helpers(self):
+        return optional_import("openedx.features.course_experience.url_helpers")
+
+    @cached_property
+    def enrollment(self):
+        return optional_import("lms.djangoapps.instructor.enrollment")
+
+    @cached_property
+    def course_overviews_api(self):
+        return optional_import("openedx.core.djangoapps.content.course_overviews.api")
+
+    @cached_property
+    def course_overviews_models(self):
+        return optional_import(
+            "openedx.core.djangoapps.content.course_overviews.models"
+        )
+
+    @cached_property
+    def grades_models(self):
+        return optional_import("lms.djangoapps.grades.models")
+
+    @cached_property
+    def student_models(self):
+        return optional_import("common.djangoapps.student.models")
+
+    def make_course_url(self, course_key):
+        if self.url_helpers is None:
+            return super().make_course_url(course_key)
+        return self.url_helpers.get_learning_mfe_home_url(course_key)
+
+    def enroll_email(self, course_key, email):
+        if self.enrollment is None:
+            return super().enroll_email(course_key, email)
+        _, after_state, _ = self.enrollment.enroll_email(
+            course_key, email, auto_enroll=True
+        )
+        return after_state.enrollment
+
+    def unenroll_email(self, course_key, email):
+        if self.enrollment is None:
+            return super().unenroll_email(course_key, email)
+        _, after_state = self.enrollment.unenroll_email(course_key, email)
+        return after_state.enrollment
+
+    def get_course_overview_or_none(self, course_id):
+        if self.course_overviews_api is None:
+            return super().get_course_overview_or_none(course_id)
+        return self.course_overviews_api.get_course_overview_or_none(course_id)
+
+    def get_course_overviews_for_org(self, org, after_id, page_size):
+        if self.course_overviews_models is None:
+            return super().get_course_overviews_for_org(org, after_id, page_size)
+        course_overviews = self.course_overviews_models.CourseOverview.objects.filter(
+            org=org
+        ).order_by("id")
+        if after_id is not None:
+            course_overviews = course_overviews.filter(id__gt=after_id)
+        return list(course_overviews[:page_size])
+
+    def get_persistent_course_grades(self, course_key, user_ids):
+        if self.grades_models is None:
+            return super().get_persistent_course_grades(course_key, user_ids)
+        grades = self.grades_models.PersistentCourseGrade.objects.filter(
+            course_id=course_key, user_id__in=user_ids
+        ).values_list("user_id", "percent_grade", "passed_timestamp")
+        return {
+            user_id: (percent_grade, passed_timestamp is not None)
+            for user_id, percent_grade, passed_timestamp in grades
+        }
+
+    def get_course_enrollments(self, course_key, after_id, page_size):
+        if self.student_models is None:
+            return super().get_course_enrollments(course_key, after_id, page_size)
+        enrollments = self.student_models.CourseEnrollment.objects.filter(
+            course_id=course_key
+        ).order_by("id")
+        if after_id is not None:
+            enrollments = enrollments.filter(id__gt=after_id)
+        return list(
+            enrollments.values_list("id", "user_id", "mode", "is_active", "created")[
+                :page_size
+            ]
+        )
+
+
+@dataclass
+class StandInCourseOverview:
+    """The CourseOverview fields read by this plugin."""
+
+    id: CourseKey
+    display_name: str = ""
+    short_description: Optional[str] = None
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    self_paced: bool = False
+
+    @property
+    def org(self):
+        return self.id.org
+
+
+class StandInBackend(CompatBackend):
+    """
+    In-memory stand-in for edx-platform, for tests and benchmarks.
+
+    Each call sleeps for latency seconds, which defaults to the
+    MOGC_PARTNERSHIPS_STAND_IN_LATENCY setting, to simulate the cost of the real
+    calls. Courses and grades are added with add_course_overview and set_grade.
+    """
+
+    thread_safe = True
+
+    def __init__(self, latency=None):
+        if latency is None:
+            latency = get_setting("STAND_IN_LATENCY")
+        self.latency = latency
+        self.course_overviews = {}
+        self.grades = {}
+        self.enrollments = {}
+        self.enrollment_ids = count(1)
+
+    def wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def add_course_overview(self, course_overview):
+        self.course_overviews[str(course_overview.id)] = course_overview
+
+    def set_grade(self, course_key, user_id, percent_grade, passed):
+        self.grades[str(course_key), user_id] = (percent_grade, passed)
+
+    def make_course_url(self, course_key):
+        self.wait()
+        return f"/learning/course/{course_key}/home"
+
+    def set_enrollment(self, course_key, email, is_active):
+        key = (str(course_key), email)
+        if key not in self.enrollments:
+            user_id = (
+                get_user_model()
+                .objects.filter(email=email)
+                .values_list("id", flat=True)
+                .first()
+            )
+            self.enrollments[key] = {
+                "id": next(self.enrollment_ids),
+                "user_id": user_id,
+                "mode": "audit",
+                "created": timezone.now(),
+            }
+        self.enrollments[key]["is_active"] = is_active
+        return is_active
+
+    def enroll_email(self, course_key, email):
+        self.wait()
+        return self.set_enrollment(course_key, email, True)
+
+    def unenroll_email(self, course_key, email):
+        self.wait()
+        if (str(course_key), email) not in self.enrollments:
+            return False
+        return self.set_enrollment(course_key, email, False)
+
+    def get_course_overview_or_none(self, course_id):
+        self.wait()
+        return self.course_overviews.get(str(course_id))
+
+    def get_course_overviews_for_org(self, org, after_id, page_size):
+        self.wait()
+        course_overviews = sorted(
+            (
+                course_overview
+                for course_overview in self.course_overviews.values()
+                if course_overview.org == org
+                and (after_id is None or str(course_overview.id) > str(after_id))
+            ),
+            key=lambda course_overview: str(course_overview.id),
+        )
+        return course_overviews[:page_size]
+
+    def get_persistent_course_grades(self, course_key, user_ids):
+        self.wait()
+        return {
+            user_id: self.grades[str(course_key), user_id]
+            for user_id in user_ids
+            if (str(course_key), user_id) in self.grades
+        }
+
+    def get_course_enrollments(self, course_key, after_id, page_size):
+        self.wait()
+        enrollments = sorted(
+            (
+                enrollment["id"],
+                enrollment["user_id"],
+                enrollment["mode"],
+                enrollment["is_active"],
+                enrollment["created"],
+            )
+            for (course_id, _), enrollment in self.enrollments.items()
+            if course_id == str(course_key)
+            and enrollment["user_id"] is not None
+            and (after_id is None or enrollment["id"] > after_id)
+        )
+        return enrollments[:page_size]
+
+
+def load_backend():
+    """Loads the backend named by the COMPAT_BACKEND setting."""
+    global _backend
+    _backend = import_string(get_setting("COMPAT_BACKEND"))()
+    return _backend
+
+
+def get_backend():
+    if _backend is None:
+        return load_backend()
+    return _backend
+
+
+def make_course_url(course_key):
+    return get_backend().make_course_url(course_key)
+
+
+def get_enrollment_method(backend, action):
+    if action == ENROLL_ACTION:
+        return backend.enroll_email
+    if action == UNENROLL_ACTION:
+        return backend.unenroll_email
+    logger.error(InvalidEnrollmentAction(f"{action} is not a valid enrollment option"))
+    return lambda course_key, email: False
+
 
 def update_student_enrollment(course_key, student_email, action):
-    result = {
+    backend = get_backend()
+    return {
         "course_id": str(course_key),
-        "course_home_url": make_course_url(course_key),
+        "course_home_url": backend.make_course_url(course_key),
+        "enrolled": get_enrollment_method(backend, action)(course_key, student_email),
     }
 
-    try:
-        from lms.djangoapps.instructor import enrollment  # type: ignore
 
-        if action == ENROLL_ACTION:
-            previous_state, after_state, enrollment_obj = enrollment.enroll_email(
-                course_key, student_email, auto_enroll=True
-            )
-        elif action == UNENROLL_ACTION:
-            previous_state, after_state = enrollment.unenroll_email(
-                course_key, student_email
-            )
-        else:
-            raise InvalidEnrollmentAction(f"{action} is not a valid enrollment option")
+@monitor("compat.update_student_enrollments")
+def update_student_enrollments(pairs, action):
+    """
+    Updates the enrollment of each (course_key, email) pair.
+
+    Pairs are grouped by course, so each course URL is built once, and the groups
+    are split into chunks that run in a pool of up to ENROLLMENT_WORKERS threads if
+    the backend is thread safe. Inside a transaction the calls run in the calling
+    thread instead, since writes made from other threads would not be part of it.
+    Returns a result like those of update_student_enrollment, plus the email, for
+    each pair in order.
+    """
+    pairs = list(pairs)
+    backend = get_backend()
+    update_enrollment = get_enrollment_method(backend, action)
+
+    indexes_by_course = {}
+    for index, (course_key, _) in enumerate(pairs):
+        indexes_by_course.setdefault(str(course_key), []).append(index)
 
-        result.update({"enrolled": after_state.enrollment})
-    except (ImportError, InvalidEnrollmentAction) as e:
-        logger.error(e)
-        result.update({"enrolled": False})
+    workers = get_setting("ENROLLMENT_WORKERS")
+    threaded = (
+        backend.thread_safe
+        and workers > 1
+        and len(pairs) > 1
+        and not transaction.get_connection().in_atomic_block
+    )
+    chunk_size = math.ceil(len(pairs) / workers) if threaded else len(pairs)
+    chunks = [
+        indexes[start : start + chunk_size]
+        for indexes in indexes_by_course.values()
+        for start in range(0, len(indexes), chunk_size)
+    ]
 
-    return result
+    record(
+        "compat.update_student_enrollments",
+        batch_size=len(pairs),
+        chunks=len(chunks),
+        threaded=int(threaded),
+    )
+    results = [None] * len(pairs)
+
+    def update_chunk(indexes):
+        course_key = pairs[indexes[0]][0]
+        course_home_url = backend.make_course_url(course_key)
+        try:
+            for index in indexes:
+                email = pairs[index][1]
+                results[index] = {
+                    "course_id": str(course_key),
+                    "email": email,
+                    "course_home_url": course_home_url,
+                    "enrolled": update_enrollment(course_key, email),
+                }
+        finally:
+            if threaded:
+                # Threads get their own database connections, which must be closed.
+                connections.close_all()
+
+    if threaded:
+        with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            list(executor.map(update_chunk, chunks))
+    else:
+        for chunk in chunks:
+            update_chunk(chunk)
+    return results
 
 
 def get_course_overview_or_none(course_id):
-    try:
-        from openedx.core.djangoapps.content.course_overviews import api  # type: ignore
+    return get_backend().get_course_overview_or_none(course_id)
 
-        return api.get_course_overview_or_none(course_id)
-    except ImportError:
-        return None
+
+def get_course_overviews_for_org(org, page_size):
+    """Yields lists of up to page_size course overviews for org, ordered by id."""
+    backend = get_backend()
+    last_id = None
+    while True:
+        page = backend.get_course_overviews_for_org(org, last_id, page_size)
+        if not page:
+            return
+        yield page
+        last_id = page[-1].id
+
+
+def get_persistent_course_grades(course_key, user_ids):
+    """Returns (percent_grade, passed) for each of user_ids with a persisted grade."""
+    return get_backend().get_persistent_course_grades(course_key, user_ids)
+
+
+def get_course_enrollments(course_key, after_id, page_size):
+    """
+    Returns a page of a course's enrollments in id order, starting after after_id.
+
+    Each enrollment is an (id, user_id, mode, is_active, created) tuple.
+    """
+    return get_backend().get_course_enrollments(course_key, after_id, page_size)
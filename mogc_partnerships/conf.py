@@ -0,0 +1,51 @@
+from django.conf import settings
+
+SETTINGS_PREFIX = "MOGC_PARTNERSHIPS_"
+
+DEFAULTS = {
+    # Pending invites older than this many days receive a single reminder.
+    "INVITE_REMINDER_DAYS": 7,
+    # Pending invites older than this many days are removed.
+    "INVITE_EXPIRY_DAYS": 90,
+    # Number of rows handled per batch by periodic maintenance tasks.
+    "MAINTENANCE_BATCH_SIZE": 500,
+    # Seconds that the set of partner orgs may be served from the cache.
+    "PARTNER_ORGS_CACHE_TIMEOUT": 60 * 60,
+    # Course publishes within this many seconds are collapsed into one offering sync.
+    "OFFERING_SYNC_DEBOUNCE_SECONDS": 60,
+    # Queue enrollment events and apply them in bulk instead of during the request.
+    "BUFFER_ENROLLMENT_EVENTS": False,
+    # Buffered enrollment events are flushed whenever this many have been queued.
+    "ENROLLMENT_EVENT_FLUSH_SIZE": 500,
+    # Grade changes for a learner and course within this many seconds are coalesced.
+    "GRADE_UPDATE_WINDOW_SECONDS": 30,
+    # Pages of LMS enrollments each enrollment reconciliation task handles before
+    # re-queueing itself to continue from its cursor.
+    "ENROLLMENT_RECONCILIATION_PAGES_PER_TASK": 20,
+    # Seconds that the cached emails with pending invites are kept before they are
+    # loaded again.
+    "PENDING_INVITES_CACHE_TIMEOUT": 60 * 60 * 24,
+    # Seconds that a learner home document may be served from the cache. Entries
+    # are replaced as soon as the learner's partnership data changes.
+    "LEARNER_HOME_CACHE_TIMEOUT": 60 * 60,
+    # Seconds that the course URL a continue learning link redirects to is cached.
+    "CONTINUE_LEARNING_CACHE_TIMEOUT": 60 * 60 * 24,
+    # Dotted path of the class used to call into edx-platform. StandInBackend keeps
+    # everything in memory for running without edx-platform.
+    "COMPAT_BACKEND": "mogc_partnerships.compat.EdxPlatformBackend",
+    # Threads used for batches of enrollment changes made outside of transactions.
+    "ENROLLMENT_WORKERS": 4,
+    # Report timings, query counts and sizes of hot paths as custom attributes.
+    "MONITORING_ENABLED": True,
+    # Let staff request SQL profiles of plugin requests with a header or parameter.
+    "SQL_PROFILING_ENABLED": False,
+    # Seconds that a requested SQL profile can be read back for.
+    "SQL_PROFILE_CACHE_TIMEOUT": 60 * 60,
+    # Seconds that each StandInBackend call sleeps to simulate edx-platform.
+    "STAND_IN_LATENCY": 0,
+}
+
+
+def get_setting(name):
+    """Returns a MOGC_PARTNERSHIPS_* setting, falling back to its default."""
+    return getattr(settings, SETTINGS_PREFIX + name, DEFAULTS[name])
@@ -0,0 +1,179 @@
+"""
+Generation counters for invalidating cached partnership data.
+
+Cached values are stored under keys stamped with the generations of the partners,
+cohorts, cohort offerings and users they were built from. Every write moves the
+scopes it touches to a new generation once it commits, so stale entries are never
+read again and simply expire. Model signals cover single-object writes; bulk writes,
+which bypass them, call bump directly.
+"""
+
+import time
+from functools import partial
+from hashlib import sha256
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import make_cache_key
+from .models import (
+    CohortMembership,
+    CohortOffering,
+    EnrollmentRecord,
+    Partner,
+    PartnerCohort,
+    PartnerManagementMembership,
+    PartnerOffering,
+)
+
+PARTNER = "partner"
+COHORT = "cohort"
+COHORT_OFFERING = "cohort_offering"
+USER = "user"
+
+
+def generation_key(namespace, id):
+    return make_cache_key("generation", namespace, id)
+
+
+def get_generations(scopes):
+    """Returns the current generation of each (namespace, id) scope."""
+    keys = [generation_key(*scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    missing = [key for key in keys if key not in generations]
+    if missing:
+        # Counters start from the clock, so one that was evicted never returns to
+        # a generation that an existing entry was stamped with.
+        for key in missing:
+            cache.add(key, time.time_ns(), None)
+        generations.update(cache.get_many(missing))
+    return [generations[key] for key in keys]
+
+
+def get_stamp(scopes):
+    """Returns a string that changes whenever any of scopes is bumped."""
+    generations = ".".join(str(generation) for generation in get_generations(scopes))
+    return sha256(generations.encode()).hexdigest()
+
+
+def versioned_key(name, *parts, stamp):
+    """Returns a cache key for name and parts that is only valid for stamp."""
+    return make_cache_key(name, *parts, stamp)
+
+
+def increment(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+
+
+def bump(namespace, ids):
+    """Moves the scopes for ids to a new generation once the transaction commits."""
+    keys = [generation_key(namespace, id) for id in set(ids) - {None}]
+    if keys:
+        transaction.on_commit(partial(increment, keys))
+
+
+def get_user_scopes(user_id):
+    """
+    Returns the scopes that partnership data seen by a user is built from.
+
+    These are the user and every partner they manage or have a cohort membership
+    with. The partner ids are cached along with the user generation they were read
+    at, which changes whenever the user's memberships do.
+    """
+    user_key = generation_key(USER, user_id)
+    partners_key = make_cache_key("user_partners", user_id)
+    entries = cache.get_many([user_key, partners_key])
+    generation, partner_ids = entries.get(partners_key, (None, None))
+    if generation is None or generation != entries.get(user_key):
+        # Read the generation first, so a write committed during the queries
+        # makes the entry stale instead of being missed.
+        (generation,) = get_generations([(USER, user_id)])
+        partner_ids = set(
+            CohortMembership.objects.filter(user_id=user_id).values_list(
+                "cohort__partner_id", flat=True
+            )
+        )
+        partner_ids.update(
+            PartnerManagementMembership.objects.filter(user_id=user_id).values_list(
+                "partner_id", flat=True
+            )
+        )
+        cache.set(partners_key, (generation, sorted(partner_ids)), None)
+    return [(USER, user_id), *((PARTNER, partner_id) for partner_id in partner_ids)]
+
+
+def get_user_etag(request, *args, **kwargs):
+    """Returns an ETag for partnership data as seen by the requesting user."""
+    return get_stamp(get_user_scopes(request.user.id))
+
+
+@receiver(post_save, sender=Partner)
+@receiver(post_delete, sender=Partner)
+def bump_partner(instance, **kwargs):
+    bump(PARTNER, [instance.id])
+
+
+@receiver(post_save, sender=PartnerOffering)
+@receiver(post_delete, sender=PartnerOffering)
+def bump_offering_partner(instance, **kwargs):
+    bump(PARTNER, [instance.partner_id])
+
+
+@receiver(post_save, sender=PartnerOffering)
+def bump_offering_cohort_offerings(instance, created, **kwargs):
+    # New offerings have no cohort offerings yet, and deleting an offering deletes
+    # its cohort offerings, which bump themselves.
+    if not created:
+        bump(
+            COHORT_OFFERING,
+            CohortOffering.objects.filter(offering=instance).values_list(
+                "id", flat=True
+            ),
+        )
+
+
+@receiver(post_save, sender=PartnerCohort)
+@receiver(post_delete, sender=PartnerCohort)
+def bump_cohort(instance, **kwargs):
+    bump(COHORT, [instance.id])
+    bump(PARTNER, [instance.partner_id])
+
+
+@receiver(post_save, sender=CohortOffering)
+@receiver(post_delete, sender=CohortOffering)
+def bump_cohort_offering(instance, **kwargs):
+    bump(COHORT_OFFERING, [instance.id])
+    bump(COHORT, [instance.cohort_id])
+    if CohortOffering.cohort.is_cached(instance):
+        partner_ids = [instance.cohort.partner_id]
+    else:
+        partner_ids = PartnerCohort.objects.filter(id=instance.cohort_id).values_list(
+            "partner_id", flat=True
+        )
+    bump(PARTNER, partner_ids)
+
+
+@receiver(post_save, sender=CohortMembership)
+@receiver(post_delete, sender=CohortMembership)
+def bump_membership(instance, **kwargs):
+    bump(COHORT, [instance.cohort_id])
+    bump(USER, [instance.user_id])
+
+
+@receiver(post_save, sender=PartnerManagementMembership)
+@receiver(post_delete, sender=PartnerManagementMembership)
+def bump_management_membership(instance, **kwargs):
+    bump(PARTNER, [instance.partner_id])
+    bump(USER, [instance.user_id])
+
+
+@receiver(post_save, sender=EnrollmentRecord)
+@receiver(post_delete, sender=EnrollmentRecord)
+def bump_enrollment_record(instance, **kwargs):
+    bump(USER, [instance.user_id])
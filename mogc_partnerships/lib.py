@@ -1,3 +1,9 @@
+from functools import reduce
+from operator import or_
+
+from django.db import connections, router, transaction
+from django.db.models import Q
+
 from rest_framework.exceptions import PermissionDenied
 
 from .models import PartnerCohort
@@ -12,3 +18,72 @@ def get_cohort(user, cohort_uuid):
         return cohort
     except PartnerCohort.DoesNotExist:
         raise PermissionDenied("Partner cohort does not exist")
+
+
+def iterate_pk_batches(queryset, batch_size):
+    """
+    Yields lists of primary keys from queryset, batch_size at a time.
+
+    Batches are selected with keyset pagination (pk > last seen pk) rather than
+    offsets, so each query is an index range scan regardless of how far into the
+    table we are, and callers may update or delete the yielded rows between
+    batches without rows being skipped.
+    """
+    queryset = queryset.order_by("pk").values_list("pk", flat=True)
+    last_pk = None
+    while True:
+        batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        pks = list(batch[:batch_size])
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def bulk_upsert(model, objs, unique_fields, update_fields, batch_size=None):
+    """
+    Inserts objs, updating update_fields on rows that conflict on unique_fields.
+
+    Uses a native INSERT ... ON CONFLICT/ON DUPLICATE KEY UPDATE where Django and the
+    database support it. Older Django versions fall back to reading the conflicting
+    rows and splitting objs into a bulk update and a bulk insert.
+    """
+    if not objs:
+        return
+    db = router.db_for_write(model)
+    manager = model._default_manager.db_manager(db)
+    features = connections[db].features
+    if getattr(features, "supports_update_conflicts", False):
+        options = {"update_conflicts": True, "update_fields": update_fields}
+        if features.supports_update_conflicts_with_target:
+            options["unique_fields"] = unique_fields
+        manager.bulk_create(objs, batch_size=batch_size, **options)
+        return
+
+    unique_attnames = [model._meta.get_field(name).attname for name in unique_fields]
+
+    def unique_key(obj):
+        return tuple(getattr(obj, attname) for attname in unique_attnames)
+
+    with transaction.atomic(using=db):
+        lookup = reduce(
+            or_, (Q(**dict(zip(unique_attnames, unique_key(obj)))) for obj in objs)
+        )
+        existing_pks = {
+            tuple(row[:-1]): row[-1]
+            for row in manager.filter(lookup).values_list(*unique_attnames, "pk")
+        }
+        new_objs = []
+        existing_objs = []
+        for obj in objs:
+            obj.pk = existing_pks.get(unique_key(obj))
+            if obj.pk is None:
+                new_objs.append(obj)
+                continue
+            # bulk_update skips pre_save, which is what maintains auto_now fields.
+            for name in update_fields:
+                field = model._meta.get_field(name)
+                setattr(obj, field.attname, field.pre_save(obj, add=False))
+            existing_objs.append(obj)
+        manager.bulk_create(new_objs, batch_size=batch_size, ignore_conflicts=True)
+        manager.bulk_update(existing_objs, update_fields, batch_size=batch_size)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from mogc_partnerships.models import PartnerOffering
+from mogc_partnerships.tasks import backfill_course_grades
+
+
+class Command(BaseCommand):
+    help = "Copies persisted LMS grades to partner enrollment records."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            action="append",
+            dest="course_ids",
+            metavar="COURSE_ID",
+            help="Only backfill the given course. May be repeated.",
+        )
+
+    def handle(self, *args, course_ids=None, **options):
+        if not course_ids:
+            course_keys = (
+                PartnerOffering.objects.order_by("course_key")
+                .values_list("course_key", flat=True)
+                .distinct()
+            )
+            course_ids = [str(course_key) for course_key in course_keys]
+
+        for course_id in course_ids:
+            updated = backfill_course_grades(course_id)
+            self.stdout.write(f"{course_id}: {updated} records updated")
@@ -0,0 +1,70 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from mogc_partnerships.models import Partner
+from mogc_partnerships.tasks import reconcile_partner_offerings
+
+
+def reconcile_in_thread(partner_id, dry_run):
+    try:
+        return reconcile_partner_offerings(partner_id, dry_run=dry_run)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Creates and updates partner offerings to match published courses."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--partner",
+            action="append",
+            dest="partners",
+            metavar="SLUG",
+            help="Only reconcile the given partner. May be repeated.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the differences without writing them.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of partners to reconcile in parallel.",
+        )
+
+    def handle(self, *args, partners=None, dry_run=False, workers=1, **options):
+        queryset = Partner.objects.active()
+        if partners:
+            queryset = queryset.filter(slug__in=partners)
+        partner_ids = list(queryset.values_list("id", flat=True))
+        if partners and len(partner_ids) != len(set(partners)):
+            raise CommandError("Unknown or inactive partner given.")
+
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                diffs = list(
+                    executor.map(
+                        reconcile_in_thread, partner_ids, [dry_run] * len(partner_ids)
+                    )
+                )
+        else:
+            diffs = [
+                reconcile_partner_offerings(partner_id, dry_run=dry_run)
+                for partner_id in partner_ids
+            ]
+
+        for diff in diffs:
+            self.stdout.write(
+                f"{diff['partner']}: {len(diff['created'])} created, "
+                f"{len(diff['updated'])} updated, {diff['unchanged']} unchanged"
+            )
+            if dry_run:
+                for course_id in diff["created"]:
+                    self.stdout.write(f"  + {course_id}")
+                for course_id in diff["updated"]:
+                    self.stdout.write(f"  ~ {course_id}")
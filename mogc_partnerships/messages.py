@@ -36,9 +36,12 @@ def send_message(notification_type, member, context):
         raise (e)
 
 
-def send_cohort_membership_invite(member):
+def send_cohort_membership_invite(member, is_reminder=False):
     """
     Triggers an invitation email to new users in a cohort.
+
+    Reminders for invites that are still pending reuse the invitation message, with
+    is_reminder set in the context so templates can adjust their wording.
     """
     cohort = member.cohort
     partner = cohort.partner
@@ -63,6 +66,7 @@ def send_cohort_membership_invite(member):
             "org": partner.org,
         },
         "login_url": login_url,
+        "is_reminder": is_reminder,
     }
 
     send_message(cohort_membership_invite, member, context)
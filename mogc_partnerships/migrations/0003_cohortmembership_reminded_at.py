@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mogc_partnerships", "0002_auto_20240703_1419"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cohortmembership",
+            name="reminded_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
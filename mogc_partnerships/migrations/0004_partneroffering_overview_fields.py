@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mogc_partnerships", "0003_cohortmembership_reminded_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="partneroffering",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                help_text="A hash of the course overview fields last synced to this offering.",
+                max_length=64,
+            ),
+        ),
+        migrations.AddField(
+            model_name="partneroffering",
+            name="end",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="partneroffering",
+            name="self_paced",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="partneroffering",
+            name="start",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
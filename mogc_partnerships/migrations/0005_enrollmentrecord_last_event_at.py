@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mogc_partnerships", "0004_partneroffering_overview_fields"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="enrollmentrecord",
+            name="last_event_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When the enrollment event last applied to this record was sent.",
+                null=True,
+            ),
+        ),
+    ]
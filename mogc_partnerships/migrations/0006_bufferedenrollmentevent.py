@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mogc_partnerships", "0005_enrollmentrecord_last_event_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BufferedEnrollmentEvent",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("user_id", models.IntegerField()),
+                ("course_key", models.CharField(max_length=255)),
+                ("mode", models.CharField(max_length=64)),
+                ("is_active", models.BooleanField()),
+                ("creation_date", models.DateTimeField()),
+                ("event_time", models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mogc_partnerships", "0006_bufferedenrollmentevent"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="cohortmembership",
+            index=models.Index(fields=["email"], name="cohortmembership_email_idx"),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mogc_partnerships", "0007_cohortmembership_email_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cohortmembership",
+            name="normalized_email",
+            field=models.EmailField(
+                default="",
+                editable=False,
+                help_text="Lowercased email used for case-insensitive lookups.",
+                max_length=254,
+            ),
+            preserve_default=False,
+        ),
+    ]
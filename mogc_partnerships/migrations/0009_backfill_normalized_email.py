@@ -0,0 +1,68 @@
+from django.db import migrations
+from django.db.models import Count, F
+
+BATCH_SIZE = 1000
+
+
+def backfill_normalized_email(apps, schema_editor):
+    CohortMembership = apps.get_model("mogc_partnerships", "CohortMembership")
+    memberships = CohortMembership.objects.order_by("pk")
+
+    last_pk = 0
+    while True:
+        batch = list(
+            memberships.filter(pk__gt=last_pk).only("pk", "email")[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for membership in batch:
+            membership.normalized_email = membership.email.strip().lower()
+        CohortMembership.objects.bulk_update(batch, ["normalized_email"])
+        last_pk = batch[-1].pk
+
+    # Memberships that only differ in case are duplicates of each other. Keep the
+    # membership that is linked to an account, or else the oldest one, and delete
+    # the duplicate invites. Memberships linked to different accounts can't be
+    # merged without losing one of the learners, so they have to be resolved by
+    # hand before the unique constraint can be added.
+    duplicates = (
+        CohortMembership.objects.values("cohort_id", "normalized_email")
+        .annotate(count=Count("pk"))
+        .filter(count__gt=1)
+    )
+    duplicate_invite_pks = []
+    conflicts = []
+    for duplicate in duplicates:
+        keep, *others = CohortMembership.objects.filter(
+            cohort_id=duplicate["cohort_id"],
+            normalized_email=duplicate["normalized_email"],
+        ).order_by(F("user").asc(nulls_last=True), "created_at", "pk")
+        duplicate_invite_pks += [other.pk for other in others if other.user_id is None]
+        linked = [other for other in others if other.user_id is not None]
+        if linked:
+            conflicts.append(
+                f"cohort {duplicate['cohort_id']}: "
+                + ", ".join(
+                    f"membership {membership.pk} ({membership.email}, "
+                    f"user {membership.user_id})"
+                    for membership in [keep, *linked]
+                )
+            )
+    if conflicts:
+        raise RuntimeError(
+            "These cohort memberships are linked to different accounts whose emails "
+            "only differ in case. Delete all but one membership in each cohort and "
+            "run the migration again.\n" + "\n".join(conflicts)
+        )
+    CohortMembership.objects.filter(pk__in=duplicate_invite_pks).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mogc_partnerships", "0008_cohortmembership_normalized_email"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_normalized_email, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mogc_partnerships", "0009_backfill_normalized_email"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="cohortmembership",
+            name="unique_email_per_cohort",
+        ),
+        migrations.RemoveIndex(
+            model_name="cohortmembership",
+            name="cohortmembership_email_idx",
+        ),
+        migrations.AddIndex(
+            model_name="cohortmembership",
+            index=models.Index(
+                fields=["normalized_email"], name="cohortmember_norm_email_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="cohortmembership",
+            constraint=models.UniqueConstraint(
+                fields=("cohort", "normalized_email"),
+                name="unique_normalized_email_per_cohort",
+            ),
+        ),
+    ]
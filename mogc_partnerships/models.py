@@ -10,6 +10,11 @@ from opaque_keys.edx.django.models import CourseKeyField
 from . import enums
 
 
+def normalize_email(email):
+    """Returns the form of an email address used to match invites to accounts."""
+    return email.strip().lower()
+
+
 class TimeStampedModel(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     modified_at = models.DateTimeField(auto_now=True)
@@ -27,13 +32,16 @@ class PartnerQuerySet(models.QuerySet):
 
     def for_user(self, user):
         """Keeps only partners where the given user is a manager or member."""
-        user_cohort_memberships = user.memberships.all()
-        membership_partner_ids = user_cohort_memberships.values_list(
-            "cohort__partner_id", flat=True
+        membership_partner_ids = CohortMembership.objects.filter(user=user).values(
+            "cohort__partner_id"
+        )
+        management_partner_ids = PartnerManagementMembership.objects.filter(
+            user=user
+        ).values("partner_id")
+        return self.filter(
+            models.Q(id__in=membership_partner_ids)
+            | models.Q(id__in=management_partner_ids)
         )
-        management_partner_ids = user.partners.values_list("id", flat=True)
-        all_partner_ids = list(membership_partner_ids) + list(management_partner_ids)
-        return self.filter(id__in=all_partner_ids)
 
 
 class Partner(TimeStampedModel):
@@ -90,6 +98,14 @@ class PartnerOffering(TimeStampedModel):
     title = models.CharField(max_length=255)
     short_description = models.CharField(max_length=500)
     description = models.TextField()
+    start = models.DateTimeField(null=True, blank=True)
+    end = models.DateTimeField(null=True, blank=True)
+    self_paced = models.BooleanField(default=False)
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text="A hash of the course overview fields last synced to this offering.",
+    )
 
     class Meta:
         constraints = [
@@ -116,6 +132,23 @@ class PartnerCohort(TimeStampedModel):
         return f"{self.name} ({self.uuid})"
 
 
+class CohortOfferingQuerySet(models.QuerySet):
+    """Custom QuerySet for CohortOffering objects."""
+
+    def for_user(self, user):
+        """Keeps only offerings in cohorts the user manages or is active in."""
+        managed_partner_ids = PartnerManagementMembership.objects.filter(
+            user=user
+        ).values("partner_id")
+        member_cohort_ids = CohortMembership.objects.filter(
+            user=user, active=True
+        ).values("cohort_id")
+        return self.filter(
+            models.Q(cohort__partner_id__in=managed_partner_ids)
+            | models.Q(cohort_id__in=member_cohort_ids)
+        )
+
+
 class CohortOffering(TimeStampedModel):
     """A course offered to learners through a cohort."""
 
@@ -124,6 +157,8 @@ class CohortOffering(TimeStampedModel):
     )
     offering = models.ForeignKey(PartnerOffering, on_delete=models.CASCADE)
 
+    objects = CohortOfferingQuerySet.as_manager()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -151,6 +186,12 @@ class CohortMembershipQuerySet(models.QuerySet):
     def pending(self):
         return self.filter(user=None)
 
+    def for_emails(self, emails):
+        """Keeps only memberships for the given emails, ignoring case."""
+        return self.filter(
+            normalized_email__in={normalize_email(email) for email in emails}
+        )
+
 
 class CohortMembership(TimeStampedModel):
     """A learner's membership in a cohort.
@@ -163,6 +204,9 @@ class CohortMembership(TimeStampedModel):
         PartnerCohort, related_name="memberships", on_delete=models.CASCADE
     )
     email = models.EmailField()
+    normalized_email = models.EmailField(
+        editable=False, help_text="Lowercased email used for case-insensitive lookups."
+    )
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         related_name="memberships",
@@ -171,30 +215,49 @@ class CohortMembership(TimeStampedModel):
         blank=True,
     )
     active = models.BooleanField(default=True)
+    reminded_at = models.DateTimeField(null=True, blank=True)
 
     objects = CohortMembershipQuerySet.as_manager()
 
     class Meta:
         constraints = [
             models.UniqueConstraint(
-                fields=["cohort", "email"], name="unique_email_per_cohort"
+                fields=["cohort", "normalized_email"],
+                name="unique_normalized_email_per_cohort",
             ),
             models.UniqueConstraint(
                 fields=["cohort", "user"], name="unique_user_per_cohort"
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=["normalized_email"], name="cohortmember_norm_email_idx"
+            )
+        ]
 
-    @property
-    def status(self):
-        if not self.active:
+    @staticmethod
+    def get_status(active, user_id):
+        """Returns the status of a membership from its active flag and user id."""
+        if not active:
             return enums.CohortMembershipStatus.DEACTIVATED.value
-        if self.user is not None:
+        if user_id is not None:
             return enums.CohortMembershipStatus.ACTIVATED.value
         return enums.CohortMembershipStatus.INVITED.value
 
+    @property
+    def status(self):
+        return self.get_status(self.active, self.user_id)
+
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        self.normalized_email = normalize_email(self.email)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "email" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "normalized_email"}
+        super().save(*args, **kwargs)
+
 
 class EnrollmentRecordQuerySet(models.QuerySet):
     """Custom QuerySet for EnrollmentRecord models."""
@@ -221,6 +284,11 @@ class EnrollmentRecord(TimeStampedModel):
     is_successful = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     creation_date = models.DateTimeField(default=timezone.now)
+    last_event_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the enrollment event last applied to this record was sent.",
+    )
 
     objects = EnrollmentRecordQuerySet.as_manager()
 
@@ -233,3 +301,22 @@ class EnrollmentRecord(TimeStampedModel):
 
     def __str__(self):
         return f"{self.user} in {self.offering} - active: {self.is_active}"
+
+
+class BufferedEnrollmentEvent(models.Model):
+    """An enrollment event waiting to be applied to EnrollmentRecords in bulk.
+
+    Rows are written in place of EnrollmentRecord updates when enrollment events are
+    buffered, so they deliberately have no foreign keys or indexes beyond the primary
+    key to keep inserts cheap.
+    """
+
+    user_id = models.IntegerField()
+    course_key = models.CharField(max_length=255)
+    mode = models.CharField(max_length=64)
+    is_active = models.BooleanField()
+    creation_date = models.DateTimeField()
+    event_time = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.user_id} in {self.course_key} - active: {self.is_active}"
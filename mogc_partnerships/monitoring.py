@@ -0,0 +1,114 @@
+"""
+Custom attributes for the time the plugin adds to LMS requests and tasks.
+
+Attributes are named mogc_partnerships.<path>.<measure>, where path is the kind and
+name of a hot path, like views.partner_list or receivers.link_user_to_invite.
+Measures are summed with accumulate, so a path that runs several times in one
+request or task reports totals. Everything is skipped unless MONITORING_ENABLED is
+set.
+"""
+
+import time
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from django.db import connections
+
+from edx_django_utils.monitoring import accumulate, function_trace
+
+from .conf import get_setting
+
+PREFIX = "mogc_partnerships"
+
+
+def is_enabled():
+    return get_setting("MONITORING_ENABLED")
+
+
+def attribute_name(path, measure):
+    return f"{PREFIX}.{path}.{measure}"
+
+
+def record(path, **measures):
+    """Adds measures, such as rows handled or batch sizes, to path's totals."""
+    if not is_enabled():
+        return
+    for measure, value in measures.items():
+        accumulate(attribute_name(path, measure), value)
+
+
+def record_cache(path, hit):
+    """Counts a cache lookup made for path as a hit or a miss."""
+    record(path, **{"cache_hits" if hit else "cache_misses": 1})
+
+
+class QueryCounter:
+    """Database execute wrapper that counts queries and the time spent on them."""
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+@contextmanager
+def monitor(path):
+    """
+    Traces a block as path, recording its calls, duration, queries and DB time.
+
+    Also works as a decorator. Queries made from other threads are not counted.
+    """
+    if not is_enabled():
+        yield
+        return
+
+    counter = QueryCounter()
+    start = time.perf_counter()
+    try:
+        with function_trace(f"{PREFIX}.{path}"), ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            yield
+    finally:
+        record(
+            path,
+            calls=1,
+            duration_ms=(time.perf_counter() - start) * 1000,
+            queries=counter.queries,
+            db_ms=counter.seconds * 1000,
+        )
+
+
+def count_rows(data):
+    """Returns the number of rows in a list or paginated response, if it is one."""
+    if isinstance(data, dict):
+        data = data.get("results")
+    if isinstance(data, list):
+        return len(data)
+    return None
+
+
+def monitor_view(name):
+    """Decorates a view to be monitored as views.<name>, with the rows it returns."""
+    path = f"views.{name}"
+
+    def decorator(view):
+        @wraps(view)
+        def monitored_view(*args, **kwargs):
+            with monitor(path):
+                response = view(*args, **kwargs)
+            rows = count_rows(getattr(response, "data", None))
+            if rows is not None:
+                record(path, rows=rows)
+            return response
+
+        return monitored_view
+
+    return decorator
@@ -9,7 +9,7 @@ def patch_skip_activation_email():
     except ImportError:
         return
 
-    from .models import CohortMembership
+    from .caching import has_pending_invite
 
     original_function = register._skip_activation_email
 
@@ -18,7 +18,7 @@ def patch_skip_activation_email():
     ):
         logger.info("Using patched _skip_activation_email")
 
-        if CohortMembership.objects.pending().filter(email=user.email).exists():
+        if has_pending_invite(user.email):
             return True
 
         return original_function(
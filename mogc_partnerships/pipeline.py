@@ -6,6 +6,7 @@ from openedx_filters.filters import PipelineStep
 from openedx_filters.learning.filters import CourseEnrollmentStarted
 
 from .models import CohortOffering, Partner, PartnerOffering
+from .monitoring import monitor
 
 
 def get_course_key(context):
@@ -35,6 +36,7 @@ def user_can_access_course(user, course_key):
 class MembershipRequiredEnrollment(PipelineStep):
     """Prevents non-members from enrolling in partner courses."""
 
+    @monitor("pipeline.membership_required_enrollment")
     def run_filter(self, user, course_key, mode):
         try:
             if user_can_access_course(user, course_key):
@@ -53,6 +55,7 @@ class MembershipRequiredEnrollment(PipelineStep):
 class HidePartnerCourseAboutPages(PipelineStep):
     """Return 404 to non-members for partner course about pages."""
 
+    @monitor("pipeline.hide_partner_course_about_pages")
     def run_filter(self, context, template_name):
         user = get_current_user()
         course_key = get_course_key(context)
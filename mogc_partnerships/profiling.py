@@ -0,0 +1,156 @@
+"""
+Opt-in SQL profiles of single plugin requests, for staff.
+
+When SQL_PROFILING_ENABLED is set, staff can send the PROFILE_REQUEST_HEADER header
+or the profile_sql query parameter to have the SQL of a request recorded. The
+profile is cached under an id, which is returned with a summary in the
+PROFILE_RESPONSE_HEADER header and can be read back from the sql_profile endpoint.
+Query parameters are left out of profiles, since they can hold learner data.
+
+Whether the user is staff is only checked once the view has run, since DRF views
+authenticate the request themselves and then set its user. Profiles of other users'
+requests are discarded.
+"""
+
+import hashlib
+import re
+import time
+import uuid
+from collections import defaultdict
+from contextlib import ExitStack
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+
+from .caching import make_cache_key
+from .conf import get_setting
+
+PROFILE_REQUEST_HEADER = "X-Partnerships-Profile-SQL"
+PROFILE_QUERY_PARAM = "profile_sql"
+PROFILE_RESPONSE_HEADER = "X-Partnerships-SQL-Profile"
+# Profiles keep the first this many statements, but count all of them.
+MAX_PROFILED_QUERIES = 1000
+
+IN_LIST = re.compile(r"\bIN \((?:%s, )*%s\)")
+NUMBER = re.compile(r"\b\d+\b")
+
+
+def fingerprint(sql):
+    """Identifies statements that differ only in their parameters."""
+    normalized = NUMBER.sub("N", IN_LIST.sub("IN (...)", sql))
+    return hashlib.sha256(normalized.encode()).hexdigest()[:16]
+
+
+def sql_profile_key(profile_id):
+    return make_cache_key("sql_profile", profile_id)
+
+
+def get_sql_profile(profile_id):
+    return cache.get(sql_profile_key(profile_id))
+
+
+class SQLProfiler:
+    """Database execute wrapper that records each statement and its duration."""
+
+    def __init__(self):
+        self.queries = []
+        self.query_count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.query_count += 1
+            self.seconds += duration
+            if len(self.queries) < MAX_PROFILED_QUERIES:
+                self.queries.append(
+                    {
+                        "sql": sql,
+                        "duration_ms": duration * 1000,
+                        "fingerprint": fingerprint(sql),
+                    }
+                )
+
+    def get_duplicates(self):
+        """Returns statements that ran more than once, most time consuming first."""
+        groups = defaultdict(list)
+        for query in self.queries:
+            groups[query["fingerprint"]].append(query)
+        duplicates = [
+            {
+                "fingerprint": key,
+                "count": len(queries),
+                "time_ms": sum(query["duration_ms"] for query in queries),
+                "sql": queries[0]["sql"],
+            }
+            for key, queries in groups.items()
+            if len(queries) > 1
+        ]
+        return sorted(duplicates, key=lambda duplicate: -duplicate["time_ms"])
+
+
+def is_requested(request):
+    """Whether request asks to be profiled."""
+    if not get_setting("SQL_PROFILING_ENABLED"):
+        return False
+    return bool(
+        request.headers.get(PROFILE_REQUEST_HEADER)
+        or request.GET.get(PROFILE_QUERY_PARAM)
+    )
+
+
+def is_staff_request(request):
+    """Whether request was made by staff, once the view has authenticated it."""
+    user = getattr(request, "user", None)
+    return user is not None and user.is_staff
+
+
+def profile_view(view):
+    """Decorates a view so staff can request a profile of its SQL."""
+
+    @wraps(view)
+    def profiled_view(request, *args, **kwargs):
+        if not is_requested(request):
+            return view(request, *args, **kwargs)
+
+        profiler = SQLProfiler()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profiler))
+            response = view(request, *args, **kwargs)
+        duration = time.perf_counter() - start
+        if not is_staff_request(request):
+            return response
+
+        duplicates = profiler.get_duplicates()
+        profile_id = uuid.uuid4()
+        profile = {
+            "id": str(profile_id),
+            "method": request.method,
+            "path": request.path,
+            "user_id": request.user.id,
+            "created": timezone.now().isoformat(),
+            "duration_ms": duration * 1000,
+            "query_count": profiler.query_count,
+            "db_ms": profiler.seconds * 1000,
+            "duplicates": duplicates,
+            "queries": profiler.queries,
+        }
+        cache.set(
+            sql_profile_key(profile_id),
+            profile,
+            get_setting("SQL_PROFILE_CACHE_TIMEOUT"),
+        )
+        response[PROFILE_RESPONSE_HEADER] = (
+            f"id={profile_id}; queries={profiler.query_count}; "
+            f"db_ms={profiler.seconds * 1000:.1f}; duplicates={len(duplicates)}"
+        )
+        return response
+
+    return profiled_view
@@ -1,37 +1,98 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
 
 from openedx_events.learning.data import CourseEnrollmentData, UserData
 
-from . import tasks
-from .models import CohortMembership, EnrollmentRecord, PartnerOffering
+from . import caching, generations, monitoring, tasks
+from .conf import get_setting
+from .models import CohortMembership
+from .records import (
+    EnrollmentEvent,
+    apply_enrollment_events,
+    buffer_enrollment_event,
+    queue_grade_update,
+)
 
 
+@monitoring.monitor("receivers.link_user_to_invite")
 def link_user_to_invite(user: UserData, **kwargs):
+    invites = CohortMembership.objects.pending().for_emails([user.pii.email])
+    # Most registrations have no invite, so check with an indexed read before
+    # taking any write locks.
+    cohort_ids = list(invites.values_list("cohort_id", flat=True))
+    if not cohort_ids:
+        return
+
+    invites.update(user_id=user.id)
+    monitoring.record("receivers.link_user_to_invite", rows=len(cohort_ids))
+    caching.remove_pending_invites([user.pii.email])
+    generations.bump(generations.COHORT, cohort_ids)
+    generations.bump(generations.USER, [user.id])
     AuthUser = get_user_model()
-    email = user.pii.email
-    auth_user = AuthUser.objects.get(email=email)
-    auth_user.is_active = True
-    auth_user.save()
-    CohortMembership.objects.filter(email=email, user=None).update(user=auth_user)
+    AuthUser.objects.filter(id=user.id, is_active=False).update(is_active=True)
 
 
+@monitoring.monitor("receivers.update_enrollment_records")
 def update_enrollment_records(enrollment: CourseEnrollmentData, **kwargs):
-    course_key = enrollment.course.course_key
-    user_id = enrollment.user.id
-    AuthUser = get_user_model()
-    user = AuthUser.objects.get(id=user_id)
-    offerings = PartnerOffering.objects.filter(course_key=course_key)
-    for offering in offerings:
-        EnrollmentRecord.objects.update_or_create(
-            user=user,
-            offering=offering,
-            defaults={
-                "mode": enrollment.mode,
-                "is_active": enrollment.is_active,
-                "creation_date": enrollment.creation_date,
-            },
+    course_id = str(enrollment.course.course_key)
+    # Nearly all enrollments are for other courses, so check without any queries.
+    if course_id not in caching.get_partner_offering_ids():
+        return
+
+    metadata = kwargs.get("metadata")
+    event = EnrollmentEvent(
+        user_id=enrollment.user.id,
+        course_key=course_id,
+        mode=enrollment.mode,
+        is_active=enrollment.is_active,
+        creation_date=enrollment.creation_date,
+        event_time=metadata.time if metadata else timezone.now(),
+    )
+    if not get_setting("BUFFER_ENROLLMENT_EVENTS"):
+        rows = apply_enrollment_events([event])
+        monitoring.record("receivers.update_enrollment_records", rows=rows)
+        return
+
+    position = buffer_enrollment_event(event)
+    monitoring.record("receivers.update_enrollment_records", buffered=1)
+    if position % get_setting("ENROLLMENT_EVENT_FLUSH_SIZE") == 0:
+        transaction.on_commit(tasks.flush_enrollment_events.delay)
+
+
+def schedule_grade_update(user_id, course_id, **values):
+    if course_id not in caching.get_partner_offering_ids():
+        return
+
+    # Grade events fire for every graded submission, so writes are coalesced.
+    bucket = queue_grade_update(user_id, course_id, **values)
+    if bucket is not None:
+        tasks.flush_grade_updates.apply_async(
+            (bucket,), countdown=get_setting("GRADE_UPDATE_WINDOW_SECONDS") + 1
         )
 
 
+def update_grade_records(grade, **kwargs):
+    schedule_grade_update(
+        grade.user_id,
+        str(grade.course.course_key),
+        grade=round(grade.percent_grade * 100),
+    )
+
+
+def update_passing_status(course_passing_status, **kwargs):
+    schedule_grade_update(
+        course_passing_status.user.id,
+        str(course_passing_status.course.course_key),
+        is_successful=course_passing_status.is_passing,
+    )
+
+
 def create_offering_on_publish(sender, course_key, **kwargs):
-    tasks.update_or_create_offering.delay(str(course_key))
+    if course_key.org not in caching.get_partner_orgs():
+        return
+
+    course_id = str(course_key)
+    window = get_setting("OFFERING_SYNC_DEBOUNCE_SECONDS")
+    if caching.debounce(tasks.offering_sync_key(course_id), window):
+        tasks.update_or_create_offering.apply_async((course_id,), countdown=window)
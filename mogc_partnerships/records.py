@@ -0,0 +1,323 @@
+import logging
+from datetime import datetime
+from typing import NamedTuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import (
+    add_to_window,
+    drain_window,
+    get_partner_offering_ids,
+    hash_key_part,
+    make_cache_key,
+)
+from .conf import get_setting
+from .generations import USER, bump
+from .lib import bulk_upsert
+from .models import BufferedEnrollmentEvent, EnrollmentRecord
+
+ENROLLMENT_EVENT_FIELDS = [
+    "mode",
+    "is_active",
+    "creation_date",
+    "last_event_at",
+    "modified_at",
+]
+
+logger = logging.getLogger(__name__)
+
+GRADE_FIELDS = ["grade", "is_successful"]
+GRADE_UPDATES = "grade_updates"
+
+
+class EnrollmentEvent(NamedTuple):
+    """The parts of an enrollment change that are copied to EnrollmentRecords."""
+
+    user_id: int
+    course_key: str
+    mode: str
+    is_active: bool
+    creation_date: datetime
+    event_time: datetime
+
+
+def is_stale(event, creation_date, last_event_at):
+    """Whether event is older than an enrollment state that was already applied."""
+    if event.creation_date != creation_date:
+        return event.creation_date < creation_date
+    return last_event_at is not None and event.event_time < last_event_at
+
+
+def apply_enrollment_events(events):
+    """
+    Writes enrollment events to the records of all matching partner offerings.
+
+    Events for the same user and course are collapsed so the most recent one wins,
+    and events older than what a record already reflects are dropped so that late,
+    out-of-order deliveries can not regress it. The remaining records are written
+    with a single bulk upsert while the existing ones are locked. Returns the number
+    of records written.
+    """
+    partner_offering_ids = get_partner_offering_ids()
+    latest_events = {}
+    for event in events:
+        for offering_id in partner_offering_ids.get(str(event.course_key), []):
+            key = (event.user_id, offering_id)
+            latest_event = latest_events.get(key)
+            if latest_event is None or not is_stale(
+                event, latest_event.creation_date, latest_event.event_time
+            ):
+                latest_events[key] = event
+
+    if not latest_events:
+        return 0
+
+    # The records stay locked until the upsert, so a concurrent write of a newer
+    # state can not land between the staleness check and the write.
+    with transaction.atomic():
+        existing_records = (
+            EnrollmentRecord.objects.select_for_update()
+            .filter(
+                user_id__in={user_id for user_id, _ in latest_events},
+                offering_id__in={offering_id for _, offering_id in latest_events},
+            )
+            .order_by("pk")
+            .values("user_id", "offering_id", "creation_date", "last_event_at")
+        )
+        for record in existing_records:
+            key = (record["user_id"], record["offering_id"])
+            if key in latest_events and is_stale(
+                latest_events[key], record["creation_date"], record["last_event_at"]
+            ):
+                del latest_events[key]
+
+        records = [
+            EnrollmentRecord(
+                user_id=user_id,
+                offering_id=offering_id,
+                mode=event.mode,
+                is_active=event.is_active,
+                creation_date=event.creation_date,
+                last_event_at=event.event_time,
+            )
+            for (user_id, offering_id), event in latest_events.items()
+        ]
+        bulk_upsert(
+            EnrollmentRecord,
+            records,
+            unique_fields=["user", "offering"],
+            update_fields=ENROLLMENT_EVENT_FIELDS,
+        )
+    bump(USER, [user_id for user_id, _ in latest_events])
+    return len(records)
+
+
+def reconcile_offering_enrollments(offering_id, enrollments, read_at):
+    """
+    Makes an offering's records match a page of the LMS's course enrollments.
+
+    enrollments are (id, user_id, mode, is_active, created) tuples read from the LMS
+    at read_at. Missing and stale records are written with one bulk upsert, and
+    records that events have changed since read_at are left alone. Returns the
+    number of missing and the number of stale records.
+    """
+    with transaction.atomic():
+        records = (
+            EnrollmentRecord.objects.select_for_update()
+            .filter(
+                offering_id=offering_id,
+                user_id__in={enrollment[1] for enrollment in enrollments},
+            )
+            .order_by("pk")
+            .values_list("user_id", "mode", "is_active", "last_event_at")
+        )
+        states_by_user = {}
+        newer_user_ids = set()
+        for user_id, mode, is_active, last_event_at in records:
+            if last_event_at is not None and last_event_at > read_at:
+                newer_user_ids.add(user_id)
+            else:
+                states_by_user[user_id] = (mode, is_active)
+
+        missing = 0
+        stale = 0
+        drifted_records = []
+        for _, user_id, mode, is_active, created in enrollments:
+            state = states_by_user.get(user_id)
+            if user_id in newer_user_ids or state == (mode, is_active):
+                continue
+            if state is None:
+                missing += 1
+            else:
+                stale += 1
+            drifted_records.append(
+                EnrollmentRecord(
+                    user_id=user_id,
+                    offering_id=offering_id,
+                    mode=mode,
+                    is_active=is_active,
+                    creation_date=created,
+                    # Events sent before the read are already reflected in it.
+                    last_event_at=read_at,
+                )
+            )
+
+        bulk_upsert(
+            EnrollmentRecord,
+            drifted_records,
+            unique_fields=["user", "offering"],
+            update_fields=ENROLLMENT_EVENT_FIELDS,
+        )
+    bump(USER, [record.user_id for record in drifted_records])
+    return missing, stale
+
+
+def buffer_enrollment_event(event):
+    """Queues event to be applied by the next flush, returning its position."""
+    return BufferedEnrollmentEvent.objects.create(**event._asdict()).pk
+
+
+def flush_buffered_enrollment_events(batch_size):
+    """
+    Applies buffered enrollment events in the order they were queued.
+
+    Only events queued before the flush started are applied, batch_size at a time,
+    so a flush always finishes under sustained load. Returns the number of events.
+    """
+    events = BufferedEnrollmentEvent.objects.order_by("pk")
+    last_pk = events.values_list("pk", flat=True).last()
+    if last_pk is None:
+        return 0
+
+    flushed = 0
+    first_pk = 0
+    while first_pk < last_pk:
+        rows = list(
+            events.filter(pk__gt=first_pk, pk__lte=last_pk).values_list(
+                "pk", *EnrollmentEvent._fields
+            )[:batch_size]
+        )
+        if not rows:
+            break
+        apply_enrollment_events([EnrollmentEvent(*row[1:]) for row in rows])
+        # Rows that commit late can fill gaps in the pk range, so delete by pk.
+        BufferedEnrollmentEvent.objects.filter(pk__in=[row[0] for row in rows]).delete()
+        first_pk = rows[-1][0]
+        flushed += len(rows)
+    return flushed
+
+
+def grade_update_member(user_id, course_id):
+    return f"{user_id}.{course_id}"
+
+
+def grade_update_key(user_id, course_id, field):
+    # Course ids have no length limit, so they are hashed to keep keys short.
+    member = grade_update_member(user_id, course_id)
+    return make_cache_key(GRADE_UPDATES, hash_key_part(member), field)
+
+
+def queue_grade_update(user_id, course_id, **values):
+    """
+    Stores the latest grade values for a learner in a course until the next flush.
+
+    Each field is cached under its own key, so later changes simply replace earlier
+    ones and all changes in a window are written once. Returns the window bucket if
+    the caller must schedule apply_queued_grade_updates for it, and None otherwise.
+    """
+    window = get_setting("GRADE_UPDATE_WINDOW_SECONDS")
+    cache.set_many(
+        {
+            grade_update_key(user_id, course_id, field): value
+            for field, value in values.items()
+        },
+        window * 10,
+    )
+    return add_to_window(GRADE_UPDATES, grade_update_member(user_id, course_id), window)
+
+
+def apply_queued_grade_updates(bucket):
+    """Applies the grade values queued for a window bucket. Returns the record count."""
+    pairs = []
+    for member in drain_window(GRADE_UPDATES, bucket):
+        user_id, course_id = member.split(".", 1)
+        pairs.append((int(user_id), course_id))
+
+    keys = {
+        (user_id, course_id, field): grade_update_key(user_id, course_id, field)
+        for user_id, course_id in pairs
+        for field in GRADE_FIELDS
+    }
+    cached_values = cache.get_many(list(keys.values()))
+    updates = {}
+    for (user_id, course_id, field), key in keys.items():
+        if key in cached_values:
+            updates.setdefault((user_id, course_id), {})[field] = cached_values[key]
+    expired = len(pairs) - len(updates)
+    if expired:
+        logger.warning(
+            f"Grade changes for {expired} learners expired before bucket {bucket} "
+            "was flushed, run backfill_enrollment_grades to restore them"
+        )
+    return apply_grade_updates(updates)
+
+
+def apply_grade_updates(updates):
+    """
+    Writes grade values to the records of matching partner offerings.
+
+    updates maps (user_id, course_id) pairs to dicts of GRADE_FIELDS values. All of
+    the records are read with one query and written with bulk updates. Returns the
+    number of records updated.
+    """
+    partner_offering_ids = get_partner_offering_ids()
+    course_ids_by_offering = {
+        offering_id: course_id
+        for _, course_id in updates
+        for offering_id in partner_offering_ids.get(course_id, [])
+    }
+    if not course_ids_by_offering:
+        return 0
+
+    records = EnrollmentRecord.objects.filter(
+        user_id__in={user_id for user_id, _ in updates},
+        offering_id__in=course_ids_by_offering,
+    ).only("id", "user_id", "offering_id", *GRADE_FIELDS)
+    now = timezone.now()
+    updated_records = []
+    for record in records:
+        course_id = course_ids_by_offering[record.offering_id]
+        values = updates.get((record.user_id, course_id))
+        if not values:
+            continue
+        for field, value in values.items():
+            setattr(record, field, value)
+        record.modified_at = now
+        updated_records.append(record)
+
+    # Offerings are matched by course, so a learner's changes are only missed when
+    # no offering of the course has a record for them yet.
+    matched_updates = {
+        (record.user_id, course_ids_by_offering[record.offering_id])
+        for record in updated_records
+    }
+    missing = [
+        update
+        for update in updates
+        if update not in matched_updates and update[1] in partner_offering_ids
+    ]
+    if missing:
+        logger.warning(
+            f"Grade changes for {len(missing)} learners have no enrollment record "
+            f"to update, including {missing[0][0]} in {missing[0][1]}"
+        )
+
+    EnrollmentRecord.objects.bulk_update(
+        updated_records,
+        [*GRADE_FIELDS, "modified_at"],
+        batch_size=get_setting("MAINTENANCE_BATCH_SIZE"),
+    )
+    bump(USER, [record.user_id for record in updated_records])
+    return len(updated_records)
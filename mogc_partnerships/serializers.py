@@ -1,8 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import CharField
+from django.db.models.functions import Cast
+
 from rest_framework import serializers
 
 from . import models
 
 
+def get_context_ids(serializer, name):
+    """
+    Returns the ids passed to the serializer's context under name as a set.
+
+    Views may pass any iterable of ids, including lazy querysets. It is converted
+    once and stored back in the context, which is shared by all children of a list
+    serializer, so each lookup is a hash check instead of a scan.
+    """
+    context = serializer.context
+    ids = context.get(name)
+    if ids is None:
+        return frozenset()
+    if not isinstance(ids, (set, frozenset)):
+        ids = context[name] = frozenset(ids)
+    return ids
+
+
+def has_profiles():
+    """Whether users have profiles, which only exist inside edx-platform."""
+    try:
+        get_user_model()._meta.get_field("profile")
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
 class PartnerOfferingSerializer(serializers.ModelSerializer):
     """Serializer for PartnerOffering objects."""
 
@@ -18,7 +49,15 @@ class PartnerOfferingDetailsSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = models.PartnerOffering
-        fields = ["course_key", "title", "description", "short_description"]
+        fields = [
+            "course_key",
+            "title",
+            "description",
+            "short_description",
+            "start",
+            "end",
+            "self_paced",
+        ]
 
 
 class PartnerSerializer(serializers.ModelSerializer):
@@ -32,10 +71,15 @@ class PartnerSerializer(serializers.ModelSerializer):
         fields = ["name", "slug", "offerings", "is_manager"]
 
     def get_is_manager(self, obj):
-        context = self.context
-        if "associations" not in context:
-            return False
-        return obj.id in context["associations"]
+        return obj.id in get_context_ids(self, "associations")
+
+
+class PartnerSummarySerializer(serializers.ModelSerializer):
+    """Serializer for Partner objects without their offerings."""
+
+    class Meta:
+        model = models.Partner
+        fields = ["name", "slug"]
 
 
 class PartnerCohortSerializer(serializers.ModelSerializer):
@@ -83,10 +127,7 @@ class CohortOfferingSerializer(serializers.ModelSerializer):
         ]
 
     def get_is_enrolled(self, obj):
-        context = self.context
-        if "enrollments" not in context:
-            return False
-        return obj.offering_id in context["enrollments"]
+        return obj.offering_id in get_context_ids(self, "enrollments")
 
 
 class CohortMembershipSerializer(serializers.ModelSerializer):
@@ -98,6 +139,14 @@ class CohortMembershipSerializer(serializers.ModelSerializer):
     user = serializers.ReadOnlyField(source="user.username")
     name = serializers.ReadOnlyField(source="user.profile.name")
 
+    @classmethod
+    def select_related(cls, queryset):
+        """Joins the related rows read for each membership onto queryset."""
+        queryset = queryset.select_related("cohort__partner", "user")
+        if not has_profiles():
+            return queryset
+        return queryset.select_related("user__profile")
+
     class Meta:
         model = models.CohortMembership
         fields = [
@@ -122,3 +171,94 @@ class EnrollmentRecordSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.EnrollmentRecord
         fields = ["id", "user", "offering", "is_complete", "is_active"]
+
+
+class ValuesSerializer(serializers.BaseSerializer):
+    """
+    Read-only serializer for rows fetched with QuerySet.values().
+
+    High-volume list views fetch rows with project, which selects exactly the
+    columns to_representation reads, and serialize the resulting dicts instead of
+    building a model instance and a set of field objects for every row.
+    """
+
+    value_fields = []
+
+    @classmethod
+    def project(cls, queryset):
+        return queryset.values(*cls.value_fields)
+
+
+class CohortMembershipValuesSerializer(ValuesSerializer):
+    """Serializes CohortMembership rows like CohortMembershipSerializer."""
+
+    value_fields = [
+        "id",
+        "cohort__uuid",
+        "cohort__partner__slug",
+        "email",
+        "user_id",
+        "user__username",
+        "active",
+    ]
+
+    @classmethod
+    def project(cls, queryset):
+        if not has_profiles():
+            return super().project(queryset)
+        return queryset.values(*cls.value_fields, "user__profile__name")
+
+    def to_representation(self, row):
+        data = {
+            "id": row["id"],
+            "cohort": row["cohort__uuid"],
+            "partner": row["cohort__partner__slug"],
+            "email": row["email"],
+        }
+        # Like the ReadOnlyFields of CohortMembershipSerializer, user and name are
+        # left out for invites, and name for users without a profile.
+        if row["user_id"] is not None:
+            data["user"] = row["user__username"]
+            if row.get("user__profile__name") is not None:
+                data["name"] = row["user__profile__name"]
+        data["active"] = row["active"]
+        data["status"] = models.CohortMembership.get_status(
+            row["active"], row["user_id"]
+        )
+        return data
+
+
+class EnrollmentRecordValuesSerializer(ValuesSerializer):
+    """Serializes EnrollmentRecord rows like EnrollmentRecordSerializer."""
+
+    value_fields = [
+        "id",
+        "user__username",
+        "offering_id",
+        "offering__partner__slug",
+        "offering__title",
+        "is_complete",
+        "is_active",
+    ]
+
+    @classmethod
+    def project(cls, queryset):
+        # Read course keys as strings rather than parsing a CourseKey for each row.
+        return queryset.values(
+            *cls.value_fields,
+            course_key=Cast("offering__course_key", output_field=CharField()),
+        )
+
+    def to_representation(self, row):
+        return {
+            "id": row["id"],
+            "user": row["user__username"],
+            "offering": {
+                "id": row["offering_id"],
+                "partner": row["offering__partner__slug"],
+                "course_key": row["course_key"],
+                "title": row["offering__title"],
+            },
+            "is_complete": row["is_complete"],
+            "is_active": row["is_active"],
+        }
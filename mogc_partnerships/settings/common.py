@@ -1,3 +1,5 @@
+from datetime import timedelta
+
 COURSE_ENROLLMENT_STARTED = "org.openedx.learning.course.enrollment.started.v1"
 COURSE_ABOUT_RENDER_STARTED = "org.openedx.learning.course_about.render.started.v1"
 
@@ -13,3 +15,26 @@ def plugin_settings(settings):
             "pipeline": ["mogc_partnerships.pipeline.HidePartnerCourseAboutPages"],
         },
     }
+    settings.CELERYBEAT_SCHEDULE = {
+        **getattr(settings, "CELERYBEAT_SCHEDULE", {}),
+        "mogc_partnerships.send_pending_invite_reminders": {
+            "task": "mogc_partnerships.tasks.send_pending_invite_reminders",
+            "schedule": timedelta(hours=24),
+        },
+        "mogc_partnerships.refresh_pending_invites": {
+            "task": "mogc_partnerships.tasks.refresh_pending_invites",
+            "schedule": timedelta(hours=12),
+        },
+        "mogc_partnerships.expire_pending_invites": {
+            "task": "mogc_partnerships.tasks.expire_pending_invites",
+            "schedule": timedelta(hours=24),
+        },
+        "mogc_partnerships.flush_enrollment_events": {
+            "task": "mogc_partnerships.tasks.flush_enrollment_events",
+            "schedule": timedelta(minutes=1),
+        },
+        "mogc_partnerships.reconcile_enrollment_records": {
+            "task": "mogc_partnerships.tasks.reconcile_enrollment_records",
+            "schedule": timedelta(hours=24),
+        },
+    }
@@ -1,44 +1,421 @@
+import hashlib
+import json
 import logging
+from datetime import timedelta
 
-from celery import shared_task
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from celery import group, shared_task
 from opaque_keys.edx.keys import CourseKey
 
-from .compat import get_course_overview_or_none
+from .caching import (
+    acquire_lock,
+    invalidate_partner_offering_ids,
+    load_pending_invites,
+    release_debounce,
+    release_lock,
+)
+from .compat import (
+    get_course_enrollments,
+    get_course_overview_or_none,
+    get_course_overviews_for_org,
+    get_persistent_course_grades,
+)
+from .conf import get_setting
+from .generations import PARTNER, bump
+from .lib import iterate_pk_batches
 from .messages import send_cohort_membership_invite
-from .models import CohortMembership, Partner, PartnerOffering
+from .models import (
+    BufferedEnrollmentEvent,
+    CohortMembership,
+    EnrollmentRecord,
+    Partner,
+    PartnerOffering,
+)
+from .monitoring import monitor, record
+from .records import (
+    apply_grade_updates,
+    apply_queued_grade_updates,
+    flush_buffered_enrollment_events,
+    reconcile_offering_enrollments,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def offering_sync_key(course_id):
+    return f"offering_sync.{course_id}"
+
+
+OFFERING_SYNC_FIELDS = ("title", "short_description", "start", "end", "self_paced")
+
+
+def get_offering_fields(course_overview):
+    """Returns the PartnerOffering field values synced from a course overview."""
+    return {
+        "title": course_overview.display_name,
+        "short_description": course_overview.short_description or "",
+        "start": course_overview.start,
+        "end": course_overview.end,
+        "self_paced": course_overview.self_paced,
+    }
+
+
+def hash_offering_fields(offering_fields):
+    payload = json.dumps(offering_fields, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
 @shared_task
+@monitor("tasks.update_or_create_offering")
 def update_or_create_offering(course_id):
+    # Publishes from here on must schedule a new sync to be picked up.
+    release_debounce(offering_sync_key(course_id))
     course_key = CourseKey.from_string(course_id)
     try:
         partner = Partner.objects.get(org=course_key.org)
-        course_overview = get_course_overview_or_none(course_id)
-        if course_overview is not None:
-            PartnerOffering.objects.update_or_create(
-                partner=partner,
-                course_key=course_key,
-                defaults={
-                    "title": course_overview.display_name,
-                    "short_description": course_overview.short_description or "",
-                },
-            )
     except Partner.DoesNotExist:
         logger.debug(f"Offering not created for {course_key}")
+        return
+
+    course_overview = get_course_overview_or_none(course_id)
+    if course_overview is None:
+        return
+
+    offering_fields = get_offering_fields(course_overview)
+    content_hash = hash_offering_fields(offering_fields)
+    try:
+        offering = PartnerOffering.objects.get(partner=partner, course_key=course_key)
+    except PartnerOffering.DoesNotExist:
+        try:
+            with transaction.atomic():
+                PartnerOffering.objects.create(
+                    partner=partner,
+                    course_key=course_key,
+                    content_hash=content_hash,
+                    **offering_fields,
+                )
+            return
+        except IntegrityError:
+            # A concurrent reconcile created the offering, so update it instead.
+            offering = PartnerOffering.objects.get(
+                partner=partner, course_key=course_key
+            )
+
+    # Skip the write entirely so modified_at only moves when the course changed.
+    if offering.content_hash == content_hash:
+        logger.debug(f"Offering for {course_key} is unchanged")
+        return
+
+    for field, value in offering_fields.items():
+        setattr(offering, field, value)
+    offering.content_hash = content_hash
+    offering.save(update_fields=[*offering_fields, "content_hash", "modified_at"])
 
 
 @shared_task
+@monitor("tasks.reconcile_partner_offerings")
+def reconcile_partner_offerings(partner_id, dry_run=False):
+    """
+    Creates missing and updates stale offerings for all of a partner's courses.
+
+    Course overviews are read a page at a time and compared to the content hashes of
+    the matching offerings, and each page's differences are written with chunked bulk
+    inserts and updates. Returns a summary of the differences, which are only reported
+    when dry_run is set.
+    """
+    partner = Partner.objects.get(pk=partner_id)
+    batch_size = get_setting("MAINTENANCE_BATCH_SIZE")
+    diff = {"partner": partner.slug, "created": [], "updated": [], "unchanged": 0}
+    for course_overviews in get_course_overviews_for_org(partner.org, batch_size):
+        offerings = PartnerOffering.objects.filter(
+            partner=partner,
+            course_key__in=[course_overview.id for course_overview in course_overviews],
+        ).only("id", "course_key", "content_hash")
+        offerings_by_course_id = {
+            str(offering.course_key): offering for offering in offerings
+        }
+
+        new_offerings = []
+        stale_offerings = []
+        now = timezone.now()
+        for course_overview in course_overviews:
+            course_id = str(course_overview.id)
+            offering_fields = get_offering_fields(course_overview)
+            content_hash = hash_offering_fields(offering_fields)
+            offering = offerings_by_course_id.get(course_id)
+            if offering is None:
+                new_offerings.append(
+                    PartnerOffering(
+                        partner=partner,
+                        course_key=course_overview.id,
+                        content_hash=content_hash,
+                        **offering_fields,
+                    )
+                )
+                diff["created"].append(course_id)
+            elif offering.content_hash != content_hash:
+                for field, value in offering_fields.items():
+                    setattr(offering, field, value)
+                offering.content_hash = content_hash
+                offering.modified_at = now
+                stale_offerings.append(offering)
+                diff["updated"].append(course_id)
+            else:
+                diff["unchanged"] += 1
+
+        record(
+            "tasks.reconcile_partner_offerings",
+            batches=1,
+            rows=len(course_overviews),
+        )
+        if dry_run:
+            continue
+
+        # Offerings created by a concurrent publish sync are left to that sync.
+        PartnerOffering.objects.bulk_create(
+            new_offerings, batch_size=batch_size, ignore_conflicts=True
+        )
+        if new_offerings:
+            # bulk_create does not send the post_save signal that normally does this.
+            invalidate_partner_offering_ids()
+        PartnerOffering.objects.bulk_update(
+            stale_offerings,
+            [*OFFERING_SYNC_FIELDS, "content_hash", "modified_at"],
+            batch_size=batch_size,
+        )
+        if new_offerings or stale_offerings:
+            bump(PARTNER, [partner.id])
+
+    logger.info(
+        f"Reconciled offerings for {partner.slug}: {len(diff['created'])} created, "
+        f"{len(diff['updated'])} updated, {diff['unchanged']} unchanged"
+        + (" (dry run)" if dry_run else "")
+    )
+    return diff
+
+
+@shared_task
+@monitor("tasks.reconcile_offerings")
+def reconcile_offerings(dry_run=False):
+    """Reconciles the offerings of every active partner in parallel."""
+    partner_ids = Partner.objects.active().values_list("id", flat=True)
+    group(
+        reconcile_partner_offerings.s(partner_id, dry_run=dry_run)
+        for partner_id in partner_ids
+    ).apply_async()
+
+
+@shared_task
+@monitor("tasks.trigger_send_cohort_membership_invite")
 def trigger_send_cohort_membership_invite(cohort_membership_id):
     cohort_membership = CohortMembership.objects.get(pk=cohort_membership_id)
     send_cohort_membership_invite(cohort_membership)
 
 
 @shared_task
+@monitor("tasks.trigger_send_cohort_membership_invites")
 def trigger_send_cohort_membership_invites(cohort_membership_ids):
     cohort_memberships = CohortMembership.objects.filter(
         pk__in=cohort_membership_ids
-    ).all()
+    ).select_related("cohort__partner", "user")
     for member in cohort_memberships:
         send_cohort_membership_invite(member)
+    record("tasks.trigger_send_cohort_membership_invites", rows=len(cohort_memberships))
+
+
+@shared_task
+@monitor("tasks.trigger_send_cohort_membership_reminders")
+def trigger_send_cohort_membership_reminders(cohort_membership_ids):
+    cohort_memberships = (
+        CohortMembership.objects.pending()
+        .filter(pk__in=cohort_membership_ids)
+        .select_related("cohort__partner")
+    )
+    for member in cohort_memberships:
+        send_cohort_membership_invite(member, is_reminder=True)
+    record(
+        "tasks.trigger_send_cohort_membership_reminders", rows=len(cohort_memberships)
+    )
+
+
+@shared_task
+@monitor("tasks.send_pending_invite_reminders")
+def send_pending_invite_reminders():
+    """Sends one reminder for each active invite older than the reminder age.
+
+    Invites are claimed in batches by stamping reminded_at before the reminder
+    emails are queued, so an invite is never reminded twice.
+    """
+    now = timezone.now()
+    reminder_cutoff = now - timedelta(days=get_setting("INVITE_REMINDER_DAYS"))
+    invites = CohortMembership.objects.pending().filter(
+        active=True, reminded_at=None, created_at__lte=reminder_cutoff
+    )
+    reminded = 0
+    for pks in iterate_pk_batches(invites, get_setting("MAINTENANCE_BATCH_SIZE")):
+        batch = CohortMembership.objects.filter(pk__in=pks)
+        # No cached document shows reminded_at, so this update bumps no generations.
+        batch.update(reminded_at=now)
+        trigger_send_cohort_membership_reminders.delay(cohort_membership_ids=pks)
+        reminded += len(pks)
+        record("tasks.send_pending_invite_reminders", batches=1, rows=len(pks))
+    logger.info(f"Queued reminders for {reminded} pending cohort invites")
+    return reminded
+
+
+@shared_task
+@monitor("tasks.refresh_pending_invites")
+def refresh_pending_invites():
+    """Reloads the cached emails with pending invites before their marker expires."""
+    load_pending_invites()
+
+
+@shared_task
+@monitor("tasks.expire_pending_invites")
+def expire_pending_invites():
+    """Deletes invites that have not been accepted before the expiry cutoff."""
+    expiry_cutoff = timezone.now() - timedelta(days=get_setting("INVITE_EXPIRY_DAYS"))
+    invites = CohortMembership.objects.pending().filter(created_at__lte=expiry_cutoff)
+    expired = 0
+    for pks in iterate_pk_batches(invites, get_setting("MAINTENANCE_BATCH_SIZE")):
+        # Re-check user so invites linked since the batch was read are kept.
+        deleted, _ = invites.filter(pk__in=pks).delete()
+        expired += deleted
+        record("tasks.expire_pending_invites", batches=1, rows=deleted)
+    logger.info(f"Expired {expired} pending cohort invites")
+    return expired
+
+
+@shared_task
+@monitor("tasks.flush_enrollment_events")
+def flush_enrollment_events():
+    """Applies buffered enrollment events to EnrollmentRecords in bulk."""
+    # The periodic flush is scheduled whether or not events are buffered, and still
+    # has to apply events queued before buffering was turned off.
+    if (
+        not get_setting("BUFFER_ENROLLMENT_EVENTS")
+        and not BufferedEnrollmentEvent.objects.exists()
+    ):
+        return 0
+    # Size-triggered and periodic flushes may overlap, but only one needs to run.
+    if not acquire_lock("flush_enrollment_events", timeout=60 * 10):
+        return 0
+    try:
+        flushed = flush_buffered_enrollment_events(
+            get_setting("ENROLLMENT_EVENT_FLUSH_SIZE")
+        )
+    finally:
+        release_lock("flush_enrollment_events")
+    record("tasks.flush_enrollment_events", rows=flushed)
+    if flushed:
+        logger.info(f"Applied {flushed} buffered enrollment events")
+    return flushed
+
+
+@shared_task
+@monitor("tasks.flush_grade_updates")
+def flush_grade_updates(bucket):
+    """Writes the grade changes coalesced during a window to EnrollmentRecords."""
+    updated = apply_queued_grade_updates(bucket)
+    record("tasks.flush_grade_updates", rows=updated)
+    logger.debug(f"Applied grade changes to {updated} enrollment records")
+    return updated
+
+
+@shared_task
+@monitor("tasks.backfill_course_grades")
+def backfill_course_grades(course_id):
+    """Copies the LMS's persisted grades for a course to its EnrollmentRecords."""
+    course_key = CourseKey.from_string(course_id)
+    records = EnrollmentRecord.objects.filter(offering__course_key=course_key)
+    updated = 0
+    for pks in iterate_pk_batches(records, get_setting("MAINTENANCE_BATCH_SIZE")):
+        user_ids = set(
+            EnrollmentRecord.objects.filter(pk__in=pks).values_list(
+                "user_id", flat=True
+            )
+        )
+        grades = get_persistent_course_grades(course_key, user_ids)
+        record("tasks.backfill_course_grades", batches=1, rows=len(pks))
+        updated += apply_grade_updates(
+            {
+                (user_id, course_id): {
+                    "grade": round(percent_grade * 100),
+                    "is_successful": passed,
+                }
+                for user_id, (percent_grade, passed) in grades.items()
+            }
+        )
+    return updated
+
+
+@shared_task
+@monitor("tasks.reconcile_enrollment_records")
+def reconcile_enrollment_records(
+    partner_id=None, offering_id=None, after_enrollment_id=None
+):
+    """
+    Fixes EnrollmentRecords that have drifted from the LMS's enrollments.
+
+    Offerings of active partners are walked in (partner, offering) order and their
+    course enrollments are compared a page at a time. After a limited number of
+    pages the task queues itself again with its cursor, so very large catalogs are
+    handled by a chain of short tasks and an interrupted run can be resumed by
+    calling the task with the last cursor it logged.
+    """
+    offerings = PartnerOffering.objects.filter(partner__is_active=True).order_by(
+        "partner_id", "id"
+    )
+    if partner_id is not None:
+        # Without an offering, the run starts from the partner's first one.
+        offerings = offerings.filter(
+            Q(partner_id__gt=partner_id)
+            | Q(partner_id=partner_id, id__gte=offering_id or 0)
+        )
+
+    batch_size = get_setting("MAINTENANCE_BATCH_SIZE")
+    pages_left = get_setting("ENROLLMENT_RECONCILIATION_PAGES_PER_TASK")
+    checked = missing = stale = 0
+    cursor = None
+    for offering in offerings.only("id", "partner_id", "course_key").iterator():
+        if offering.id != offering_id:
+            after_enrollment_id = None
+        while True:
+            if pages_left == 0:
+                cursor = (offering.partner_id, offering.id, after_enrollment_id)
+                break
+            read_at = timezone.now()
+            enrollments = get_course_enrollments(
+                offering.course_key, after_enrollment_id, batch_size
+            )
+            if not enrollments:
+                break
+            pages_left -= 1
+            page_missing, page_stale = reconcile_offering_enrollments(
+                offering.id, enrollments, read_at
+            )
+            record(
+                "tasks.reconcile_enrollment_records",
+                batches=1,
+                checked=len(enrollments),
+                missing=page_missing,
+                stale=page_stale,
+            )
+            checked += len(enrollments)
+            missing += page_missing
+            stale += page_stale
+            after_enrollment_id = enrollments[-1][0]
+        if cursor:
+            break
+
+    logger.info(
+        f"Reconciled {checked} enrollments: {missing} missing and {stale} stale "
+        f"records fixed" + (f", continuing from {cursor}" if cursor else "")
+    )
+    if cursor:
+        reconcile_enrollment_records.delay(*cursor)
+    return {"checked": checked, "missing": missing, "stale": stale}
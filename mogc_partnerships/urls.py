@@ -12,6 +12,11 @@ urlpatterns = [
         views.PartnerListView.as_view(),
         name="partner_list",
     ),
+    path(
+        f"{API_PREFIX}/home/",
+        views.LearnerHomeView.as_view(),
+        name="learner_home",
+    ),
     path(
         f"{API_PREFIX}/cohorts/",
         views.CohortListView.as_view(),
@@ -62,4 +67,9 @@ urlpatterns = [
         views.EnrollmentRecordListView.as_view(),
         name="record_list",
     ),
+    path(
+        f"{API_PREFIX}/sql-profiles/<uuid:profile_id>/",
+        views.SQLProfileView.as_view(),
+        name="sql_profile",
+    ),
 ]
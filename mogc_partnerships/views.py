@@ -1,9 +1,15 @@
 from functools import partial
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.db import transaction
 from django.db.models import Prefetch, Q
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect
+from django.utils.cache import get_conditional_response
+from django.utils.decorators import method_decorator
+from django.utils.http import quote_etag
+from django.views.decorators.http import etag
 
 from rest_framework import generics, status
 from rest_framework.authentication import SessionAuthentication
@@ -13,13 +19,14 @@ from rest_framework.decorators import (
     permission_classes,
 )
 from rest_framework.exceptions import PermissionDenied
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from mogc_partnerships import serializers
 
-from . import compat, tasks
+from . import caching, compat, generations, monitoring, profiling, tasks
+from .conf import get_setting
 from .lib import get_cohort
 from .models import (
     CohortMembership,
@@ -29,17 +36,29 @@ from .models import (
     PartnerCohort,
     PartnerManagementMembership,
     PartnerOffering,
+    normalize_email,
 )
 from .pagination import LargeResultsSetPagination
 from .permissions import ManagerCreatePermission, ManagerEditPermission
 
 
+def instrument_view(name):
+    """Monitors a view as views.<name> and lets staff profile its SQL."""
+
+    def decorator(view):
+        return monitoring.monitor_view(name)(profiling.profile_view(view))
+
+    return decorator
+
+
+@method_decorator(instrument_view("partner_list"), name="dispatch")
 class PartnerListView(APIView):
     """Returns a list of partners where the user is a member or manager."""
 
     authentication_classes = [SessionAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @method_decorator(etag(generations.get_user_etag))
     def get(self, request):
         associations = PartnerManagementMembership.objects.filter(
             user=request.user
@@ -62,6 +81,52 @@ class PartnerListView(APIView):
         return Response(serializer.data)
 
 
+@method_decorator(instrument_view("learner_home"), name="dispatch")
+class LearnerHomeView(APIView):
+    """Returns the partners and cohort offerings shown on a learner's home page."""
+
+    authentication_classes = [SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_document(self, user):
+        partners = Partner.objects.active().for_user(user)
+        offerings = CohortOffering.objects.for_user(user).select_related(
+            "offering", "cohort__partner"
+        )
+        enrollments = user.enrollment_records.active().values_list(
+            "offering_id", flat=True
+        )
+        offerings_serializer = serializers.CohortOfferingSerializer(
+            offerings, many=True, context={"enrollments": enrollments}
+        )
+        return {
+            "partners": list(
+                serializers.PartnerSummarySerializer(partners, many=True).data
+            ),
+            "offerings": list(offerings_serializer.data),
+        }
+
+    def get(self, request):
+        # The stamp is both the ETag and the version of the cached document.
+        stamp = generations.get_user_etag(request)
+        response = get_conditional_response(request, etag=quote_etag(stamp))
+        if response is None:
+            cache_key = generations.versioned_key(
+                "learner_home", request.user.id, stamp=stamp
+            )
+            document = cache.get(cache_key)
+            monitoring.record_cache("views.learner_home", hit=document is not None)
+            if document is None:
+                document = self.get_document(request.user)
+                cache.set(
+                    cache_key, document, get_setting("LEARNER_HOME_CACHE_TIMEOUT")
+                )
+            response = Response(document)
+        response["ETag"] = quote_etag(stamp)
+        return response
+
+
+@method_decorator(instrument_view("cohort_list"), name="dispatch")
 class CohortListView(generics.ListCreateAPIView):
     """List and create cohorts."""
 
@@ -75,12 +140,13 @@ class CohortListView(generics.ListCreateAPIView):
         memberships = PartnerManagementMembership.objects.filter(user=user)
         return PartnerCohort.objects.filter(
             partner__in=memberships.values_list("partner_id", flat=True)
-        )
+        ).select_related("partner")
 
     def perform_create(self, serializer):
         return super().perform_create(serializer)
 
 
+@method_decorator(instrument_view("cohort_detail"), name="dispatch")
 class CohortDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Allows managers to update and delete cohorts for their partners."""
 
@@ -96,6 +162,7 @@ class CohortDetailView(generics.RetrieveUpdateDestroyAPIView):
         )
 
 
+@method_decorator(instrument_view("offering_list"), name="dispatch")
 class CohortOfferingListView(generics.ListAPIView):
     """Lists cohort offerings."""
 
@@ -106,30 +173,31 @@ class CohortOfferingListView(generics.ListAPIView):
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
-        context[
-            "enrollments"
-        ] = self.request.user.enrollment_records.active().values_list(
-            "offering_id", flat=True
+        context["enrollments"] = set(
+            self.request.user.enrollment_records.active().values_list(
+                "offering_id", flat=True
+            )
         )
         return context
 
     def get_queryset(self):
-        user = self.request.user
-        managed_partners = user.partners.all()
-        managed_offerings = CohortOffering.objects.filter(
-            cohort__partner_id__in=managed_partners.values_list("id", flat=True)
+        return CohortOffering.objects.for_user(self.request.user).select_related(
+            "offering", "cohort__partner"
         )
-        memberships = user.memberships.filter(active=True).all()
-        if not (managed_offerings or memberships):
+
+    @method_decorator(etag(generations.get_user_etag))
+    def list(self, request, *args, **kwargs):
+        offerings = list(self.filter_queryset(self.get_queryset()))
+        # Only members of cohorts without any offerings get an empty list, so
+        # the access check needs a query of its own just in that case.
+        if not offerings and not request.user.memberships.filter(active=True).exists():
             raise PermissionDenied("User has no active cohort memberships")
 
-        member_offerings = CohortOffering.objects.filter(
-            cohort__in=memberships.values_list("cohort_id", flat=True)
-        )
-        accessible_offerings = managed_offerings | member_offerings
-        return accessible_offerings.select_related("offering")
+        serializer = self.get_serializer(offerings, many=True)
+        return Response(serializer.data)
 
 
+@method_decorator(instrument_view("offering_create"), name="dispatch")
 class CohortOfferingCreateView(generics.CreateAPIView):
     """Adds offerings to cohorts."""
 
@@ -145,10 +213,11 @@ class CohortOfferingCreateView(generics.CreateAPIView):
         serializer.save(cohort=cohort)
 
 
+@method_decorator(instrument_view("membership_list"), name="dispatch")
 class CohortMembershipListView(generics.ListAPIView):
     authentication_classes = [SessionAuthentication]
     permission_classes = [IsAuthenticated]
-    serializer_class = serializers.CohortMembershipSerializer
+    serializer_class = serializers.CohortMembershipValuesSerializer
     pagination_class = LargeResultsSetPagination
 
     def get_queryset(self):
@@ -156,14 +225,10 @@ class CohortMembershipListView(generics.ListAPIView):
         managed_memberships = CohortMembership.objects.filter(
             cohort__partner__in=user.partners.values_list("id", flat=True)
         )
-
-        # TODO: Find a better way to determine if profiles are present.
-        # This allows us to avoid an N+1 issue in production while still passing tests.
-        user_relationship = "user__profile" if hasattr(user, "profile") else "user"
-
-        return managed_memberships.select_related("cohort__partner", user_relationship)
+        return self.serializer_class.project(managed_memberships)
 
 
+@method_decorator(instrument_view("membership_create"), name="dispatch")
 class CohortMembershipCreateView(generics.CreateAPIView):
     authentication_classes = [SessionAuthentication]
     permission_classes = [IsAuthenticated, ManagerEditPermission]
@@ -175,20 +240,30 @@ class CohortMembershipCreateView(generics.CreateAPIView):
 
         return super(CohortMembershipCreateView, self).get_serializer(*args, **kwargs)
 
+    def get_accounts(self, emails):
+        """Maps the normalized form of emails to the accounts registered with them."""
+        User = get_user_model()
+        # Case-insensitive collations, as used by Open edX on MySQL, also match
+        # accounts whose email differs in case. Elsewhere the lowercased forms are
+        # tried as well so the lookup stays an indexed equality match.
+        lookup_emails = {*emails, *(normalize_email(email) for email in emails)}
+        return {
+            normalize_email(user.email): user
+            for user in User.objects.filter(email__in=lookup_emails)
+        }
+
     def create_collection(self, validated_data, cohort):
         member_emails = [od["email"] for od in validated_data]
-
-        User = get_user_model()
-        membership_accounts = User.objects.filter(
-            email__in=[email for email in member_emails]
-        )
-        account_email_map = {user.email: user for user in membership_accounts}
+        monitoring.record("views.membership_create", batch_size=len(member_emails))
+        account_email_map = self.get_accounts(member_emails)
 
         cohort_memberships = [
             CohortMembership(
-                user=account_email_map.get(member_email),
+                user=account_email_map.get(normalize_email(member_email)),
                 cohort=cohort,
                 email=member_email,
+                # bulk_create doesn't call save(), which normally sets this.
+                normalized_email=normalize_email(member_email),
             )
             for member_email in member_emails
         ]
@@ -196,17 +271,26 @@ class CohortMembershipCreateView(generics.CreateAPIView):
         objects = CohortMembership.objects.bulk_create(
             cohort_memberships, ignore_conflicts=True
         )
+        generations.bump(generations.COHORT, [cohort.id])
+        generations.bump(generations.USER, [cm.user_id for cm in objects])
         # bulk_create doesn't return autoincremented IDs with MySQL DBs
         # so we have to query results separately
-        cohort_memberships = CohortMembership.objects.filter(
-            email__in=[cm.email for cm in objects], cohort=cohort
+        cohort_memberships = self.serializer_class.select_related(
+            CohortMembership.objects.for_emails([cm.email for cm in objects]).filter(
+                cohort=cohort
+            )
+        )
+        # bulk_create doesn't send post_save, which keeps the pending invites cache.
+        # It also returns the rows that conflicted and weren't inserted, so the
+        # entries are added from the stored memberships.
+        caching.add_pending_invites(
+            cm.normalized_email for cm in cohort_memberships if cm.user_id is None
         )
-        cohort_membership_ids = cohort_memberships.values_list("id", flat=True)
 
         transaction.on_commit(
             partial(
                 tasks.trigger_send_cohort_membership_invites.delay,
-                cohort_membership_ids=list(cohort_membership_ids),
+                cohort_membership_ids=[cm.id for cm in cohort_memberships],
             )
         )
 
@@ -215,11 +299,8 @@ class CohortMembershipCreateView(generics.CreateAPIView):
     def create_instance(self, validated_data, cohort):
         validated_data["cohort"] = cohort
 
-        User = get_user_model()
-        try:
-            validated_data["user"] = User.objects.get(email=validated_data.get("email"))
-        except User.DoesNotExist:
-            validated_data["user"] = None
+        email = validated_data.get("email")
+        validated_data["user"] = self.get_accounts([email]).get(normalize_email(email))
 
         cohort_membership = CohortMembership.objects.create(**validated_data)
 
@@ -252,6 +333,7 @@ class CohortMembershipCreateView(generics.CreateAPIView):
         )
 
 
+@method_decorator(instrument_view("membership_update"), name="dispatch")
 class CohortMembershipUpdateView(generics.UpdateAPIView):
     authentication_classes = [SessionAuthentication]
     permission_classes = [IsAuthenticated, ManagerEditPermission]
@@ -309,16 +391,16 @@ class CohortMembershipUpdateView(generics.UpdateAPIView):
         if not eligible_enrollment_records:
             return
 
-        unenrollment_results = []
-        for er in eligible_enrollment_records:
-            result = compat.update_student_enrollment(
-                er.offering.course_key,
-                cohort_member.email,
-                action=compat.UNENROLL_ACTION,
-            )
-            unenrollment_results.append(result)
+        compat.update_student_enrollments(
+            [
+                (er.offering.course_key, cohort_member.email)
+                for er in eligible_enrollment_records
+            ],
+            action=compat.UNENROLL_ACTION,
+        )
 
         eligible_enrollment_records.update(is_active=False)
+        generations.bump(generations.USER, [cohort_member.user_id])
 
     def perform_update(self, serializer):
         cohort_member = self.get_object()
@@ -329,10 +411,11 @@ class CohortMembershipUpdateView(generics.UpdateAPIView):
         return super().perform_update(serializer)
 
 
+@method_decorator(instrument_view("record_list"), name="dispatch")
 class EnrollmentRecordListView(generics.ListAPIView):
     authentication_classes = [SessionAuthentication]
     permission_classes = [IsAuthenticated]
-    serializer_class = serializers.EnrollmentRecordSerializer
+    serializer_class = serializers.EnrollmentRecordValuesSerializer
     pagination_class = LargeResultsSetPagination
 
     def get_queryset(self):
@@ -341,14 +424,31 @@ class EnrollmentRecordListView(generics.ListAPIView):
         managed_records = EnrollmentRecord.objects.active().filter(
             offering__partner__in=managed_partners.values_list("id", flat=True)
         )
-        return managed_records.select_related("user", "offering__partner")
+        return self.serializer_class.project(managed_records)
 
 
+@instrument_view("continue_learning")
 def continue_learning(request, offering_id):
-    offering = get_object_or_404(CohortOffering, id=offering_id)
-    return redirect(compat.make_course_url(offering.offering.course_key))
+    # The cached URL is replaced once a change to the cohort offering or the course
+    # it points to commits.
+    stamp = generations.get_stamp([(generations.COHORT_OFFERING, offering_id)])
+    cache_key = generations.versioned_key("continue_learning", offering_id, stamp=stamp)
+    course_url = cache.get(cache_key)
+    monitoring.record_cache("caching.continue_learning", hit=course_url is not None)
+    if course_url is None:
+        cohort_offering = (
+            CohortOffering.objects.select_related("offering")
+            .filter(id=offering_id)
+            .first()
+        )
+        if cohort_offering is None:
+            raise Http404("Cohort offering does not exist")
+        course_url = compat.make_course_url(cohort_offering.offering.course_key)
+        cache.set(cache_key, course_url, get_setting("CONTINUE_LEARNING_CACHE_TIMEOUT"))
+    return redirect(course_url)
 
 
+@instrument_view("enroll_member")
 @api_view(["POST"])
 @authentication_classes([SessionAuthentication])
 @permission_classes([IsAuthenticated])
@@ -362,3 +462,16 @@ def enroll_member(request, offering_id):
         offering.offering.course_key, user.email, action=compat.ENROLL_ACTION
     )
     return Response(enrollment_data)
+
+
+class SQLProfileView(APIView):
+    """Returns a SQL profile that staff requested for an earlier request."""
+
+    authentication_classes = [SessionAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, profile_id):
+        profile = profiling.get_sql_profile(profile_id)
+        if profile is None:
+            raise Http404("SQL profile does not exist or has expired")
+        return Response(profile)
@@ -54,3 +54,10 @@ def test(session, django):
     session.install(f"django~={django}")
     session.install("-r", "requirements.txt")
     session.run("pytest")
+
+
+@nox.session
+def benchmark(session):
+    """Runs the performance benchmarks, passing any arguments on to pytest."""
+    session.install("-r", "requirements.txt")
+    session.run("pytest", "benchmarks", "-s", *session.posargs)
@@ -0,0 +1,21 @@
+from django.core.cache import cache
+
+import pytest
+
+from mogc_partnerships import compat
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Keeps cached partnership data from leaking between tests."""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def stand_in_backend(mocker):
+    """Serves compat calls from an in-memory stand-in for edx-platform."""
+    backend = compat.StandInBackend(latency=0)
+    mocker.patch.object(compat, "_backend", backend)
+    return backend
@@ -0,0 +1,109 @@
+import pytest
+
+from mogc_partnerships import caching, factories, tasks
+
+
+@pytest.mark.django_db
+class TestPendingInvites:
+    """Tests for the cached set of emails with pending invites."""
+
+    def test_loaded_by_task_on_first_check(self, django_assert_num_queries, mocker):
+        """The first check queries the invite and queues the load, once."""
+        mock_delay = mocker.patch(
+            "mogc_partnerships.tasks.refresh_pending_invites.delay"
+        )
+        factories.CohortMembershipInviteFactory(email="Jane@Example.com")
+        factories.CohortMembershipFactory(email="john@example.com")
+
+        with django_assert_num_queries(1):
+            assert caching.has_pending_invite("jane@example.com")
+        assert not caching.has_pending_invite("john@example.com")
+        mock_delay.assert_called_once_with()
+
+        tasks.refresh_pending_invites()
+
+        with django_assert_num_queries(0):
+            assert caching.has_pending_invite("JANE@example.com")
+            assert not caching.has_pending_invite("john@example.com")
+            assert not caching.has_pending_invite("nobody@example.com")
+
+    def test_new_invite_added(self, django_capture_on_commit_callbacks):
+        caching.load_pending_invites()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            factories.CohortMembershipInviteFactory(email="jane@example.com")
+
+        assert caching.has_pending_invite("jane@example.com")
+
+    def test_removal_wins_over_load(self):
+        """An invite loaded as pending just before it was accepted isn't cached."""
+        caching.load_pending_invites()
+
+        caching.remove_pending_invites(["jane@example.com"])
+        caching.set_pending_invites(["jane@example.com"])
+
+        assert not caching.has_pending_invite("jane@example.com")
+
+    def test_entries_expire(self, settings, mocker):
+        """Entries and the loaded marker should have a finite timeout."""
+        settings.MOGC_PARTNERSHIPS_PENDING_INVITES_CACHE_TIMEOUT = 60
+        set_many = mocker.spy(caching.cache, "set_many")
+        set_ = mocker.spy(caching.cache, "set")
+        factories.CohortMembershipInviteFactory(email="jane@example.com")
+
+        caching.load_pending_invites()
+
+        assert set_many.call_args.args[1] == 60
+        set_.assert_any_call(caching.PENDING_INVITES_LOADED_CACHE_KEY, True, 60)
+
+    def test_deleted_invite_removed(self):
+        invite = factories.CohortMembershipInviteFactory(email="jane@example.com")
+        caching.load_pending_invites()
+
+        invite.delete()
+
+        assert not caching.has_pending_invite("jane@example.com")
+
+    def test_changed_email_removed(self, django_capture_on_commit_callbacks):
+        """Changing an invite's email should drop the entry for the old one."""
+        invite = factories.CohortMembershipInviteFactory(email="Old@Example.com")
+        caching.load_pending_invites()
+
+        invite.email = "new@example.com"
+        with django_capture_on_commit_callbacks(execute=True):
+            invite.save()
+
+        assert not caching.has_pending_invite("old@example.com")
+        assert caching.has_pending_invite("new@example.com")
+
+
+@pytest.mark.django_db
+class TestPartnerOrgs:
+    """Tests for the cached set of partner orgs."""
+
+    def test_invalidated_on_commit(self, django_capture_on_commit_callbacks):
+        """Orgs cached again before the new partner commits are still replaced."""
+        assert caching.get_partner_orgs() == frozenset()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            factories.PartnerFactory(org="NewOrg")
+            assert caching.get_partner_orgs() == frozenset()
+
+        assert caching.get_partner_orgs() == {"NewOrg"}
+
+
+@pytest.mark.django_db
+class TestPartnerOfferingIds:
+    """Tests for the process-local map of partner offering ids."""
+
+    def test_reloaded_on_commit(self, django_capture_on_commit_callbacks):
+        """Ids loaded again before the new offering commits are still replaced."""
+        assert caching.get_partner_offering_ids() == {}
+
+        with django_capture_on_commit_callbacks(execute=True):
+            offering = factories.PartnerOfferingFactory()
+            assert caching.get_partner_offering_ids() == {}
+
+        assert caching.get_partner_offering_ids() == {
+            str(offering.course_key): [offering.id]
+        }
@@ -0,0 +1,63 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+import pytest
+
+from mogc_partnerships import factories
+
+
+@pytest.mark.django_db
+class TestReconcilePartnerOfferingsCommand:
+    """Tests for the reconcile_partner_offerings management command."""
+
+    def test_reports_diff_for_each_partner(self, mocker):
+        """The command should reconcile every active partner and report the diff."""
+        partners = factories.PartnerFactory.create_batch(2)
+        factories.PartnerFactory(is_active=False)
+        mock_reconcile = mocker.patch(
+            "mogc_partnerships.management.commands."
+            "reconcile_partner_offerings.reconcile_partner_offerings",
+            side_effect=lambda partner_id, dry_run: {
+                "partner": f"partner-{partner_id}",
+                "created": ["course-v1:org+new+run"],
+                "updated": [],
+                "unchanged": 4,
+            },
+        )
+        stdout = StringIO()
+
+        call_command("reconcile_partner_offerings", "--dry-run", stdout=stdout)
+
+        assert mock_reconcile.call_count == 2
+        output = stdout.getvalue()
+        for partner in partners:
+            assert f"partner-{partner.id}: 1 created, 0 updated, 4 unchanged" in output
+        assert "  + course-v1:org+new+run" in output
+
+    def test_unknown_partner(self):
+        """Unknown partner slugs should be reported as errors."""
+        with pytest.raises(CommandError):
+            call_command("reconcile_partner_offerings", "--partner", "nobody")
+
+
+@pytest.mark.django_db
+class TestBackfillEnrollmentGradesCommand:
+    """Tests for the backfill_enrollment_grades management command."""
+
+    def test_backfills_every_partner_course(self, mocker):
+        """Each partner course should be backfilled once."""
+        course_id = "course-v1:GizmonicInstitute+MST3K+S1_E1"
+        factories.PartnerOfferingFactory.create_batch(2, course_key=course_id)
+        mock_backfill = mocker.patch(
+            "mogc_partnerships.management.commands."
+            "backfill_enrollment_grades.backfill_course_grades",
+            return_value=3,
+        )
+        stdout = StringIO()
+
+        call_command("backfill_enrollment_grades", stdout=stdout)
+
+        mock_backfill.assert_called_once_with(course_id)
+        assert f"{course_id}: 3 records updated" in stdout.getvalue()
@@ -0,0 +1,170 @@
+import threading
+import time
+
+import pytest
+from opaque_keys.edx.keys import CourseKey
+
+from mogc_partnerships import compat, factories
+
+COURSE_KEY = CourseKey.from_string("course-v1:GizmonicInstitute+MST3K+S1_E1")
+
+
+class TestEdxPlatformBackend:
+    """Tests for EdxPlatformBackend outside of edx-platform."""
+
+    def test_imports_resolved_once(self, mocker):
+        """Missing modules should be looked up once, when they are first needed."""
+        import_module = mocker.patch(
+            "mogc_partnerships.compat.import_module", side_effect=ImportError
+        )
+        backend = compat.EdxPlatformBackend()
+        assert import_module.call_count == 0
+        mocker.patch.object(compat, "_backend", backend)
+
+        result = compat.update_student_enrollment(
+            COURSE_KEY, "a@b.com", compat.ENROLL_ACTION
+        )
+        import_count = import_module.call_count
+        compat.update_student_enrollment(COURSE_KEY, "a@b.com", compat.ENROLL_ACTION)
+
+        assert result == {
+            "course_id": str(COURSE_KEY),
+            "course_home_url": "/",
+            "enrolled": False,
+        }
+        assert import_module.call_count == import_count
+
+    def test_unusable_modules_skipped(self, mocker):
+        """Modules of apps that aren't installed here should fall back too."""
+        mocker.patch(
+            "mogc_partnerships.compat.import_module",
+            side_effect=RuntimeError("Model class doesn't declare an app_label"),
+        )
+        mocker.patch.object(compat, "_backend", compat.EdxPlatformBackend())
+
+        assert compat.get_course_overview_or_none(COURSE_KEY) is None
+        assert list(compat.get_course_overviews_for_org("GizmonicInstitute", 10)) == []
+
+    def test_loaded_from_setting(self, mocker, settings):
+        mocker.patch.object(compat, "_backend", None)
+        settings.MOGC_PARTNERSHIPS_COMPAT_BACKEND = (
+            "mogc_partnerships.compat.StandInBackend"
+        )
+
+        compat.load_backend()
+
+        assert isinstance(compat.get_backend(), compat.StandInBackend)
+
+
+@pytest.mark.django_db
+class TestStandInBackend:
+    """Tests for the in-memory StandInBackend."""
+
+    def test_enrollments(self, stand_in_backend):
+        user = factories.UserFactory()
+
+        enrolled = compat.update_student_enrollment(
+            COURSE_KEY, user.email, compat.ENROLL_ACTION
+        )
+        compat.update_student_enrollment(COURSE_KEY, "a@b.com", compat.ENROLL_ACTION)
+        unenrolled = compat.update_student_enrollment(
+            COURSE_KEY, user.email, compat.UNENROLL_ACTION
+        )
+
+        assert enrolled["enrolled"]
+        assert not unenrolled["enrolled"]
+        ((_, user_id, mode, is_active, _),) = compat.get_course_enrollments(
+            COURSE_KEY, None, 10
+        )
+        assert (user_id, mode, is_active) == (user.id, "audit", False)
+
+    def test_course_overviews(self, stand_in_backend):
+        for run in range(5):
+            stand_in_backend.add_course_overview(
+                compat.StandInCourseOverview(
+                    id=CourseKey.from_string(f"course-v1:GizmonicInstitute+MST3K+{run}")
+                )
+            )
+        stand_in_backend.add_course_overview(
+            compat.StandInCourseOverview(id=CourseKey.from_string("course-v1:O+C+R"))
+        )
+
+        pages = list(compat.get_course_overviews_for_org("GizmonicInstitute", 2))
+
+        assert [len(page) for page in pages] == [2, 2, 1]
+        assert compat.get_course_overview_or_none("course-v1:O+C+R").org == "O"
+
+    def test_latency(self, mocker):
+        sleep = mocker.patch("mogc_partnerships.compat.time.sleep")
+        backend = compat.StandInBackend(latency=0.05)
+
+        backend.make_course_url(COURSE_KEY)
+
+        sleep.assert_called_once_with(0.05)
+
+
+class TestUpdateStudentEnrollments:
+    """Tests for the batch enrollment API."""
+
+    pairs = [
+        (CourseKey.from_string(f"course-v1:GizmonicInstitute+MST3K+{run}"), email)
+        for run in range(3)
+        for email in ("a@b.com", "c@d.com")
+    ]
+
+    @pytest.fixture
+    def thread_ids(self, mocker, stand_in_backend):
+        """The ids of the threads that made enrollment calls."""
+        thread_ids = set()
+        enroll_email = stand_in_backend.enroll_email
+
+        def record_thread(course_key, email):
+            thread_ids.add(threading.get_ident())
+            # Keep the thread busy so that the pool starts others.
+            time.sleep(0.01)
+            return enroll_email(course_key, email)
+
+        mocker.patch.object(stand_in_backend, "enroll_email", record_thread)
+        return thread_ids
+
+    @pytest.mark.django_db(transaction=True)
+    def test_results_in_order(self, thread_ids):
+        """Results should line up with the pairs, whichever thread made the call."""
+        results = compat.update_student_enrollments(self.pairs, compat.ENROLL_ACTION)
+
+        assert [(result["course_id"], result["email"]) for result in results] == [
+            (str(course_key), email) for course_key, email in self.pairs
+        ]
+        assert all(result["enrolled"] for result in results)
+        assert results[0]["course_home_url"] == compat.make_course_url(self.pairs[0][0])
+        assert len(thread_ids) > 1
+
+    @pytest.mark.django_db
+    def test_serial_in_transaction(self, thread_ids):
+        """Calls in a transaction should be made where they can see its writes."""
+        results = compat.update_student_enrollments(self.pairs, compat.ENROLL_ACTION)
+
+        assert all(result["enrolled"] for result in results)
+        assert thread_ids == {threading.get_ident()}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_serial_for_edx_platform(self, mocker):
+        """edx-platform calls use thread-local state, so they shouldn't be threaded."""
+        thread_ids = set()
+        backend = compat.EdxPlatformBackend()
+        mocker.patch.object(compat, "_backend", backend)
+        mocker.patch.object(
+            backend,
+            "enroll_email",
+            lambda course_key, email: thread_ids.add(threading.get_ident()),
+        )
+
+        compat.update_student_enrollments(self.pairs, compat.ENROLL_ACTION)
+
+        assert thread_ids == {threading.get_ident()}
+
+    def test_invalid_action(self, stand_in_backend):
+        results = compat.update_student_enrollments(self.pairs[:2], "lurk")
+
+        assert [result["enrolled"] for result in results] == [False, False]
+        assert stand_in_backend.enrollments == {}
@@ -0,0 +1,78 @@
+import pytest
+
+from mogc_partnerships import factories, generations, records
+
+
+def get_generation(namespace, id):
+    (generation,) = generations.get_generations([(namespace, id)])
+    return generation
+
+
+@pytest.mark.django_db
+class TestGenerations:
+    """Tests for the generation counters."""
+
+    def test_bump(self, django_capture_on_commit_callbacks):
+        """Bumps should take effect once the transaction commits."""
+        scopes = [(generations.PARTNER, 1), (generations.USER, 1)]
+        stamp = generations.get_stamp(scopes)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            generations.bump(generations.USER, [1, None])
+            assert generations.get_stamp(scopes) == stamp
+
+        assert generations.get_stamp(scopes) != stamp
+        assert generations.get_stamp(scopes[:1]) == generations.get_stamp(scopes[:1])
+
+    def test_cohort_offering_bumps_partner(self, django_capture_on_commit_callbacks):
+        cohort = factories.PartnerCohortFactory()
+        generation = get_generation(generations.PARTNER, cohort.partner_id)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            factories.CohortOfferingFactory(cohort=cohort)
+
+        assert get_generation(generations.PARTNER, cohort.partner_id) != generation
+
+    def test_bulk_writes_bump_users(self, django_capture_on_commit_callbacks):
+        """Writes that bypass signals should still bump their scopes."""
+        record = factories.EnrollmentRecordFactory()
+        generation = get_generation(generations.USER, record.user_id)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            records.apply_grade_updates(
+                {(record.user_id, str(record.offering.course_key)): {"grade": 90}}
+            )
+
+        assert get_generation(generations.USER, record.user_id) != generation
+
+
+@pytest.mark.django_db
+class TestGetUserScopes:
+    """Tests for get_user_scopes."""
+
+    def test_scopes(self, django_assert_num_queries):
+        """Users depend on the partners they manage or are members of."""
+        membership = factories.CohortMembershipFactory()
+        management = factories.PartnerManagementMembershipFactory(user=membership.user)
+        factories.PartnerFactory()
+        expected = {
+            (generations.USER, membership.user_id),
+            (generations.PARTNER, membership.cohort.partner_id),
+            (generations.PARTNER, management.partner_id),
+        }
+
+        assert set(generations.get_user_scopes(membership.user_id)) == expected
+        with django_assert_num_queries(0):
+            assert set(generations.get_user_scopes(membership.user_id)) == expected
+
+    def test_reloaded_on_membership_change(self, django_capture_on_commit_callbacks):
+        user = factories.UserFactory()
+        generations.get_user_scopes(user.id)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            membership = factories.CohortMembershipFactory(user=user)
+
+        assert (
+            generations.PARTNER,
+            membership.cohort.partner_id,
+        ) in generations.get_user_scopes(user.id)
@@ -1,6 +1,6 @@
 import pytest
 
-from mogc_partnerships import factories
+from mogc_partnerships import factories, models
 
 
 @pytest.mark.django_db
@@ -24,3 +24,27 @@ class TestEnrollmentRecord:
             str(record)
             == "username in course-v1:edX+DemoX+Demo_Course [Partner] - active: True"
         )
+
+
+@pytest.mark.django_db
+class TestCohortMembership:
+    """Tests for the CohortMembership model."""
+
+    def test_normalized_email(self):
+        membership = factories.CohortMembershipInviteFactory(
+            email=" Jane.Doe@Example.com"
+        )
+        assert membership.normalized_email == "jane.doe@example.com"
+
+        membership.email = "JOHN@example.com"
+        membership.save(update_fields=["email"])
+        membership.refresh_from_db()
+        assert membership.normalized_email == "john@example.com"
+
+    def test_for_emails(self):
+        membership = factories.CohortMembershipInviteFactory(email="Jane@Example.com")
+        factories.CohortMembershipInviteFactory(email="john@example.com")
+
+        matches = models.CohortMembership.objects.for_emails(["JANE@example.COM"])
+
+        assert list(matches) == [membership]
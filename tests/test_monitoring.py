@@ -0,0 +1,66 @@
+import pytest
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from mogc_partnerships import factories, models, monitoring, views
+
+
+@pytest.fixture
+def accumulate(mocker):
+    return mocker.patch("mogc_partnerships.monitoring.accumulate")
+
+
+def get_totals(accumulate):
+    totals = {}
+    for (name, value), _ in accumulate.call_args_list:
+        totals[name] = totals.get(name, 0) + value
+    return totals
+
+
+@pytest.mark.django_db
+class TestMonitor:
+    """Tests for the monitor context manager and decorator."""
+
+    def test_measures_recorded(self, accumulate):
+        with monitoring.monitor("tests.block"):
+            models.Partner.objects.count()
+            models.PartnerCohort.objects.count()
+
+        totals = get_totals(accumulate)
+        assert totals["mogc_partnerships.tests.block.calls"] == 1
+        assert totals["mogc_partnerships.tests.block.queries"] == 2
+        assert totals["mogc_partnerships.tests.block.duration_ms"] >= (
+            totals["mogc_partnerships.tests.block.db_ms"]
+        )
+
+    def test_disabled(self, accumulate, settings):
+        settings.MOGC_PARTNERSHIPS_MONITORING_ENABLED = False
+
+        with monitoring.monitor("tests.block"):
+            models.Partner.objects.count()
+        monitoring.record("tests.block", rows=1)
+
+        accumulate.assert_not_called()
+
+    def test_view_rows(self, accumulate):
+        user = factories.UserFactory()
+        factories.CohortMembershipFactory.create_batch(2, user=user)
+        request = APIRequestFactory().get("/partners/")
+        force_authenticate(request, user=user)
+
+        views.PartnerListView.as_view()(request)
+
+        totals = get_totals(accumulate)
+        assert totals["mogc_partnerships.views.partner_list.rows"] == 2
+        assert totals["mogc_partnerships.views.partner_list.queries"] > 0
+
+    def test_cache_hits(self, accumulate):
+        user = factories.CohortMembershipFactory().user
+        view = views.LearnerHomeView.as_view()
+        for _ in range(2):
+            request = APIRequestFactory().get("/home/")
+            force_authenticate(request, user=user)
+            view(request)
+
+        totals = get_totals(accumulate)
+        assert totals["mogc_partnerships.views.learner_home.cache_misses"] == 1
+        assert totals["mogc_partnerships.views.learner_home.cache_hits"] == 1
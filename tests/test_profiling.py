@@ -0,0 +1,97 @@
+import pytest
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from mogc_partnerships import factories, profiling, views
+
+
+@pytest.fixture(autouse=True)
+def profiling_enabled(settings):
+    settings.MOGC_PARTNERSHIPS_SQL_PROFILING_ENABLED = True
+
+
+def get_partner_list(user, **extra):
+    request = APIRequestFactory().get("/partners/", **extra)
+    force_authenticate(request, user=user)
+    return views.PartnerListView.as_view()(request)
+
+
+def get_summary(response):
+    header = response[profiling.PROFILE_RESPONSE_HEADER]
+    return dict(part.split("=") for part in header.split("; "))
+
+
+def test_fingerprint():
+    """Statements that differ only in their parameters share a fingerprint."""
+    assert profiling.fingerprint(
+        'SELECT * FROM "t" WHERE "id" IN (%s, %s) LIMIT 21'
+    ) == profiling.fingerprint('SELECT * FROM "t" WHERE "id" IN (%s) LIMIT 1')
+
+
+@pytest.mark.django_db
+class TestProfileView:
+    """Tests for profile_view."""
+
+    def test_profile_stored(self):
+        staff = factories.UserFactory(is_staff=True)
+        factories.CohortMembershipFactory.create_batch(2, user=staff)
+
+        response = get_partner_list(staff, HTTP_X_PARTNERSHIPS_PROFILE_SQL="1")
+
+        summary = get_summary(response)
+        profile = profiling.get_sql_profile(summary["id"])
+        assert profile["query_count"] == int(summary["queries"]) > 0
+        assert len(profile["queries"]) == profile["query_count"]
+        assert profile["path"] == "/partners/"
+
+        request = APIRequestFactory().get("/sql-profiles/")
+        force_authenticate(request, user=staff)
+        fetched = views.SQLProfileView.as_view()(request, profile_id=summary["id"])
+        assert fetched.data == profile
+
+    def test_duplicates(self):
+        staff = factories.UserFactory(is_staff=True)
+
+        @profiling.profile_view
+        @api_view(["GET"])
+        def view(request):
+            for membership in factories.CohortMembershipFactory.create_batch(3):
+                membership.refresh_from_db()
+            return Response()
+
+        request = APIRequestFactory().get("/", {"profile_sql": "1"})
+        force_authenticate(request, user=staff)
+        response = view(request)
+
+        profile = profiling.get_sql_profile(get_summary(response)["id"])
+        duplicates = profile["duplicates"]
+        assert 3 in [duplicate["count"] for duplicate in duplicates]
+
+    @pytest.mark.parametrize("is_staff,header", [(False, "1"), (True, "")])
+    def test_not_profiled(self, is_staff, header):
+        """Only staff requests that ask for a profile are profiled."""
+        user = factories.UserFactory(is_staff=is_staff)
+
+        response = get_partner_list(user, HTTP_X_PARTNERSHIPS_PROFILE_SQL=header)
+
+        assert profiling.PROFILE_RESPONSE_HEADER not in response
+
+    def test_disabled(self, settings):
+        settings.MOGC_PARTNERSHIPS_SQL_PROFILING_ENABLED = False
+        staff = factories.UserFactory(is_staff=True)
+
+        response = get_partner_list(staff, HTTP_X_PARTNERSHIPS_PROFILE_SQL="1")
+
+        assert profiling.PROFILE_RESPONSE_HEADER not in response
+
+    def test_profiles_staff_only(self):
+        user = factories.UserFactory()
+        request = APIRequestFactory().get("/sql-profiles/")
+        force_authenticate(request, user=user)
+
+        response = views.SQLProfileView.as_view()(
+            request, profile_id="6d1e2f6a-2a1d-4c8f-9d44-5c3a2f1e0b7a"
+        )
+
+        assert response.status_code == 403
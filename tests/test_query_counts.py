@@ -0,0 +1,377 @@
+"""
+Checks that no view or pipeline step makes more queries as its data grows.
+
+Each scenario builds its data for a given size and returns the call to check. The
+call runs against empty caches at every size in SIZES, and the test fails with the
+SQL of the smallest and largest runs if the number of queries changes.
+"""
+
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+import pytest
+from crum import impersonate
+from openedx_events.learning.data import (
+    CourseData,
+    CourseEnrollmentData,
+    UserData,
+    UserPersonalData,
+)
+from openedx_filters.learning.filters import (
+    CourseAboutRenderStarted,
+    CourseEnrollmentStarted,
+)
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from mogc_partnerships import factories, models, receivers, records, tasks, views
+
+SIZES = (2, 5, 20)
+
+
+@dataclass
+class CourseDetails:
+    """Stand-in for CourseDetails from edx-platform."""
+
+    org: str
+    course_id: str
+    run: str
+
+
+@pytest.fixture(autouse=True)
+def environment(mocker, settings, stand_in_backend):
+    # The scenarios create many users, which is slow with the default hasher.
+    settings.PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+    settings.OPEN_EDX_FILTERS_CONFIG = {
+        "org.openedx.learning.course.enrollment.started.v1": {
+            "fail_silently": False,
+            "pipeline": ["mogc_partnerships.pipeline.MembershipRequiredEnrollment"],
+        },
+        "org.openedx.learning.course_about.render.started.v1": {
+            "fail_silently": False,
+            "pipeline": ["mogc_partnerships.pipeline.HidePartnerCourseAboutPages"],
+        },
+    }
+    settings.MOGC_PARTNERSHIPS_INVITE_REMINDER_DAYS = 0
+    settings.MOGC_PARTNERSHIPS_INVITE_EXPIRY_DAYS = 0
+    mocker.patch.object(tasks.trigger_send_cohort_membership_reminders, "delay")
+    mocker.patch("edx_ace.ace.send")
+
+
+def call_view(view, user, method="get", data=None, **kwargs):
+    def call():
+        factory = APIRequestFactory()
+        if method == "get":
+            request = factory.get("/")
+        else:
+            request = getattr(factory, method)("/", data, format="json")
+        force_authenticate(request, user)
+        response = view(request, **kwargs)
+        assert response.status_code < 400, response.data
+
+    return call
+
+
+def create_manager(partner):
+    return factories.PartnerManagementMembershipFactory(partner=partner).user
+
+
+def create_learner_offerings(size):
+    """Creates a member of a cohort with size offerings, enrolled in each."""
+    membership = factories.CohortMembershipFactory()
+    for cohort_offering in factories.CohortOfferingFactory.create_batch(
+        size, cohort=membership.cohort
+    ):
+        factories.EnrollmentRecordFactory(
+            user=membership.user, offering=cohort_offering.offering
+        )
+    return membership
+
+
+def old_invites(size):
+    invites = factories.CohortMembershipInviteFactory.create_batch(size)
+    models.CohortMembership.objects.filter(pk__in=[i.pk for i in invites]).update(
+        created_at=timezone.now() - timedelta(days=1)
+    )
+    return invites
+
+
+def partner_list_for_manager(size):
+    user = factories.UserFactory()
+    for partner in factories.PartnerFactory.create_batch(size):
+        factories.PartnerManagementMembershipFactory(partner=partner, user=user)
+        factories.PartnerOfferingFactory(partner=partner)
+    return call_view(views.PartnerListView.as_view(), user)
+
+
+def partner_list_for_learner(size):
+    user = factories.UserFactory()
+    factories.CohortMembershipFactory.create_batch(size, user=user, email=user.email)
+    return call_view(views.PartnerListView.as_view(), user)
+
+
+def learner_home(size):
+    membership = create_learner_offerings(size)
+    return call_view(views.LearnerHomeView.as_view(), membership.user)
+
+
+def offering_list(size):
+    membership = create_learner_offerings(size)
+    return call_view(views.CohortOfferingListView.as_view(), membership.user)
+
+
+def cohort_list(size):
+    partner = factories.PartnerFactory()
+    factories.PartnerCohortFactory.create_batch(size, partner=partner)
+    return call_view(views.CohortListView.as_view(), create_manager(partner))
+
+
+def cohort_detail(size):
+    cohort = factories.PartnerCohortFactory()
+    factories.CohortMembershipFactory.create_batch(size, cohort=cohort)
+    return call_view(
+        views.CohortDetailView.as_view(),
+        create_manager(cohort.partner),
+        uuid=cohort.uuid,
+    )
+
+
+def offering_create(size):
+    cohort = factories.PartnerCohortFactory()
+    factories.CohortOfferingFactory.create_batch(size, cohort=cohort)
+    offering = factories.PartnerOfferingFactory(partner=cohort.partner)
+    return call_view(
+        views.CohortOfferingCreateView.as_view(),
+        create_manager(cohort.partner),
+        method="post",
+        data={"offering": offering.id},
+        cohort_uuid=cohort.uuid,
+    )
+
+
+def enroll_member(size):
+    membership = create_learner_offerings(size)
+    cohort_offering = membership.cohort.offerings.first()
+    return call_view(
+        views.enroll_member,
+        membership.user,
+        method="post",
+        offering_id=cohort_offering.id,
+    )
+
+
+def continue_learning(size):
+    membership = create_learner_offerings(size)
+    cohort_offering = membership.cohort.offerings.first()
+
+    @override_settings(ROOT_URLCONF="mogc_partnerships.urls")
+    def call():
+        request = APIRequestFactory().get("/")
+        request.user = membership.user
+        assert views.continue_learning(request, cohort_offering.id).status_code == 302
+
+    return call
+
+
+def membership_list(size):
+    cohort = factories.PartnerCohortFactory()
+    factories.CohortMembershipFactory.create_batch(size, cohort=cohort)
+    factories.CohortMembershipInviteFactory.create_batch(size, cohort=cohort)
+    return call_view(
+        views.CohortMembershipListView.as_view(), create_manager(cohort.partner)
+    )
+
+
+def record_list(size):
+    offering = factories.PartnerOfferingFactory()
+    factories.EnrollmentRecordFactory.create_batch(size, offering=offering)
+    return call_view(
+        views.EnrollmentRecordListView.as_view(), create_manager(offering.partner)
+    )
+
+
+def membership_create(size):
+    cohort = factories.PartnerCohortFactory()
+    factories.CohortMembershipFactory.create_batch(size, cohort=cohort)
+    return call_view(
+        views.CohortMembershipCreateView.as_view(),
+        create_manager(cohort.partner),
+        method="post",
+        data={"email": "new-member@example.com"},
+        cohort_uuid=cohort.uuid,
+    )
+
+
+def membership_bulk_create(size):
+    """Adds size members, half of whom already have accounts."""
+    cohort = factories.PartnerCohortFactory()
+    users = factories.UserFactory.create_batch(size // 2)
+    emails = [user.email for user in users]
+    emails += [f"invite-{i}@example.com" for i in range(size - len(users))]
+    return call_view(
+        views.CohortMembershipCreateView.as_view(),
+        create_manager(cohort.partner),
+        method="post",
+        data=[{"email": email} for email in emails],
+        cohort_uuid=cohort.uuid,
+    )
+
+
+def membership_deactivate(size):
+    """Deactivating a membership unenrolls the member from the cohort's courses."""
+    membership = create_learner_offerings(size)
+    return call_view(
+        views.CohortMembershipUpdateView.as_view(),
+        create_manager(membership.cohort.partner),
+        method="patch",
+        data={"active": False},
+        cohort_uuid=membership.cohort.uuid,
+        pk=membership.pk,
+    )
+
+
+def membership_required_enrollment(size):
+    membership = create_learner_offerings(size)
+    factories.CohortMembershipFactory.create_batch(
+        size, user=membership.user, email=membership.email
+    )
+    course_key = membership.cohort.offerings.first().offering.course_key
+    return lambda: CourseEnrollmentStarted.run_filter(
+        membership.user, course_key, "audit"
+    )
+
+
+def hide_partner_course_about_pages(size):
+    membership = create_learner_offerings(size)
+    factories.CohortMembershipFactory.create_batch(
+        size, user=membership.user, email=membership.email
+    )
+    course_key = membership.cohort.offerings.first().offering.course_key
+    context = {
+        "course_details": CourseDetails(
+            course_key.org, course_key.course, course_key.run
+        )
+    }
+
+    def call():
+        with impersonate(membership.user):
+            CourseAboutRenderStarted.run_filter(context, "about.html")
+
+    return call
+
+
+def link_user_to_invite(size):
+    user = factories.UserFactory(is_active=False)
+    factories.CohortMembershipInviteFactory.create_batch(size, email=user.email)
+    user_data = UserData(
+        id=user.id,
+        is_active=False,
+        pii=UserPersonalData(username=user.username, email=user.email, name=""),
+    )
+    return lambda: receivers.link_user_to_invite(user_data)
+
+
+def update_enrollment_records(size):
+    """A course offered by size partners has a record for each of them."""
+    offering = factories.PartnerOfferingFactory()
+    factories.PartnerOfferingFactory.create_batch(
+        size - 1, course_key=offering.course_key
+    )
+    user = factories.UserFactory()
+    enrollment = CourseEnrollmentData(
+        user=UserData(
+            id=user.id,
+            is_active=True,
+            pii=UserPersonalData(username=user.username, email=user.email, name=""),
+        ),
+        course=CourseData(course_key=offering.course_key),
+        mode="audit",
+        is_active=True,
+        creation_date=timezone.now(),
+    )
+    return lambda: receivers.update_enrollment_records(enrollment)
+
+
+def apply_grade_updates(size):
+    offering = factories.PartnerOfferingFactory()
+    updates = {
+        (record.user_id, str(offering.course_key)): {"grade": 90}
+        for record in factories.EnrollmentRecordFactory.create_batch(
+            size, offering=offering
+        )
+    }
+    return lambda: records.apply_grade_updates(updates)
+
+
+def send_invites(size):
+    members = factories.CohortMembershipFactory.create_batch(size)
+    members += factories.CohortMembershipInviteFactory.create_batch(size)
+    return lambda: tasks.trigger_send_cohort_membership_invites([m.pk for m in members])
+
+
+def send_pending_invite_reminders(size):
+    old_invites(size)
+    return tasks.send_pending_invite_reminders
+
+
+def expire_pending_invites(size):
+    old_invites(size)
+    return tasks.expire_pending_invites
+
+
+SCENARIOS = [
+    partner_list_for_manager,
+    partner_list_for_learner,
+    learner_home,
+    offering_list,
+    cohort_list,
+    cohort_detail,
+    offering_create,
+    enroll_member,
+    continue_learning,
+    membership_list,
+    record_list,
+    membership_create,
+    membership_bulk_create,
+    membership_deactivate,
+    membership_required_enrollment,
+    hide_partner_course_about_pages,
+    link_user_to_invite,
+    update_enrollment_records,
+    apply_grade_updates,
+    send_invites,
+    send_pending_invite_reminders,
+    expire_pending_invites,
+]
+
+
+def capture_queries(scenario, size):
+    """Returns the SQL of a scenario's call, rolling back everything it wrote."""
+    with transaction.atomic():
+        call = scenario(size)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            call()
+        transaction.set_rollback(True)
+    return [query["sql"] for query in queries.captured_queries]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("scenario", SCENARIOS, ids=lambda s: s.__name__)
+def test_queries_do_not_grow_with_rows(scenario):
+    queries = {size: capture_queries(scenario, size) for size in SIZES}
+
+    counts = [len(sql) for sql in queries.values()]
+    if len(set(counts)) > 1:
+        smallest, largest = queries[SIZES[0]], queries[SIZES[-1]]
+        pytest.fail(
+            f"{scenario.__name__} made {counts} queries for {SIZES} rows.\n\n"
+            f"With {SIZES[0]} rows:\n" + "\n".join(smallest) + "\n\n"
+            f"With {SIZES[-1]} rows:\n" + "\n".join(largest),
+            pytrace=False,
+        )
@@ -0,0 +1,555 @@
+import warnings
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+import pytest
+from opaque_keys.edx.keys import CourseKey
+from openedx_events.data import EventsMetadata
+from openedx_events.learning.data import (
+    CourseData,
+    CourseEnrollmentData,
+    UserData,
+    UserPersonalData,
+)
+
+from mogc_partnerships import caching, factories, receivers, tasks
+from mogc_partnerships.models import BufferedEnrollmentEvent, EnrollmentRecord
+from mogc_partnerships.records import grade_update_key
+
+try:
+    from openedx_events.learning.data import (
+        CoursePassingStatusData,
+        PersistentCourseGradeData,
+    )
+except ImportError:
+    # Older openedx-events releases don't send grade events.
+    CoursePassingStatusData = PersistentCourseGradeData = None
+
+
+def make_user_data(user):
+    return UserData(
+        id=user.id,
+        is_active=user.is_active,
+        pii=UserPersonalData(
+            username=user.username, email=user.email, name=user.username
+        ),
+    )
+
+
+def make_enrollment_data(user, course_key, is_active=True, creation_date=None):
+    return CourseEnrollmentData(
+        user=make_user_data(user),
+        course=CourseData(course_key=course_key),
+        mode="audit",
+        is_active=is_active,
+        creation_date=creation_date or timezone.now(),
+    )
+
+
+def make_metadata(time):
+    metadata = EventsMetadata(
+        event_type="org.openedx.learning.course.enrollment.created.v1",
+        minorversion=0,
+    )
+    object.__setattr__(metadata, "time", time)
+    return metadata
+
+
+@pytest.mark.django_db
+class TestLinkUserToInvite:
+    """Tests for the link_user_to_invite receiver."""
+
+    def test_invites_linked(self, django_assert_num_queries):
+        """Registering users should be linked to their invites and activated."""
+        user = factories.UserFactory(is_active=False)
+        invites = factories.CohortMembershipInviteFactory.create_batch(
+            2, email=user.email
+        )
+        other_invite = factories.CohortMembershipInviteFactory()
+
+        with django_assert_num_queries(3):
+            receivers.link_user_to_invite(make_user_data(user))
+
+        user.refresh_from_db()
+        assert user.is_active
+        for invite in invites:
+            invite.refresh_from_db()
+            assert invite.user == user
+        other_invite.refresh_from_db()
+        assert other_invite.user is None
+
+    def test_registration_without_invite(self, django_assert_num_queries):
+        """Registrations without an invite should only be checked."""
+        user = factories.UserFactory(is_active=False)
+        factories.CohortMembershipInviteFactory()
+
+        with django_assert_num_queries(1):
+            receivers.link_user_to_invite(make_user_data(user))
+
+        user.refresh_from_db()
+        assert not user.is_active
+
+    def test_invite_email_case_ignored(self):
+        """Invites should be linked even if the case of the email differs."""
+        user = factories.UserFactory(email="jane@example.com")
+        invite = factories.CohortMembershipInviteFactory(email="Jane@Example.com")
+
+        receivers.link_user_to_invite(make_user_data(user))
+
+        invite.refresh_from_db()
+        assert invite.user == user
+
+    def test_pending_invite_cache_updated(self):
+        """Linked invites should no longer be cached as pending."""
+        user = factories.UserFactory(email="jane@example.com")
+        factories.CohortMembershipInviteFactory(email=user.email)
+        caching.load_pending_invites()
+
+        receivers.link_user_to_invite(make_user_data(user))
+
+        assert not caching.has_pending_invite(user.email)
+
+
+@pytest.mark.django_db
+class TestUpdateEnrollmentRecords:
+    """Tests for the update_enrollment_records receiver."""
+
+    def _setup(self):
+        self.user = factories.UserFactory()
+        self.course_key = CourseKey.from_string(
+            "course-v1:GizmonicInstitute+MST3K+S1_E1"
+        )
+        self.offerings = factories.PartnerOfferingFactory.create_batch(
+            3, course_key=self.course_key
+        )
+        self.creation_date = timezone.now() - timedelta(days=1)
+
+    def _send(self, is_active=True, time=None, creation_date=None):
+        receivers.update_enrollment_records(
+            make_enrollment_data(
+                self.user,
+                self.course_key,
+                is_active=is_active,
+                creation_date=creation_date or self.creation_date,
+            ),
+            metadata=make_metadata(time or timezone.now()),
+        )
+
+    @pytest.mark.skipif(
+        not getattr(connection.features, "supports_update_conflicts", False),
+        reason="Records are upserted with several statements without native upserts",
+    )
+    def test_records_written_in_one_upsert(self, django_assert_num_queries):
+        """Records for every matching offering should be written by one statement."""
+        self._setup()
+        caching.get_partner_offering_ids()
+
+        # A locking read and the upsert, in a savepoint.
+        with django_assert_num_queries(4):
+            self._send()
+
+        records = EnrollmentRecord.objects.filter(user=self.user)
+        assert records.count() == 3
+        assert all(record.is_active for record in records)
+        assert all(record.mode == "audit" for record in records)
+
+    def test_existing_records_updated(self):
+        """Later events should update existing records in place."""
+        self._setup()
+        factories.EnrollmentRecordFactory(
+            user=self.user,
+            offering=self.offerings[0],
+            creation_date=self.creation_date,
+            grade=80,
+        )
+
+        self._send(is_active=False)
+
+        records = EnrollmentRecord.objects.filter(user=self.user)
+        assert records.count() == 3
+        assert not any(record.is_active for record in records)
+        assert records.get(offering=self.offerings[0]).grade == 80
+
+    def test_out_of_order_event_ignored(self):
+        """Events sent before the one already applied should not regress records."""
+        self._setup()
+        now = timezone.now()
+
+        self._send(is_active=False, time=now)
+        self._send(is_active=True, time=now - timedelta(seconds=5))
+
+        records = EnrollmentRecord.objects.filter(user=self.user)
+        assert not any(record.is_active for record in records)
+
+    def test_older_enrollment_ignored(self):
+        """Events for an enrollment older than the recorded one should be ignored."""
+        self._setup()
+
+        self._send(is_active=True)
+        self._send(
+            is_active=False,
+            time=timezone.now() + timedelta(seconds=5),
+            creation_date=self.creation_date - timedelta(days=1),
+        )
+
+        records = EnrollmentRecord.objects.filter(user=self.user)
+        assert all(record.is_active for record in records)
+
+    def test_upsert_fallback(self, mocker):
+        """Records should be upserted without native conflict handling."""
+        self._setup()
+        mocker.patch.object(
+            connection.features, "supports_update_conflicts", False, create=True
+        )
+        factories.EnrollmentRecordFactory(
+            user=self.user, offering=self.offerings[0], creation_date=self.creation_date
+        )
+        modified_at = EnrollmentRecord.objects.get().modified_at
+
+        self._send(is_active=False)
+
+        records = EnrollmentRecord.objects.filter(user=self.user)
+        assert records.count() == 3
+        assert not any(record.is_active for record in records)
+        assert records.get(offering=self.offerings[0]).modified_at > modified_at
+
+    def test_non_partner_course_ignored(self, django_assert_num_queries):
+        """Enrollments in non-partner courses should be ignored without queries."""
+        self._setup()
+        self.course_key = CourseKey.from_string("course-v1:edX+DemoX+Demo_Course")
+        caching.get_partner_offering_ids()
+
+        with django_assert_num_queries(0):
+            self._send()
+
+        assert not EnrollmentRecord.objects.exists()
+
+    def test_new_offering_invalidates_course_keys(
+        self, django_capture_on_commit_callbacks
+    ):
+        """Enrollments should be recorded for offerings created after a lookup."""
+        self._setup()
+        caching.get_partner_offering_ids()
+        with django_capture_on_commit_callbacks(execute=True):
+            offering = factories.PartnerOfferingFactory(
+                course_key="course-v1:GizmonicInstitute+MST3K+S2_E1"
+            )
+        self.course_key = offering.course_key
+
+        self._send()
+
+        assert EnrollmentRecord.objects.filter(offering=offering).exists()
+
+
+@pytest.mark.django_db
+class TestBufferedEnrollmentRecords(TestUpdateEnrollmentRecords):
+    """Tests for update_enrollment_records with buffered events."""
+
+    @pytest.fixture(autouse=True)
+    def buffer_enrollment_events(self, settings):
+        settings.MOGC_PARTNERSHIPS_BUFFER_ENROLLMENT_EVENTS = True
+
+    def _send(self, *args, **kwargs):
+        super()._send(*args, **kwargs)
+        tasks.flush_enrollment_events()
+
+    def test_records_written_in_one_upsert(self):
+        """Buffered events should be applied to records by a single upsert."""
+        self._setup()
+
+        for _ in range(3):
+            super()._send()
+        with CaptureQueriesContext(connection) as queries:
+            tasks.flush_enrollment_events()
+
+        inserts = [q for q in queries if q["sql"].startswith("INSERT")]
+        assert len(inserts) == 1
+        assert EnrollmentRecord.objects.filter(user=self.user).count() == 3
+        assert not BufferedEnrollmentEvent.objects.exists()
+
+    def test_non_partner_course_ignored(self, django_assert_num_queries):
+        """Events for non-partner courses should not be buffered."""
+        self._setup()
+        self.course_key = CourseKey.from_string("course-v1:edX+DemoX+Demo_Course")
+        caching.get_partner_offering_ids()
+
+        with django_assert_num_queries(0):
+            super()._send()
+
+        assert not BufferedEnrollmentEvent.objects.exists()
+
+    def test_events_buffered(self):
+        """Events should be queued instead of written to records."""
+        self._setup()
+
+        super()._send()
+
+        assert BufferedEnrollmentEvent.objects.count() == 1
+        assert not EnrollmentRecord.objects.exists()
+
+    def test_last_buffered_event_wins(self):
+        """The most recently sent of the buffered events should be applied."""
+        self._setup()
+        now = timezone.now()
+
+        super()._send(is_active=True, time=now)
+        super()._send(is_active=False, time=now + timedelta(seconds=5))
+        super()._send(is_active=True, time=now + timedelta(seconds=1))
+        tasks.flush_enrollment_events()
+
+        records = EnrollmentRecord.objects.filter(user=self.user)
+        assert records.count() == 3
+        assert not any(record.is_active for record in records)
+
+    def test_flush_skipped_when_not_buffering(
+        self, settings, django_assert_num_queries
+    ):
+        """The periodic flush should only check the queue while not buffering."""
+        settings.MOGC_PARTNERSHIPS_BUFFER_ENROLLMENT_EVENTS = False
+
+        with django_assert_num_queries(1):
+            assert tasks.flush_enrollment_events() == 0
+
+    def test_flush_drains_queue_after_buffering_disabled(self, settings):
+        """Events queued before buffering was turned off should still be applied."""
+        self._setup()
+        super()._send()
+        settings.MOGC_PARTNERSHIPS_BUFFER_ENROLLMENT_EVENTS = False
+
+        assert tasks.flush_enrollment_events() == 1
+
+        assert EnrollmentRecord.objects.filter(user=self.user).count() == 3
+        assert not BufferedEnrollmentEvent.objects.exists()
+
+    @override_settings(MOGC_PARTNERSHIPS_ENROLLMENT_EVENT_FLUSH_SIZE=2)
+    def test_flush_triggered_by_size(self, mocker, django_capture_on_commit_callbacks):
+        """A flush should be queued each time the buffer reaches the flush size."""
+        mock_flush_task = mocker.patch(
+            "mogc_partnerships.tasks.flush_enrollment_events.delay"
+        )
+        self._setup()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            for _ in range(5):
+                super()._send()
+
+        assert mock_flush_task.call_count == 2
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(
+    PersistentCourseGradeData is None, reason="openedx-events has no grade events"
+)
+class TestGradeReceivers:
+    """Tests for the update_grade_records and update_passing_status receivers."""
+
+    def _setup(self):
+        self.course_key = CourseKey.from_string(
+            "course-v1:GizmonicInstitute+MST3K+S1_E1"
+        )
+        self.records = factories.EnrollmentRecordFactory.create_batch(
+            3, offering__course_key=self.course_key
+        )
+
+    def _send_grade(self, record, percent_grade):
+        receivers.update_grade_records(
+            PersistentCourseGradeData(
+                user_id=record.user_id,
+                course=CourseData(course_key=self.course_key),
+                course_edited_timestamp=timezone.now(),
+                course_version="",
+                grading_policy_hash="",
+                percent_grade=percent_grade,
+                letter_grade="",
+                passed_timestamp=None,
+            )
+        )
+
+    def _send_passing_status(self, record, is_passing):
+        receivers.update_passing_status(
+            CoursePassingStatusData(
+                is_passing=is_passing,
+                course=CourseData(course_key=self.course_key),
+                user=UserData(
+                    id=record.user_id,
+                    is_active=True,
+                    pii=UserPersonalData(username="", email="", name=""),
+                ),
+            )
+        )
+
+    def _flush(self, mock_flush_task):
+        for call in mock_flush_task.call_args_list:
+            tasks.flush_grade_updates(*call.args[0])
+
+    def test_grade_changes_coalesced(self, mocker, django_assert_num_queries):
+        """Grade changes in a window should be written once, with the latest values."""
+        mock_flush_task = mocker.patch(
+            "mogc_partnerships.tasks.flush_grade_updates.apply_async"
+        )
+        mocker.patch("mogc_partnerships.caching.time.time", return_value=0)
+        self._setup()
+
+        for percent_grade in (0.1, 0.5, 0.87):
+            for record in self.records:
+                self._send_grade(record, percent_grade)
+        self._send_passing_status(self.records[0], True)
+        with django_assert_num_queries(2):
+            self._flush(mock_flush_task)
+
+        assert mock_flush_task.call_count == 1
+        assert mock_flush_task.call_args.kwargs == {"countdown": 31}
+        for record in self.records:
+            record.refresh_from_db()
+            assert record.grade == 87
+        assert self.records[0].is_successful is True
+        assert self.records[1].is_successful is False
+
+    def test_changes_after_flush_queued_again(self, mocker):
+        """Changes arriving after a flush should be written by a later flush."""
+        mock_flush_task = mocker.patch(
+            "mogc_partnerships.tasks.flush_grade_updates.apply_async"
+        )
+        mocker.patch("mogc_partnerships.caching.time.time", return_value=0)
+        self._setup()
+
+        self._send_grade(self.records[0], 0.5)
+        self._flush(mock_flush_task)
+        mocker.patch("mogc_partnerships.caching.time.time", return_value=31)
+        self._send_passing_status(self.records[0], True)
+        tasks.flush_grade_updates(*mock_flush_task.call_args.args[0])
+
+        self.records[0].refresh_from_db()
+        assert mock_flush_task.call_count == 2
+        assert self.records[0].grade == 50
+        assert self.records[0].is_successful is True
+
+    def test_long_course_ids(self, mocker):
+        """Cache keys should stay within memcached's limit for long course ids."""
+        mock_flush_task = mocker.patch(
+            "mogc_partnerships.tasks.flush_grade_updates.apply_async"
+        )
+        self.course_key = CourseKey.from_string(
+            f"course-v1:GizmonicInstitute+{'MST3K' * 50}+S1_E1"
+        )
+        record = factories.EnrollmentRecordFactory(offering__course_key=self.course_key)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", CacheKeyWarning)
+            self._send_grade(record, 0.5)
+            self._flush(mock_flush_task)
+
+        record.refresh_from_db()
+        assert record.grade == 50
+
+    def test_expired_changes_logged(self, mocker, caplog):
+        """Changes whose cached values expired before the flush should be logged."""
+        mock_flush_task = mocker.patch(
+            "mogc_partnerships.tasks.flush_grade_updates.apply_async"
+        )
+        self._setup()
+
+        self._send_grade(self.records[0], 0.5)
+        cache.delete(
+            grade_update_key(self.records[0].user_id, str(self.course_key), "grade")
+        )
+        self._flush(mock_flush_task)
+
+        self.records[0].refresh_from_db()
+        assert self.records[0].grade != 50
+        assert "Grade changes for 1 learners expired" in caplog.text
+
+    def test_changes_without_record_logged(self, mocker, caplog):
+        """Changes for learners without an enrollment record should be logged."""
+        mock_flush_task = mocker.patch(
+            "mogc_partnerships.tasks.flush_grade_updates.apply_async"
+        )
+        self._setup()
+        user = factories.UserFactory()
+
+        self._send_grade(EnrollmentRecord(user_id=user.id), 0.5)
+        self._flush(mock_flush_task)
+
+        assert "Grade changes for 1 learners have no enrollment record" in caplog.text
+
+    def test_non_partner_course_ignored(self, mocker, django_assert_num_queries):
+        """Grade changes in non-partner courses should be ignored without queries."""
+        mock_flush_task = mocker.patch(
+            "mogc_partnerships.tasks.flush_grade_updates.apply_async"
+        )
+        self._setup()
+        caching.get_partner_offering_ids()
+        self.course_key = CourseKey.from_string("course-v1:edX+DemoX+Demo_Course")
+
+        with django_assert_num_queries(0):
+            self._send_grade(self.records[0], 0.5)
+
+        assert mock_flush_task.call_count == 0
+
+
+@pytest.mark.django_db
+class TestCreateOfferingOnPublish:
+    """Tests for the create_offering_on_publish receiver."""
+
+    def test_non_partner_publish_ignored(self, mocker):
+        """Publishes for orgs without a partner should not queue a sync."""
+        mock_sync_task = mocker.patch(
+            "mogc_partnerships.tasks.update_or_create_offering.apply_async"
+        )
+        course_key = CourseKey.from_string("course-v1:GizmonicInstitute+MST3K+S1_E1")
+
+        receivers.create_offering_on_publish(None, course_key)
+
+        assert mock_sync_task.call_count == 0
+
+    def test_repeated_publishes_are_collapsed(self, mocker):
+        """Publishes within the debounce window should queue a single sync."""
+        mock_sync_task = mocker.patch(
+            "mogc_partnerships.tasks.update_or_create_offering.apply_async"
+        )
+        course_key = CourseKey.from_string("course-v1:GizmonicInstitute+MST3K+S1_E1")
+        factories.PartnerFactory(org=course_key.org)
+
+        for _ in range(5):
+            receivers.create_offering_on_publish(None, course_key)
+
+        mock_sync_task.assert_called_once_with((str(course_key),), countdown=60)
+
+    def test_publish_after_sync_queues_again(self, mocker):
+        """Publishes made once the trailing sync has started should queue another."""
+        mock_sync_task = mocker.patch(
+            "mogc_partnerships.tasks.update_or_create_offering.apply_async"
+        )
+        mocker.patch(
+            "mogc_partnerships.tasks.get_course_overview_or_none", return_value=None
+        )
+        course_key = CourseKey.from_string("course-v1:GizmonicInstitute+MST3K+S1_E1")
+        factories.PartnerFactory(org=course_key.org)
+
+        receivers.create_offering_on_publish(None, course_key)
+        tasks.update_or_create_offering(str(course_key))
+        receivers.create_offering_on_publish(None, course_key)
+
+        assert mock_sync_task.call_count == 2
+
+    def test_new_partner_invalidates_orgs(
+        self, mocker, django_capture_on_commit_callbacks
+    ):
+        """Creating a partner should make its publishes sync immediately."""
+        mock_sync_task = mocker.patch(
+            "mogc_partnerships.tasks.update_or_create_offering.apply_async"
+        )
+        course_key = CourseKey.from_string("course-v1:GizmonicInstitute+MST3K+S1_E1")
+
+        receivers.create_offering_on_publish(None, course_key)
+        with django_capture_on_commit_callbacks(execute=True):
+            factories.PartnerFactory(org=course_key.org)
+        receivers.create_offering_on_publish(None, course_key)
+
+        assert mock_sync_task.call_count == 1
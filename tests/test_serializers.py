@@ -0,0 +1,81 @@
+import pytest
+
+from mogc_partnerships import factories, models, serializers
+
+
+@pytest.mark.django_db
+class TestGetContextIds:
+    """Tests for the get_context_ids helper."""
+
+    def test_queryset_evaluated_once(self, django_assert_num_queries):
+        """Lazy querysets should be converted to a set shared by all children."""
+        partners = factories.PartnerFactory.create_batch(3)
+        associations = models.Partner.objects.filter(id=partners[0].id).values_list(
+            "id", flat=True
+        )
+        serializer = serializers.PartnerSerializer(
+            partners, many=True, context={"associations": associations}
+        )
+
+        with django_assert_num_queries(4):
+            data = serializer.data
+
+        assert [item["is_manager"] for item in data] == [True, False, False]
+        assert serializer.context["associations"] == {partners[0].id}
+
+    def test_missing_ids(self):
+        partner = factories.PartnerFactory()
+
+        assert not serializers.PartnerSerializer(partner).data["is_manager"]
+
+
+def serialize_values(serializer_class, queryset):
+    rows = serializer_class.project(queryset)
+    return serializer_class(rows, many=True).data
+
+
+@pytest.mark.django_db
+class TestValuesSerializerParity:
+    """The values() serializers should match their model serializers exactly."""
+
+    def test_cohort_memberships(self):
+        factories.CohortMembershipFactory()
+        factories.CohortMembershipFactory(active=False)
+        factories.CohortMembershipInviteFactory()
+        factories.CohortMembershipInviteFactory(active=False)
+        queryset = models.CohortMembership.objects.order_by("id")
+
+        expected = serializers.CohortMembershipSerializer(queryset, many=True).data
+
+        assert serialize_values(
+            serializers.CohortMembershipValuesSerializer, queryset
+        ) == [dict(item) for item in expected]
+
+    def test_name_left_out_without_profile(self):
+        """Users without a profile get no name, like the model serializer."""
+        membership = factories.CohortMembershipFactory()
+        row = serializers.CohortMembershipValuesSerializer.project(
+            models.CohortMembership.objects.all()
+        ).get()
+
+        data = serializers.CohortMembershipValuesSerializer(
+            {**row, "user__profile__name": None}
+        ).data
+        named = serializers.CohortMembershipValuesSerializer(
+            {**row, "user__profile__name": "Jane Doe"}
+        ).data
+
+        assert "name" not in data
+        assert data["user"] == membership.user.username
+        assert named["name"] == "Jane Doe"
+
+    def test_enrollment_records(self):
+        factories.EnrollmentRecordFactory()
+        factories.EnrollmentRecordFactory(is_active=False, is_complete=True)
+        queryset = models.EnrollmentRecord.objects.order_by("id")
+
+        expected = serializers.EnrollmentRecordSerializer(queryset, many=True).data
+
+        assert serialize_values(
+            serializers.EnrollmentRecordValuesSerializer, queryset
+        ) == [dict(item) for item in expected]
@@ -0,0 +1,438 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from typing import Optional
+
+from django.test import override_settings
+from django.utils import timezone
+
+import pytest
+from opaque_keys.edx.keys import CourseKey
+
+from mogc_partnerships import factories, tasks
+from mogc_partnerships.models import (
+    CohortMembership,
+    EnrollmentRecord,
+    PartnerOffering,
+)
+
+
+def days_ago(days):
+    return timezone.now() - timedelta(days=days)
+
+
+@dataclass
+class CourseOverview:
+    """Stand-in for CourseOverview from edx-platform."""
+
+    id: CourseKey = CourseKey.from_string("course-v1:GizmonicInstitute+MST3K+S1_E1")
+    display_name: str = "Mystery Science Theater 3000"
+    short_description: Optional[str] = "Riffing on bad movies."
+    start: Optional[datetime] = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+    end: Optional[datetime] = datetime(2024, 6, 1, tzinfo=dt_timezone.utc)
+    self_paced: bool = False
+
+
+@pytest.mark.django_db
+class TestUpdateOrCreateOffering:
+    """Tests for the update_or_create_offering task."""
+
+    course_id = "course-v1:GizmonicInstitute+MST3K+S1_E1"
+
+    def _sync(self, mocker, course_overview):
+        mocker.patch(
+            "mogc_partnerships.tasks.get_course_overview_or_none",
+            return_value=course_overview,
+        )
+        tasks.update_or_create_offering(self.course_id)
+
+    def test_offering_created(self, mocker):
+        """A partner offering should be created with the synced overview fields."""
+        partner = factories.PartnerFactory(org="GizmonicInstitute")
+
+        self._sync(mocker, CourseOverview(self_paced=True))
+
+        offering = PartnerOffering.objects.get(partner=partner)
+        assert offering.title == "Mystery Science Theater 3000"
+        assert offering.short_description == "Riffing on bad movies."
+        assert offering.start == datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        assert offering.self_paced is True
+        assert offering.content_hash
+
+    def test_unchanged_offering_not_written(self, mocker, django_assert_num_queries):
+        """Syncing an unchanged overview should not issue an UPDATE."""
+        factories.PartnerFactory(org="GizmonicInstitute")
+        self._sync(mocker, CourseOverview())
+        offering = PartnerOffering.objects.get()
+
+        with django_assert_num_queries(2):
+            self._sync(mocker, CourseOverview())
+
+        assert PartnerOffering.objects.get().modified_at == offering.modified_at
+
+    def test_changed_offering_updated(self, mocker):
+        """Syncing a changed overview should update the offering."""
+        factories.PartnerFactory(org="GizmonicInstitute")
+        self._sync(mocker, CourseOverview())
+        offering = PartnerOffering.objects.get()
+
+        self._sync(mocker, CourseOverview(short_description=None))
+
+        updated_offering = PartnerOffering.objects.get()
+        assert updated_offering.short_description == ""
+        assert updated_offering.content_hash != offering.content_hash
+        assert updated_offering.modified_at > offering.modified_at
+
+    def test_offering_created_concurrently_updated(self, mocker):
+        """An offering created after the lookup should be updated, not duplicated."""
+        partner = factories.PartnerFactory(org="GizmonicInstitute")
+        self._sync(mocker, CourseOverview())
+        offering = PartnerOffering.objects.get()
+        mocker.patch.object(
+            PartnerOffering.objects,
+            "get",
+            side_effect=[PartnerOffering.DoesNotExist, offering],
+        )
+
+        self._sync(mocker, CourseOverview(short_description=None))
+
+        updated_offering = PartnerOffering.objects.filter(partner=partner).get()
+        assert updated_offering.short_description == ""
+
+    def test_non_partner_course_ignored(self, mocker):
+        """Courses from orgs without a partner should not create offerings."""
+        self._sync(mocker, CourseOverview())
+
+        assert not PartnerOffering.objects.exists()
+
+
+@pytest.mark.django_db
+class TestReconcilePartnerOfferings:
+    """Tests for the reconcile_partner_offerings task."""
+
+    def _setup(self, mocker):
+        self.partner = factories.PartnerFactory(org="GizmonicInstitute")
+        self.course_overviews = [
+            CourseOverview(
+                id=CourseKey.from_string(f"course-v1:GizmonicInstitute+MST3K+S1_E{n}"),
+                display_name=f"Episode {n}",
+            )
+            for n in range(5)
+        ]
+        mocker.patch(
+            "mogc_partnerships.tasks.get_course_overviews_for_org",
+            return_value=iter([self.course_overviews[:3], self.course_overviews[3:]]),
+        )
+        mocker.patch(
+            "mogc_partnerships.tasks.get_course_overview_or_none",
+            side_effect=lambda course_id: self.course_overviews[int(course_id[-1])],
+        )
+        # One offering is current, one is stale and the rest are missing.
+        tasks.update_or_create_offering(str(self.course_overviews[0].id))
+        tasks.update_or_create_offering(str(self.course_overviews[1].id))
+        self.course_overviews[1].display_name = "Renamed episode"
+
+    def test_missing_and_stale_offerings_reconciled(self, mocker):
+        """Missing offerings should be created and stale ones updated."""
+        self._setup(mocker)
+
+        diff = tasks.reconcile_partner_offerings(self.partner.id)
+
+        assert diff == {
+            "partner": self.partner.slug,
+            "created": [str(co.id) for co in self.course_overviews[2:]],
+            "updated": [str(self.course_overviews[1].id)],
+            "unchanged": 1,
+        }
+        offerings = PartnerOffering.objects.filter(partner=self.partner)
+        assert offerings.count() == 5
+        updated_offering = offerings.get(course_key=self.course_overviews[1].id)
+        assert updated_offering.title == "Renamed episode"
+
+    def test_dry_run_does_not_write(self, mocker):
+        """Dry runs should report differences without applying them."""
+        self._setup(mocker)
+
+        diff = tasks.reconcile_partner_offerings(self.partner.id, dry_run=True)
+
+        assert len(diff["created"]) == 3
+        assert len(diff["updated"]) == 1
+        assert PartnerOffering.objects.filter(partner=self.partner).count() == 2
+        stale_offering = PartnerOffering.objects.get(
+            course_key=self.course_overviews[1].id
+        )
+        assert stale_offering.title == "Episode 1"
+
+    def test_partners_reconciled_in_parallel(self, mocker):
+        """Each active partner should be reconciled by its own task."""
+        mock_group = mocker.patch("mogc_partnerships.tasks.group")
+        partners = factories.PartnerFactory.create_batch(3)
+        factories.PartnerFactory(is_active=False)
+
+        tasks.reconcile_offerings(dry_run=True)
+
+        signatures = list(mock_group.call_args.args[0])
+        assert sorted(signature.args[0] for signature in signatures) == sorted(
+            partner.id for partner in partners
+        )
+        assert all(signature.kwargs == {"dry_run": True} for signature in signatures)
+        mock_group.return_value.apply_async.assert_called_once_with()
+
+
+class PersistentCourseGrades:
+    """Stand-in for the LMS's persisted course grades."""
+
+    def __init__(self, grades):
+        self.grades = grades
+        self.requested_user_ids = []
+
+    def __call__(self, course_key, user_ids):
+        self.requested_user_ids.append(set(user_ids))
+        return {
+            user_id: grade
+            for user_id, grade in self.grades.items()
+            if user_id in user_ids
+        }
+
+
+@pytest.mark.django_db
+class TestBackfillCourseGrades:
+    """Tests for the backfill_course_grades task."""
+
+    @override_settings(MOGC_PARTNERSHIPS_MAINTENANCE_BATCH_SIZE=2)
+    def test_grades_backfilled_in_chunks(self, mocker):
+        """Persisted grades should be copied to records a chunk at a time."""
+        course_id = "course-v1:GizmonicInstitute+MST3K+S1_E1"
+        records = factories.EnrollmentRecordFactory.create_batch(
+            3, offering__course_key=course_id
+        )
+        other_record = factories.EnrollmentRecordFactory(user=records[0].user)
+        grades = PersistentCourseGrades(
+            {records[0].user_id: (0.92, True), records[1].user_id: (0.4, False)}
+        )
+        mocker.patch(
+            "mogc_partnerships.tasks.get_persistent_course_grades", side_effect=grades
+        )
+
+        updated = tasks.backfill_course_grades(course_id)
+
+        for record in [*records, other_record]:
+            record.refresh_from_db()
+        assert updated == 2
+        assert grades.requested_user_ids == [
+            {records[0].user_id, records[1].user_id},
+            {records[2].user_id},
+        ]
+        assert (records[0].grade, records[0].is_successful) == (92, True)
+        assert (records[1].grade, records[1].is_successful) == (40, False)
+        assert records[2].grade == 0
+        assert other_record.grade == 0
+
+
+class CourseEnrollments:
+    """Stand-in for the LMS's course enrollments."""
+
+    def __init__(self, enrollments):
+        self.enrollments = enrollments
+
+    def __call__(self, course_key, after_id, page_size):
+        return [
+            enrollment
+            for enrollment in self.enrollments.get(str(course_key), [])
+            if after_id is None or enrollment[0] > after_id
+        ][:page_size]
+
+
+@pytest.mark.django_db
+class TestReconcileEnrollmentRecords:
+    """Tests for the reconcile_enrollment_records task."""
+
+    def _setup(self, mocker):
+        self.offering = factories.PartnerOfferingFactory()
+        self.other_offering = factories.PartnerOfferingFactory()
+        factories.PartnerOfferingFactory(partner__is_active=False)
+        self.users = factories.UserFactory.create_batch(3)
+        created = timezone.now() - timedelta(days=1)
+        self.current_record = factories.EnrollmentRecordFactory(
+            user=self.users[0], offering=self.offering, mode="audit"
+        )
+        self.stale_record = factories.EnrollmentRecordFactory(
+            user=self.users[1], offering=self.offering, mode="audit"
+        )
+        mocker.patch(
+            "mogc_partnerships.tasks.get_course_enrollments",
+            side_effect=CourseEnrollments(
+                {
+                    str(self.offering.course_key): [
+                        (1, self.users[0].id, "audit", True, created),
+                        (2, self.users[1].id, "audit", False, created),
+                        (3, self.users[2].id, "verified", True, created),
+                    ],
+                    str(self.other_offering.course_key): [
+                        (4, self.users[0].id, "audit", True, created),
+                    ],
+                }
+            ),
+        )
+        self.mock_record = mocker.patch("mogc_partnerships.tasks.record")
+
+    def test_drifted_records_fixed(self, mocker):
+        """Missing records should be created and stale ones updated."""
+        self._setup(mocker)
+        modified_at = self.current_record.modified_at
+
+        drift = tasks.reconcile_enrollment_records()
+
+        assert drift == {"checked": 4, "missing": 2, "stale": 1}
+        self.current_record.refresh_from_db()
+        self.stale_record.refresh_from_db()
+        assert self.current_record.modified_at == modified_at
+        assert self.stale_record.is_active is False
+        new_record = EnrollmentRecord.objects.get(
+            user=self.users[2], offering=self.offering
+        )
+        assert new_record.mode == "verified"
+        assert EnrollmentRecord.objects.filter(offering=self.other_offering).exists()
+        pages = [
+            call.kwargs
+            for call in self.mock_record.call_args_list
+            if call.args == ("tasks.reconcile_enrollment_records",)
+        ]
+        assert sum(page["missing"] for page in pages) == 2
+        assert sum(page["checked"] for page in pages) == 4
+
+    def test_records_changed_after_read_kept(self, mocker):
+        """Records that events changed after the LMS was read should be left alone."""
+        self._setup(mocker)
+        EnrollmentRecord.objects.filter(pk=self.stale_record.pk).update(
+            last_event_at=timezone.now() + timedelta(minutes=1)
+        )
+
+        drift = tasks.reconcile_enrollment_records()
+
+        assert drift == {"checked": 4, "missing": 2, "stale": 0}
+        self.stale_record.refresh_from_db()
+        assert self.stale_record.is_active is True
+
+    def test_reconciliation_starts_from_partner(self, mocker):
+        """A run given only a partner should start from its first offering."""
+        self._setup(mocker)
+
+        drift = tasks.reconcile_enrollment_records(self.offering.partner_id)
+
+        assert drift == {"checked": 4, "missing": 2, "stale": 1}
+
+    @override_settings(
+        MOGC_PARTNERSHIPS_MAINTENANCE_BATCH_SIZE=2,
+        MOGC_PARTNERSHIPS_ENROLLMENT_RECONCILIATION_PAGES_PER_TASK=1,
+    )
+    def test_reconciliation_resumes_from_cursor(self, mocker):
+        """Runs should stop after their page budget and continue from the cursor."""
+        self._setup(mocker)
+        mock_continue_task = mocker.patch(
+            "mogc_partnerships.tasks.reconcile_enrollment_records.delay"
+        )
+
+        tasks.reconcile_enrollment_records()
+        mock_continue_task.assert_called_once_with(
+            self.offering.partner_id, self.offering.id, 2
+        )
+
+        drift = tasks.reconcile_enrollment_records(*mock_continue_task.call_args.args)
+        assert drift == {"checked": 1, "missing": 1, "stale": 0}
+        assert EnrollmentRecord.objects.filter(offering=self.offering).count() == 3
+        assert not EnrollmentRecord.objects.filter(
+            offering=self.other_offering
+        ).exists()
+
+
+@pytest.mark.django_db
+class TestSendPendingInviteReminders:
+    """Tests for the send_pending_invite_reminders periodic task."""
+
+    def test_old_invites_are_reminded(self, mocker):
+        """Only pending invites past the reminder age should be reminded."""
+        mock_reminder_task = mocker.patch(
+            "mogc_partnerships.tasks.trigger_send_cohort_membership_reminders.delay"
+        )
+        old_invite = factories.CohortMembershipInviteFactory(created_at=days_ago(10))
+        factories.CohortMembershipInviteFactory(created_at=days_ago(1))
+        factories.CohortMembershipFactory(created_at=days_ago(10))
+        factories.CohortMembershipInviteFactory(created_at=days_ago(10), active=False)
+
+        reminded = tasks.send_pending_invite_reminders()
+
+        old_invite.refresh_from_db()
+        assert reminded == 1
+        assert old_invite.reminded_at is not None
+        mock_reminder_task.assert_called_once_with(
+            cohort_membership_ids=[old_invite.pk]
+        )
+
+    def test_invites_are_reminded_once(self, mocker):
+        """A second run should not remind the same invites again."""
+        mock_reminder_task = mocker.patch(
+            "mogc_partnerships.tasks.trigger_send_cohort_membership_reminders.delay"
+        )
+        factories.CohortMembershipInviteFactory(created_at=days_ago(10))
+
+        tasks.send_pending_invite_reminders()
+        reminded = tasks.send_pending_invite_reminders()
+
+        assert reminded == 0
+        assert mock_reminder_task.call_count == 1
+
+    @override_settings(MOGC_PARTNERSHIPS_MAINTENANCE_BATCH_SIZE=2)
+    def test_reminders_are_batched(self, mocker):
+        """Reminders should be queued in batches of the configured size."""
+        mock_reminder_task = mocker.patch(
+            "mogc_partnerships.tasks.trigger_send_cohort_membership_reminders.delay"
+        )
+        factories.CohortMembershipInviteFactory.create_batch(5, created_at=days_ago(10))
+
+        reminded = tasks.send_pending_invite_reminders()
+
+        assert reminded == 5
+        assert [
+            len(call.kwargs["cohort_membership_ids"])
+            for call in mock_reminder_task.call_args_list
+        ] == [2, 2, 1]
+
+    def test_reminder_messages_are_sent(self, mocker):
+        """Reminder emails should only be sent to invites that are still pending."""
+        mock_send = mocker.patch(
+            "mogc_partnerships.tasks.send_cohort_membership_invite"
+        )
+        invite = factories.CohortMembershipInviteFactory()
+        member = factories.CohortMembershipFactory()
+
+        tasks.trigger_send_cohort_membership_reminders([invite.pk, member.pk])
+
+        mock_send.assert_called_once_with(invite, is_reminder=True)
+
+
+@pytest.mark.django_db
+class TestExpirePendingInvites:
+    """Tests for the expire_pending_invites periodic task."""
+
+    @override_settings(MOGC_PARTNERSHIPS_MAINTENANCE_BATCH_SIZE=2)
+    def test_expired_invites_are_removed(self):
+        """Pending invites past the expiry cutoff should be deleted."""
+        expired_invites = factories.CohortMembershipInviteFactory.create_batch(
+            3, created_at=days_ago(100)
+        )
+        recent_invite = factories.CohortMembershipInviteFactory(created_at=days_ago(5))
+        old_member = factories.CohortMembershipFactory(created_at=days_ago(100))
+
+        expired = tasks.expire_pending_invites()
+
+        assert expired == 3
+        assert not CohortMembership.objects.filter(
+            pk__in=[invite.pk for invite in expired_invites]
+        ).exists()
+        assert (
+            CohortMembership.objects.filter(
+                pk__in=[recent_invite.pk, old_member.pk]
+            ).count()
+            == 2
+        )
@@ -1,9 +1,12 @@
 import json
 
+from django.core.cache import cache
+from django.http import Http404
+
 import pytest
 from rest_framework.test import APIRequestFactory, force_authenticate
 
-from mogc_partnerships import enums, factories, views
+from mogc_partnerships import caching, enums, factories, generations, views
 from mogc_partnerships.models import PartnerCohort
 
 
@@ -76,6 +79,110 @@ class TestPartnerListView:
 
         assert response.status_code == 403
 
+    def test_not_modified(self, api_rf, django_assert_num_queries):
+        """Requests with a current ETag should get a 304 without any queries."""
+
+        membership = factories.PartnerManagementMembershipFactory()
+        partner_list_view = views.PartnerListView.as_view()
+        request = api_rf.get("/partners/")
+        force_authenticate(request, user=membership.user)
+        etag = partner_list_view(request)["ETag"]
+
+        request = api_rf.get("/partners/", HTTP_IF_NONE_MATCH=etag)
+        force_authenticate(request, user=membership.user)
+        with django_assert_num_queries(0):
+            response = partner_list_view(request)
+
+        assert response.status_code == 304
+
+    def test_modified(self, api_rf, django_capture_on_commit_callbacks):
+        """Writes to the user's partnership data should change the ETag."""
+
+        membership = factories.PartnerManagementMembershipFactory()
+        partner_list_view = views.PartnerListView.as_view()
+        request = api_rf.get("/partners/")
+        force_authenticate(request, user=membership.user)
+        etag = partner_list_view(request)["ETag"]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            factories.PartnerOfferingFactory(partner=membership.partner)
+        request = api_rf.get("/partners/", HTTP_IF_NONE_MATCH=etag)
+        force_authenticate(request, user=membership.user)
+        response = partner_list_view(request)
+
+        assert response.status_code == 200
+        assert response["ETag"] != etag
+        assert len(response.data[0]["offerings"]) == 1
+
+
+@pytest.mark.django_db
+class TestLearnerHomeView:
+    """Tests for LearnerHomeView."""
+
+    def test_learner_home(self, api_rf):
+        """Learners should get their partners and offerings with enrollment status."""
+
+        member = factories.CohortMembershipFactory()
+        enrolled, other = factories.CohortOfferingFactory.create_batch(
+            2, cohort=member.cohort
+        )
+        factories.EnrollmentRecordFactory(user=member.user, offering=enrolled.offering)
+        factories.CohortOfferingFactory()
+        learner_home_view = views.LearnerHomeView.as_view()
+        request = api_rf.get("/home/")
+        force_authenticate(request, member.user)
+
+        response = learner_home_view(request)
+
+        assert response.status_code == 200
+        assert response.data["partners"] == [
+            {"name": member.cohort.partner.name, "slug": member.cohort.partner.slug}
+        ]
+        offerings = {item["id"]: item for item in response.data["offerings"]}
+        assert offerings.keys() == {enrolled.id, other.id}
+        assert offerings[enrolled.id]["is_enrolled"]
+        assert not offerings[other.id]["is_enrolled"]
+        assert offerings[other.id]["details"]["title"] == other.offering.title
+
+    def test_cached(self, api_rf, django_assert_num_queries):
+        """Repeated requests should be served from the cache."""
+
+        member = factories.CohortMembershipFactory()
+        factories.CohortOfferingFactory(cohort=member.cohort)
+        learner_home_view = views.LearnerHomeView.as_view()
+        request = api_rf.get("/home/")
+        force_authenticate(request, member.user)
+        expected = learner_home_view(request).data
+
+        request = api_rf.get("/home/")
+        force_authenticate(request, member.user)
+        with django_assert_num_queries(0):
+            response = learner_home_view(request)
+
+        assert response.data == expected
+
+    def test_invalidated(self, api_rf, django_capture_on_commit_callbacks):
+        """Writes to the learner's partnership data should replace the document."""
+
+        member = factories.CohortMembershipFactory()
+        cohort_offering = factories.CohortOfferingFactory(cohort=member.cohort)
+        learner_home_view = views.LearnerHomeView.as_view()
+        request = api_rf.get("/home/")
+        force_authenticate(request, member.user)
+        learner_home_view(request)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            factories.EnrollmentRecordFactory(
+                user=member.user, offering=cohort_offering.offering
+            )
+            factories.CohortOfferingFactory(cohort=member.cohort)
+        request = api_rf.get("/home/")
+        force_authenticate(request, member.user)
+        response = learner_home_view(request)
+
+        assert len(response.data["offerings"]) == 2
+        assert response.data["offerings"][0]["is_enrolled"]
+
 
 @pytest.mark.django_db
 class TestCohortListView:
@@ -338,6 +445,85 @@ class TestCohortOfferingListView:
         assert response.status_code == 200
         assert len(response.data) == 0
 
+    def test_not_modified(self, api_rf, django_assert_num_queries):
+        """Requests with a current ETag should get a 304 without any queries."""
+
+        member = factories.CohortMembershipFactory()
+        factories.CohortOfferingFactory(cohort=member.cohort)
+        offering_list_view = views.CohortOfferingListView.as_view()
+        request = api_rf.get("/offerings/")
+        force_authenticate(request, member.user)
+        etag = offering_list_view(request)["ETag"]
+
+        request = api_rf.get("/offerings/", HTTP_IF_NONE_MATCH=etag)
+        force_authenticate(request, member.user)
+        with django_assert_num_queries(0):
+            response = offering_list_view(request)
+
+        assert response.status_code == 304
+
+    def test_modified_by_enrollment(self, api_rf, django_capture_on_commit_callbacks):
+        """New enrollment records should change the ETag."""
+
+        member = factories.CohortMembershipFactory()
+        cohort_offering = factories.CohortOfferingFactory(cohort=member.cohort)
+        offering_list_view = views.CohortOfferingListView.as_view()
+        request = api_rf.get("/offerings/")
+        force_authenticate(request, member.user)
+        etag = offering_list_view(request)["ETag"]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            factories.EnrollmentRecordFactory(
+                user=member.user, offering=cohort_offering.offering
+            )
+        request = api_rf.get("/offerings/", HTTP_IF_NONE_MATCH=etag)
+        force_authenticate(request, member.user)
+        response = offering_list_view(request)
+
+        assert response.status_code == 200
+        assert response.data[0]["is_enrolled"]
+
+    def test_enrolled_offerings_marked(self, api_rf):
+        """Offerings with an active enrollment record should be marked enrolled."""
+
+        member = factories.CohortMembershipFactory()
+        enrolled, other = factories.CohortOfferingFactory.create_batch(
+            2, cohort=member.cohort
+        )
+        factories.EnrollmentRecordFactory(user=member.user, offering=enrolled.offering)
+        offering_list_view = views.CohortOfferingListView.as_view()
+        request = api_rf.get("/offerings/")
+        force_authenticate(request, member.user)
+
+        response = offering_list_view(request)
+
+        is_enrolled = {item["id"]: item["is_enrolled"] for item in response.data}
+        assert is_enrolled == {enrolled.id: True, other.id: False}
+
+    @pytest.mark.parametrize("objs", [3, 7])
+    def test_query_count(self, api_rf, django_assert_num_queries, objs):
+        """Offerings should be listed with one query plus one for enrollments."""
+
+        member = factories.CohortMembershipFactory()
+        factories.CohortOfferingFactory.create_batch(objs, cohort=member.cohort)
+        manager = factories.PartnerManagementMembershipFactory(
+            user=member.user, partner=member.cohort.partner
+        )
+        factories.CohortOfferingFactory.create_batch(
+            objs, cohort__partner=manager.partner
+        )
+        offering_list_view = views.CohortOfferingListView.as_view()
+        request = api_rf.get("/offerings/")
+        force_authenticate(request, member.user)
+        # The partners that the user's ETag depends on are usually cached.
+        generations.get_user_scopes(member.user.id)
+
+        with django_assert_num_queries(2):
+            response = offering_list_view(request)
+
+        assert response.status_code == 200
+        assert len(response.data) == objs * 2
+
     def test_anonymous_user_forbidden(self, api_rf):
         """Anonymous users should receive status 403."""
 
@@ -550,6 +736,91 @@ class TestCohortMembershipCreateView:
         assert len(response.data) == 1
         assert mock_message_task.call_count == 1
 
+    def test_create_matches_account_case_insensitively(self, api_rf, mocker):
+        """Memberships are linked to accounts whatever the case of the email."""
+        mocker.patch(
+            "mogc_partnerships.tasks.trigger_send_cohort_membership_invite.delay"
+        )
+
+        manager = factories.PartnerManagementMembershipFactory()
+        user = factories.UserFactory(email="foo@bar.com")
+        cohort = factories.PartnerCohortFactory(partner=manager.partner)
+        member_create_view = views.CohortMembershipCreateView.as_view()
+        request = api_rf.post(f"/memberships/{cohort.uuid}/", {"email": "Foo@Bar.com"})
+        force_authenticate(request, manager.user)
+
+        response = member_create_view(request, cohort_uuid=cohort.uuid)
+
+        assert response.status_code == 201
+        assert cohort.memberships.get().user == user
+
+    def test_bulk_create_ignores_case_duplicates(self, api_rf, mocker):
+        """Emails that only differ in case create a single membership."""
+        mock_message_task = mocker.patch(
+            "mogc_partnerships.tasks.trigger_send_cohort_membership_invites.delay"
+        )
+
+        manager = factories.PartnerManagementMembershipFactory()
+        cohort = factories.PartnerCohortFactory(partner=manager.partner)
+        existing = factories.CohortMembershipInviteFactory(
+            cohort=cohort, email="jane@example.com"
+        )
+        member_create_view = views.CohortMembershipCreateView.as_view()
+        user_data = [
+            {"email": "Jane@Example.com"},
+            {"email": "JOHN@example.com"},
+            {"email": "john@example.com"},
+        ]
+
+        request = api_rf.post(
+            f"/memberships/{cohort.uuid}/",
+            json.dumps(user_data),
+            content_type="application/json",
+        )
+        force_authenticate(request, manager.user)
+
+        response = member_create_view(request, cohort_uuid=cohort.uuid)
+
+        assert response.status_code == 201
+        assert cohort.memberships.count() == 2
+        assert cohort.memberships.filter(pk=existing.pk).exists()
+        assert mock_message_task.call_count == 1
+
+    def test_bulk_create_caches_stored_invites(
+        self, api_rf, mocker, django_capture_on_commit_callbacks
+    ):
+        """Only emails stored as pending invites should be cached as pending."""
+        mocker.patch(
+            "mogc_partnerships.tasks.trigger_send_cohort_membership_invites.delay"
+        )
+
+        manager = factories.PartnerManagementMembershipFactory()
+        cohort = factories.PartnerCohortFactory(partner=manager.partner)
+        # The member's account has moved to a new email since they joined.
+        factories.CohortMembershipFactory(
+            cohort=cohort,
+            email="old@example.com",
+            user=factories.UserFactory(email="new@example.com"),
+        )
+        # Start from a fresh load, without the marker left by linking the member.
+        cache.clear()
+        caching.load_pending_invites()
+        member_create_view = views.CohortMembershipCreateView.as_view()
+        user_data = [{"email": "old@example.com"}, {"email": "jane@example.com"}]
+
+        request = api_rf.post(
+            f"/memberships/{cohort.uuid}/",
+            json.dumps(user_data),
+            content_type="application/json",
+        )
+        force_authenticate(request, manager.user)
+        with django_capture_on_commit_callbacks(execute=True):
+            response = member_create_view(request, cohort_uuid=cohort.uuid)
+
+        assert response.status_code == 201
+        assert not caching.has_pending_invite("old@example.com")
+        assert caching.has_pending_invite("jane@example.com")
+
 
 @pytest.mark.django_db
 class TestCohortMembershipUpdateView:
@@ -696,3 +967,47 @@ class TestEnrollmentRecordListView:
             response = record_list_view(request)
 
         assert response.status_code == 200
+
+
+@pytest.mark.django_db
+class TestContinueLearning:
+    """Tests for the continue_learning view."""
+
+    @pytest.fixture(autouse=True)
+    def course_urls(self, mocker, settings):
+        settings.ROOT_URLCONF = "mogc_partnerships.urls"
+        mocker.patch(
+            "mogc_partnerships.compat.make_course_url",
+            side_effect=lambda course_key: f"/course/{course_key}/",
+        )
+
+    def test_redirect_cached(self, rf, django_assert_num_queries):
+        """Repeated redirects for an offering should not need any queries."""
+        cohort_offering = factories.CohortOfferingFactory()
+        expected_url = f"/course/{cohort_offering.offering.course_key}/"
+
+        with django_assert_num_queries(1):
+            response = views.continue_learning(rf.get("/"), cohort_offering.id)
+        assert response.url == expected_url
+
+        with django_assert_num_queries(0):
+            response = views.continue_learning(rf.get("/"), cohort_offering.id)
+        assert response.url == expected_url
+
+    def test_missing_offering(self, rf):
+        with pytest.raises(Http404):
+            views.continue_learning(rf.get("/"), 1)
+
+    def test_invalidated_on_offering_change(
+        self, rf, django_capture_on_commit_callbacks
+    ):
+        cohort_offering = factories.CohortOfferingFactory()
+        views.continue_learning(rf.get("/"), cohort_offering.id)
+
+        offering = cohort_offering.offering
+        offering.course_key = "course-v1:edX+DemoX+Demo_Course"
+        with django_capture_on_commit_callbacks(execute=True):
+            offering.save()
+        response = views.continue_learning(rf.get("/"), cohort_offering.id)
+
+        assert response.url == "/course/course-v1:edX+DemoX+Demo_Course/"